@@ -13,6 +13,19 @@ from __future__ import annotations
 from dataclasses import dataclass
 """
 
+# Constructors of interned types are hash-consed: creating a node returns the unique
+# node with the same fields, so that nodes are equal if and only if they are identical.
+INTERN_PRELUDE = """
+_interned: dict[tuple[Any, ...], Any] = {}
+
+def _intern[T](cls: type[T], key: tuple[Any, ...], **fields: Any) -> T:
+    x = object.__new__(cls)
+    for n, v in fields.items():
+        object.__setattr__(x, n, v)
+    _interned[key] = x
+    return x
+"""
+
 PRELUDE = """
 type optional[T] = T | None
 
@@ -32,6 +45,7 @@ def abort(msg: str):
 class Record:
     name: str
     fields: list[tuple[str, str, Optional[str]]]
+    interned: bool = False
     def generate(self):
         fs = []
         for (name, ty, default) in self.fields:
@@ -39,10 +53,34 @@ class Record:
                 fs.append(f'    {name}: {ty} = {default}')
             else:
                 fs.append(f'    {name}: {ty}')
+        if self.interned:
+            return self.generateInterned(fs)
         fsStr = '\n'.join(fs) if fs else '    pass'
         return f"""@dataclass
 class {self.name}:
 {fsStr}
+"""
+    def generateInterned(self, fs: list[str]):
+        params = ''.join([f', {name}: {ty}' for (name, ty, _) in self.fields])
+        names = [name for (name, _, _) in self.fields]
+        # Lists are not hashable, the key contains tuples instead
+        keys = [f'tuple({name})' if ty.startswith('list[') else name
+                for (name, ty, _) in self.fields]
+        fieldArgs = ''.join([f', {n}={n}' for n in names])
+        def tuple(l: list[str]):
+            return f'({l[0]},)' if len(l) == 1 else f'({", ".join(l)})'
+        fs.append(f"""    def __new__(cls{params}) -> Self:
+        key = {tuple(['cls'] + keys)}
+        x: Self | None = _interned.get(key)
+        if x is None:
+            x = _intern(cls, key{fieldArgs})
+        return x""")
+        fs.append(f"""    def __reduce__(self):
+        return ({self.name}, {tuple([f'self.{n}' for n in names]) if names else '()'})""")
+        fsStr = '\n'.join(fs)
+        return f"""@dataclass(frozen=True, eq=False, init=False)
+class {self.name}:
+{fsStr}
 """
 
 @dataclass
@@ -64,19 +102,28 @@ class Output:
     def append(self, d):
         self.defs.append(d)
     def generate(self, commonModule: Optional[str]):
-        l = [IMPORTS.strip()]
+        interned = any([isinstance(d, Record) and d.interned for d in self.defs])
+        defs = '\n\n'.join([d.generate().strip() for d in self.defs])
+        imports = IMPORTS.strip()
+        if 'field(' in defs:
+            imports += ', field'
+        if interned:
+            imports += '\nfrom typing import Any, Self'
+        l = [imports]
         if commonModule:
             l.append(f'from {commonModule} import *')
         else:
             l.append(PRELUDE.strip())
-        for d in self.defs:
-            l.append(d.generate().strip())
+        if interned:
+            l.append(INTERN_PRELUDE.strip())
+        l.append(defs)
         return '\n\n'.join(l)
 
 def generateCodeForConstructor(c: asdl.Constructor, attrs: list[asdl.Field], allTypes: set[str]) -> Record:
     fields = []
     inputFields = c.fields + attrs
     for i, f in enumerate(inputFields):
+        isAttr = i >= len(c.fields)
         default = None
         if f.seq:
             ty = f'list[{f.type}]'
@@ -87,7 +134,9 @@ def generateCodeForConstructor(c: asdl.Constructor, attrs: list[asdl.Field], all
                 # only have a default if all remaining fields have a default. Otherwise, you
                 # get the error "Fields without default values cannot appear after fields
                 # with default values"
-                default = 'None'
+                # Attributes (types, line numbers) are annotations of a node, they do
+                # not take part in comparing nodes, just like in python's ast module.
+                default = 'field(default=None, compare=False)' if isAttr else 'None'
         else:
             ty = f.type
         name = f.name if f.name else f.type
@@ -97,8 +146,11 @@ def generateCodeForConstructor(c: asdl.Constructor, attrs: list[asdl.Field], all
 asdl.Product.__match_args__ = ('fields', 'attributes')
 asdl.Sum.__match_args__ = ('types', 'attributes')
 
-def generateCode(mod: asdl.Module, out: Output):
+def generateCode(mod: asdl.Module, out: Output, interned: list[str]):
     allTypes = set(mod.types.keys())
+    for name in interned:
+        if name not in allTypes:
+            abort(f'Unknown type {name} to intern')
     for ty in mod.dfns:
         match ty.value:
             case asdl.Product(fields, _attrs):
@@ -107,6 +159,10 @@ def generateCode(mod: asdl.Module, out: Output):
                 alternatives = []
                 for c in constructors:
                     d = generateCodeForConstructor(c, attrs, allTypes)
+                    if ty.name in interned:
+                        if attrs:
+                            abort(f'Interned type {ty.name} must not have attributes')
+                        d.interned = True
                     out.append(d)
                     alternatives.append(c.name)
                 out.append(Union(ty.name, alternatives))
@@ -119,6 +175,8 @@ def parseArgs():
     parser.add_argument('inputFile')
     parser.add_argument('--out', required=False)
     parser.add_argument('--common', required=False)
+    parser.add_argument('--intern', action='append', default=[], metavar='TYPE',
+                        help='Intern the nodes of TYPE (can be given multiple times)')
     return parser.parse_args()
 
 def writeFile(filename: str, content: str):
@@ -138,7 +196,7 @@ def main():
     print(f'Parsing {args.inputFile}')
     mod = asdl.parse(args.inputFile)
     out = Output()
-    generateCode(mod, out)
+    generateCode(mod, out, args.intern)
     s = out.generate(args.common)
     if args.out:
         writeFile(args.out, s)
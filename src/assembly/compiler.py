@@ -35,10 +35,10 @@ MIPS_END = """
 def compileFile(args: genCompiler.Args):
     log.info(f'Compiling {args.input} to assembly file {args.output}, args={args}')
     tacInstrs = loopToTac(args)
-    log.debug('TAC:\n' + tacPretty.prettyInstrs(tacInstrs))
+    log.debug(lambda: 'TAC:\n' + tacPretty.prettyInstrs(tacInstrs))
     maxRegs = args.maxRegisters if args.maxRegisters is not None else MAX_REGISTERS
     tacSpillInstrs = tacToTacSpill(tacInstrs, maxRegs)
-    log.debug('TAC spill:\n' + tacSpillPretty.prettyInstrs(tacSpillInstrs))
+    log.debug(lambda: 'TAC spill:\n' + tacSpillPretty.prettyInstrs(tacSpillInstrs))
     mipsInstrs = tacSpillToMips(tacSpillInstrs)
     s = mipsPretty.mipsPretty(mipsInstrs)
     utils.writeTextFile(args.output, MIPS_START + s + MIPS_END)
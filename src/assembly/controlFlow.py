@@ -44,7 +44,7 @@ def buildControlFlowGraph(instrs: list[tac.instr]) -> ControlFlowGraph:
     labelToIdx: dict[str, int] = {}
     while instrs:
         (bb, instrs) = _firstBasicBlock(instrs, idx)
-        log.debug(f'{bb}')
+        log.debug(lambda: f'{bb}')
         g.addVertex(idx, bb)
         for l in bb.labels:
             labelToIdx[l] = idx
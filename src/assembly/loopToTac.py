@@ -17,10 +17,9 @@ def loopToTac(args: genCompiler.Args) -> list[tac.instr]:
     c = utils.importModuleNotInStudent('compilers.lang_loop.loop_compiler')
     import lang_loop.loop_ast as ast
     log.debug(f'Generating TAC from {args.input}')
-    wasmMod = genCompiler.compileMain(args, c.compileModule, ast)
+    wasmMod = genCompiler.compileInMemory(args, c.compileModule, ast)
     wasmInstrs = wasmMod.funcs[0].instrs
-    wasmCode = sexp.renderSExp(wasmMod.render())
-    log.debug('Wasm instructions:\n' + wasmCode)
+    log.debug(lambda: 'Wasm instructions:\n' + sexp.renderSExp(wasmMod.render()))
     (res, tacInstrs) = wasmToTac.wasmToTac(wasmToTac.downcast(wasmInstrs))
     if res is not None:
         raise ValueError(f'Value returned from tac.toTac is not None: {res}')
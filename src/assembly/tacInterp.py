@@ -3,6 +3,7 @@ An interpreter for TAC.
 """
 from assembly.tac_ast import *
 import common.utils as utils
+import common.interpIO as interpIO
 import common.genericCompiler as genCompiler
 import assembly.tacPretty as tacPretty
 from assembly.loopToTac import loopToTac
@@ -57,9 +58,9 @@ def interpInstrs(instrs: list[instr]):
             case Call(x, fun, args):
                 match (fun, args):
                     case (Ident('$input_i64'), []):
-                        vars[utils.assertNotNone(x)] = utils.inputInt('Enter some int: ')
+                        vars[utils.assertNotNone(x)] = interpIO.inputInt('Enter some int: ')
                     case (Ident('$print_i32'), [p]) | (Ident('$print_i64'), [p]):
-                        print(evalPrim(p, vars))
+                        interpIO.printValue(evalPrim(p, vars))
                     case _:
                         raise ValueError(f'Invalid call: {instr}')
                 pc += 1
@@ -82,4 +83,7 @@ def interpFile(args: genCompiler.Args, printTac: bool):
         print(delim)
         print(tacPretty.prettyInstrs(tacInstrs))
         print(delim)
-    interpInstrs(tacInstrs)
+    try:
+        interpInstrs(tacInstrs)
+    finally:
+        interpIO.flush()
@@ -34,4 +34,8 @@ class CompilerConfig:
     defaultMaxMemSize = (100 * 1024) // 64  # 100MB
     maxArraySize: int # (in bytes)
     defaultMaxArraySize = 50 * 1024 * 1024 # 50MB
+    @staticmethod
+    def default() -> CompilerConfig:
+        return CompilerConfig(maxMemSize=CompilerConfig.defaultMaxMemSize,
+                              maxArraySize=CompilerConfig.defaultMaxArraySize)
 
@@ -0,0 +1,175 @@
+"""
+Execution engine that runs the source program with CPython (main.py interp
+--engine=cpython). The language modules lang_X/X_cpythonInterp.py type check the
+program and then call runModule.
+
+All our languages are subsets of python, so after type checking, CPython computes the
+same results as our interpreters. Only arrays need runtime checks: an array must not
+exceed CompilerConfig.maxArraySize or have a negative size, and the live arrays must
+fit into CompilerConfig.maxMemSize. Therefore, the python AST of the program is
+rewritten before compilation so that all arrays are created as instances of Array,
+which account for their size in a Heap. As in lang_array.array_interp, sizes are
+computed as in the Wasm backend.
+
+CPython frees an array as soon as it is no longer referenced (only cyclic garbage
+needs the garbage collector, which runs before reporting that memory is exhausted).
+Thus the heap contains the live arrays, as the heap of our interpreters after a
+garbage collection.
+
+Our interpreters support deep recursion, so the program runs in a thread with a large
+stack and a high recursion limit (see runWithDeepStack).
+"""
+from __future__ import annotations
+import common.interpIO as interpIO
+import common.utils as utils
+import common.log as log
+from common.compilerSupport import CompilerConfig
+from common.genericInterp import ArraySizeError, OutOfMemoryError
+from typing import *
+import typing
+import ast
+import gc
+import sys
+import threading
+
+# Globals for running a program of our languages with python (main.py pyrun)
+PRELUDE_DICT = {
+    'input_int': lambda: utils.inputInt('Input some int: '),
+    'Callable': cast(Any, typing.Callable)
+}
+
+# Size of the header (the length) of an array in bytes, as in lang_array.array_interp
+ARRAY_HEADER_SIZE = 4
+# The memory of the Wasm backend starts with the data for the error messages
+DATA_SIZE = 100
+PAGE_SIZE = 64 * 1024
+
+# Recursion limit and stack size of the thread running the program. Python frames
+# do not use the C stack in CPython 3.12, the stack is only needed for calls through C.
+MAX_RECURSION_DEPTH = 2_000_000
+STACK_SIZE = 512 * 1024 * 1024
+
+# Names of the functions creating arrays in the rewritten program
+ARRAY_DYN = '__minipy_arrayDyn'
+ARRAY_STATIC = '__minipy_arrayStatic'
+
+class Heap:
+    def __init__(self, cfg: CompilerConfig):
+        self.maxArraySize = cfg.maxArraySize
+        self.maxHeapSize = cfg.maxMemSize * PAGE_SIZE - DATA_SIZE
+        self.heapBytes = 0
+        self.maxHeapBytes = 0
+    def reserve(self, n: int, elem: Any) -> int:
+        """
+        Reserves the bytes for an array of n elements like elem and returns their number.
+        """
+        # Ints are i64 values in the Wasm backend, all other values are i32 values
+        size = ARRAY_HEADER_SIZE + n * (8 if type(elem) is int else 4)
+        if n < 0 or size > self.maxArraySize:
+            raise ArraySizeError(f'Invalid size of array: {n} elements')
+        if self.heapBytes + size > self.maxHeapSize:
+            gc.collect()
+            if self.heapBytes + size > self.maxHeapSize:
+                raise OutOfMemoryError(f'Cannot allocate {size} bytes, ' \
+                    f'{self.heapBytes} of {self.maxHeapSize} bytes are in use')
+        self.heapBytes += size
+        self.maxHeapBytes = max(self.maxHeapBytes, self.heapBytes)
+        return size
+    def __str__(self):
+        return f'Heap({self.heapBytes} bytes in use, at most {self.maxHeapBytes} bytes)'
+
+class Array(list[Any]):
+    """
+    An array of the program. The heap is freed when CPython deletes the array.
+    """
+    __slots__ = ('heap', 'size')
+    def __init__(self, heap: Heap, elems: Iterable[Any], size: int):
+        super().__init__(elems)
+        self.heap = heap
+        self.size = size
+    def __del__(self):
+        self.heap.heapBytes -= self.size
+
+class ArrayRewriter(ast.NodeTransformer):
+    """
+    Replaces `n * [e]` with `ARRAY_DYN(n, e)` and `[e1, ..., en]` with
+    `ARRAY_STATIC([e1, ..., en])`. Type annotations are left unchanged.
+    """
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> ast.FunctionDef:
+        node.body = [self.visit(s) for s in node.body]
+        return node
+    def visit_BinOp(self, node: ast.BinOp) -> ast.expr:
+        match node:
+            case ast.BinOp(size, ast.Mult(), ast.List([elem])):
+                return ast.copy_location(
+                    ast.Call(ast.Name(ARRAY_DYN, ast.Load()),
+                             [self.visit(size), self.visit(elem)], []), node)
+            case _:
+                return cast(ast.expr, self.generic_visit(node))
+    def visit_List(self, node: ast.List) -> ast.expr:
+        self.generic_visit(node)
+        if not isinstance(node.ctx, ast.Load):
+            return node
+        return ast.copy_location(
+            ast.Call(ast.Name(ARRAY_STATIC, ast.Load()), [node], []), node)
+
+def mkGlobals(heap: Heap) -> dict[str, Any]:
+    def arrayDyn(n: int, elem: Any) -> Array:
+        size = heap.reserve(n, elem)
+        a = Array(heap, (elem,), size)
+        a *= n
+        return a
+    def arrayStatic(elems: list[Any]) -> Array:
+        size = heap.reserve(len(elems), elems[0] if elems else None)
+        return Array(heap, elems, size)
+    return {
+        '__name__': '__main__',
+        'input_int': lambda: interpIO.inputInt('Enter some int: '),
+        'print': interpIO.printValue,
+        'Callable': PRELUDE_DICT['Callable'],
+        ARRAY_DYN: arrayDyn,
+        ARRAY_STATIC: arrayStatic
+    }
+
+def runWithDeepStack[T](f: Callable[[], T]) -> T:
+    """
+    Calls f in a thread with a stack of STACK_SIZE bytes and a recursion limit of
+    MAX_RECURSION_DEPTH. Raises the exception raised by f, if any.
+    """
+    results: list[T] = []
+    errors: list[BaseException] = []
+    def run():
+        try:
+            results.append(f())
+        except BaseException as e:
+            errors.append(e)
+    oldLimit = sys.getrecursionlimit()
+    oldStackSize = threading.stack_size(STACK_SIZE)
+    sys.setrecursionlimit(MAX_RECURSION_DEPTH)
+    try:
+        t = threading.Thread(target=run, name='cpythonInterp')
+        t.start()
+        t.join()
+    finally:
+        threading.stack_size(oldStackSize)
+        sys.setrecursionlimit(oldLimit)
+    if errors:
+        raise errors[0]
+    return results[0]
+
+def runModule(filename: Optional[str], cfg: CompilerConfig):
+    """
+    Runs the source of a type-correct program with CPython.
+    """
+    if filename is None:
+        raise ValueError('The cpython engine needs the source file of the program')
+    tree = ArrayRewriter().visit(ast.parse(utils.readTextFile(filename), filename))
+    code = compile(ast.fix_missing_locations(tree), filename, 'exec')
+    heap = Heap(cfg)
+    env = mkGlobals(heap)
+    try:
+        runWithDeepStack(lambda: exec(code, env))
+    finally:
+        # Deletes the arrays referenced by the program
+        env.clear()
+    log.info(f'CPython engine: {heap}')
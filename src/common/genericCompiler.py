@@ -5,6 +5,8 @@ from typing import *
 from dataclasses import dataclass
 from common.wasm import *
 import common.sexp as sexp
+import common.wasmBinary as wasmBinary
+import common.watWriter as watWriter
 import common.utils as utils
 from common.compilerSupport import CompilerConfig
 import common.compilerSupport as compilerSupport
@@ -12,19 +14,59 @@ import shell
 
 type CompileFun = Callable[[Any, CompilerConfig], WasmModule]
 
-def compileToWat(compileFun: CompileFun, astMod: Any, cfg: CompilerConfig,
-                 input: str, output: str) -> WasmModule:
+def compileToModule(compileFun: CompileFun, astMod: Any, cfg: CompilerConfig,
+                    input: str) -> WasmModule:
     ast = parser.parseFile(input, astMod)
     log.info(f'Compiling AST with {compileFun}')
     try:
-        wasmMod = compileFun(ast, cfg)
+        return compileFun(ast, cfg)
     except compilerSupport.CompileError as e:
         e.displayAndDie()
-    code = sexp.renderSExp(wasmMod.render())
-    utils.writeTextFile(output, code)
+
+# pretty: layout with the prettyprinter library (common.sexp)
+# compact: one instruction per line, written in a single pass (common.watWriter)
+type WatStyle = Literal['pretty', 'compact']
+
+def writeWat(wasmMod: WasmModule, output: str, style: WatStyle = 'pretty'):
+    match style:
+        case 'pretty':
+            code = sexp.renderSExp(wasmMod.render())
+            utils.writeTextFile(output, code)
+        case 'compact':
+            with open(output, 'w') as f:
+                watWriter.writeModule(wasmMod, f)
     log.info(f'Wrote textual representation of wasm to {output}')
+
+def compileToWat(compileFun: CompileFun, astMod: Any, cfg: CompilerConfig,
+                 input: str, output: str, style: WatStyle = 'pretty') -> WasmModule:
+    wasmMod = compileToModule(compileFun, astMod, cfg, input)
+    writeWat(wasmMod, output, style)
     return wasmMod
 
+def writeWasm(wasmMod: WasmModule, output: str):
+    code = wasmBinary.encodeModule(wasmMod)
+    with open(output, 'wb') as f:
+        f.write(code)
+    log.info(f'Wrote binary representation of wasm to {output}')
+
+def checkWasm(wat2wasmCmd: str, inputWat: str, wasmFile: str):
+    """
+    Checks that wat2wasm produces the same binary for inputWat as in wasmFile.
+    """
+    with shell.tempDir() as d:
+        expectedFile = shell.pjoin(d, 'expected.wasm')
+        wat2wasm(wat2wasmCmd, inputWat, expectedFile)
+        with open(expectedFile, 'rb') as f:
+            expected = f.read()
+    with open(wasmFile, 'rb') as f:
+        real = f.read()
+    if real != expected:
+        n = min(len(real), len(expected))
+        i = next((i for i in range(n) if real[i] != expected[i]), n)
+        utils.abort(f'Binary wasm in {wasmFile} differs from the output of wat2wasm at byte {i} ' \
+            f'(sizes: {len(real)} and {len(expected)})')
+    log.info(f'Binary wasm in {wasmFile} is the same as the output of wat2wasm')
+
 def wat2wasm(wat2wasmCmd: str, input: str, output: str):
     cmd = [wat2wasmCmd, '--output=' + output, input]
     log.info(f'Converting textual format of wasm to binary format, cmd: {cmd}')
@@ -33,28 +75,54 @@ def wat2wasm(wat2wasmCmd: str, input: str, output: str):
         utils.abort(f'wat2wasm failed with exit code {res.exitcode}')
     log.info(f'Successfully converted wat to wasm')
 
+# native: encode the binary format directly (common.wasmBinary)
+# wat2wasm: convert the textual format with wat2wasm
+# check: encode directly and check that wat2wasm produces the same binary
+type WasmEncoder = Literal['native', 'wat2wasm', 'check']
+
 @dataclass(frozen=True)
 class Args:
     input: str
-    output: str
+    output: str # not used by compileInMemory
     wat2wasm: str = 'wat2wasm'
     maxMemSize: Optional[int] = None
     maxArraySize: Optional[int] = None
     maxRegisters: Optional[int] = None
+    wat: Optional[str] = None # only used by compileInMemory
+    wasmEncoder: WasmEncoder = 'wat2wasm'
+    watStyle: WatStyle = 'pretty'
+
+def compilerConfig(args: Args) -> CompilerConfig:
+    return CompilerConfig(maxMemSize=args.maxMemSize or CompilerConfig.defaultMaxMemSize,
+                          maxArraySize=args.maxArraySize or CompilerConfig.defaultMaxArraySize)
 
 def compileMain(args: Args, compileFun: CompileFun, astMod: Any) -> WasmModule:
     output = args.output
     outputBase, outputExt = shell.splitExt(output)
     outputWat = outputBase + '.wat'
-    if outputExt not in ['.wat', '.wasm', '.as']:
-        utils.abort(f'Extension of output file must be .wat or .wasm or .as')
-    cfg = CompilerConfig(maxMemSize=args.maxMemSize or CompilerConfig.defaultMaxMemSize,
-                         maxArraySize=args.maxArraySize or CompilerConfig.defaultMaxArraySize)
-    wasmMod = compileToWat(compileFun, astMod, cfg, args.input, outputWat)
+    if outputExt not in ['.wat', '.wasm']:
+        utils.abort(f'Extension of output file must be .wat or .wasm')
+    cfg = compilerConfig(args)
+    wasmMod = compileToWat(compileFun, astMod, cfg, args.input, outputWat, args.watStyle)
     if outputExt == '.wat':
         return wasmMod
     outputBin = outputBase + '.wasm'
-    wat2wasm(args.wat2wasm, outputWat, outputBin)
+    if args.wasmEncoder == 'native':
+        writeWasm(wasmMod, outputBin)
+    elif args.wasmEncoder == 'check':
+        writeWasm(wasmMod, outputBin)
+        checkWasm(args.wat2wasm, outputWat, outputBin)
+    else:
+        wat2wasm(args.wat2wasm, outputWat, outputBin)
     return wasmMod
 
-
+def compileInMemory(args: Args, compileFun: CompileFun, astMod: Any) -> WasmModule:
+    """
+    Compiles args.input for backends that work on the wasm module, without rendering
+    it or writing any files. Only writes the textual representation to args.wat if
+    given.
+    """
+    wasmMod = compileToModule(compileFun, astMod, compilerConfig(args), args.input)
+    if args.wat is not None:
+        writeWat(wasmMod, args.wat, args.watStyle)
+    return wasmMod
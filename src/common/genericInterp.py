@@ -1,6 +1,9 @@
 import common.genericParser as parser
 import common.log as log
 import common.compilerSupport as compilerSupport
+import common.interpIO as interpIO
+import common.profiler as profiler
+from common.compilerSupport import CompilerConfig
 import common.constants as constants
 from typing import *
 import inspect
@@ -11,14 +14,40 @@ import sys
 @dataclass(frozen=True)
 class Args:
     filename: str
+    maxMemSize: Optional[int] = None
+    maxArraySize: Optional[int] = None
+    profile: Optional[str] = None # file for the profiler report
 
-def interpMain(args: Args, interpFun: Callable[[Any], None], astMod: Any):
+class ArraySizeError(Exception):
+    """
+    An array is too large for CompilerConfig.maxArraySize or has a negative size.
+    """
+
+class OutOfMemoryError(Exception):
+    """
+    The live arrays do not fit into CompilerConfig.maxMemSize.
+    """
+
+def interpMain(args: Args, interpFun: Callable[[Any, CompilerConfig], None], astMod: Any):
     ast = parser.parseFile(args.filename, astMod)
-    log.info(f'Interpreting AST with {interpFun} from file {inspect.getmodule(interpFun)}')
+    # interpFun might be a functools.partial with engine-specific options
+    log.info(f'Interpreting AST with {interpFun} from file ' \
+             f'{inspect.getmodule(getattr(interpFun, "func", interpFun))}')
+    cfg = CompilerConfig(maxMemSize=args.maxMemSize or CompilerConfig.defaultMaxMemSize,
+                         maxArraySize=args.maxArraySize or CompilerConfig.defaultMaxArraySize)
+    prof = profiler.start() if args.profile else None
     try:
-        interpFun(ast)
+        interpFun(ast, cfg)
     except compilerSupport.CompileError as e:
+        interpIO.flush()
         e.displayAndDie()
     except Exception:
+        interpIO.flush()
         traceback.print_exc()
         sys.exit(constants.RUN_ERROR_EXIT_CODE)
+    finally:
+        if args.profile and prof:
+            profiler.stop()
+            prof.writeReport(args.profile, args.filename)
+            log.info(f'Wrote profile to {args.profile} and {profiler.collapsedFile(args.profile)}')
+    interpIO.flush()
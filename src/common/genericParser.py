@@ -3,11 +3,13 @@ import ast
 import common.utils as utils
 from common.utils import abort
 import common.log as log
+import common.parseCache as parseCache
 import pprint
 import common.constants as constants
 from common.constants import Language
 import parsers.common as p
 import dataclasses
+import gc
 
 # Display the AST of some python code:
 # print(ast.dump(ast.parse('5 * [1]', mode='eval'), indent=4))    # or mode='exec'
@@ -15,189 +17,371 @@ import dataclasses
 def pp(x: Any):
     return ast.dump(x)
 
-def unsupported(x: str):
+def ppAst(x: Any) -> str:
+    try:
+        return pprint.pformat(x)
+    except RecursionError:
+        return '<too deeply nested for printing>'
+
+def unsupported(x: str) -> Never:
     raise Exception(f'Parser does not support the following construct: {x}')
 
-def transUnOp(op: ast.unaryop, m: Any) -> Any:
-    match op:
-        case ast.USub():
-            return m.USub()
-        case ast.Not():
-            return m.Not()
-        case _:
-            unsupported(f'unary operator {pp(op)}')
-
-def transBinOp(op: ast.operator, m: Any) -> Any:
-    match op:
-        case ast.Add(): return m.Add()
-        case ast.Sub(): return m.Sub()
-        case ast.Mult(): return m.Mul()
-        case _:
-            unsupported(f'binary operator {pp(op)}')
-
-def transCompOp(op: ast.cmpop, m: Any) -> Any:
-    match op:
-        case ast.Eq(): return m.Eq()
-        case ast.NotEq(): return m.NotEq()
-        case ast.Lt(): return m.Less()
-        case ast.LtE(): return m.LessEq()
-        case ast.Gt(): return m.Greater()
-        case ast.GtE(): return m.GreaterEq()
-        case ast.Is(): return m.Is()
-        case _:
-            unsupported(f'comparison operator {pp(op)}')
-
-def transBoolOp(op: ast.boolop, m: Any) -> Any:
-    match op:
-        case ast.And(): return m.And()
-        case ast.Or(): return m.Or()
-        case _:
-            unsupported(f'bool operator {pp(op)}')
-
-def transExp(e: ast.expr, m: Any, lang: Language) -> Any:
-    # log.debug(f'Parsing {pp(e)}')
-    match e:
-        case ast.Constant(c):
-            if type(c) is int:
-                return m.IntConst(c)
-            elif type(c) is bool:
-                return m.BoolConst(c)
-            elif type(c) is str:
-                unsupported(f'string constant {repr(c)}')
-            elif type(c) is float:
-                unsupported(f'float constant {repr(c)}')
-            else:
-                unsupported(f'constant {c}')
-        case ast.Name(v, _):
-            return m.Name(m.Ident(v))
-        case ast.Call(ast.Name(f, _), args, []) if lang != 'fun':
-            fun = m.Ident(f)
-            return m.Call(fun, [transExp(e, m, lang) for e in args])
-        case ast.Call(exp, args, []) if lang == 'fun':
-            fun = transExp(exp, m, lang)
-            return m.Call(fun, [transExp(e, m, lang) for e in args])
-        case ast.UnaryOp(op, e):
-            return m.UnOp(transUnOp(op, m), transExp(e, m, lang))
-        case ast.BinOp(size, ast.Mult(), ast.List(l)):
-            match l:
-                case [e]:
-                    return m.ArrayInitDyn(transExp(size, m, lang), transExp(e, m, lang))
-                case _:
-                    unsupported(f'dynamic array initialization with not exactly one initial value')
-        case ast.BinOp(left, op, right):
-            return m.BinOp(transExp(left, m, lang), transBinOp(op, m), transExp(right, m, lang))
-        case ast.IfExp(cond, thenExp, elseExp):
-            return m.CondExp(transExp(cond, m, lang), transExp(thenExp, m, lang), transExp(elseExp, m, lang))
-        case ast.Compare(left, [op], [right]):
-            return m.BinOp(transExp(left, m, lang), transCompOp(op, m), transExp(right, m, lang))
-        case ast.BoolOp(op, [left, right]):
-            return m.BinOp(transExp(left, m, lang), transBoolOp(op, m), transExp(right, m, lang))
-        case ast.List(es):
-            return m.ArrayInitStatic([transExp(e, m, lang) for e in es])
-        case ast.Subscript(e, idx):
-            return m.Subscript(transExp(e, m, lang), transExp(idx, m, lang))
-        case _:
-            unsupported(f'expression {pp(e)}')
-
-def transStmt(s: ast.stmt, m: Any, lang: Language) -> Any:
-    match s:
-        case ast.Assign([ast.Name(x)], e):
-            return m.Assign(m.Ident(x), transExp(e, m, lang))
-        case ast.Assign([ast.Subscript(leftExp, idx)], rightExp):
-            return m.SubscriptAssign(transExp(leftExp, m, lang),
-                                     transExp(idx, m, lang),
-                                     transExp(rightExp, m, lang))
-        case ast.Expr(e):
-            return m.StmtExp(transExp(e, m, lang))
-        case ast.If(cond, thenBody, elseBody):
-            return m.IfStmt(transExp(cond, m, lang), transStmts(thenBody, m, lang), transStmts(elseBody, m, lang))
-        case ast.While(cond, body, []):
-            return m.WhileStmt(transExp(cond, m, lang), transStmts(body, m, lang))
-        case ast.FunctionDef(name, ast.arguments([], args, None, [], [], None, []), body, [], ret):
-            return m.FunDef(m.Ident(name), [transArg(a, m) for a in args],
-                            transResultTy(ret, m), transStmts(body, m, lang))
-        case ast.Return(e):
-            if e is not None:
-                return m.Return(transExp(e, m, lang))
-            else:
-                return m.Return(None)
-        case _:
+# Builds the node of an expression from the python expression and the already
+# translated subexpressions
+type Build = Callable[[Any, list[Any]], Any]
+
+class BuildTask:
+    __slots__ = ('e', 'build', 'arity')
+    def __init__(self, e: ast.expr, build: Build, arity: int):
+        self.e = e
+        self.build = build
+        self.arity = arity
+
+class Translator:
+    """
+    Translates python ASTs into ASTs of the ASDL module m for language lang. The
+    constructors of m and the translation functions for the python node types are
+    looked up once, when the translator is created.
+
+    Expressions are translated with an explicit work stack, so deeply nested
+    expressions do not exhaust the python stack. Statements are translated recursively,
+    python limits their nesting.
+    """
+    def __init__(self, m: Any, lang: Language):
+        self.lang = lang
+        self.IntConst = self.ctor(m, 'IntConst')
+        self.BoolConst = self.ctor(m, 'BoolConst')
+        self.Name = self.ctor(m, 'Name')
+        self.Ident = self.ctor(m, 'Ident')
+        self.Call = self.ctor(m, 'Call')
+        self.UnOp = self.ctor(m, 'UnOp')
+        self.BinOp = self.ctor(m, 'BinOp')
+        self.CondExp = self.ctor(m, 'CondExp')
+        self.ArrayInitDyn = self.ctor(m, 'ArrayInitDyn')
+        self.ArrayInitStatic = self.ctor(m, 'ArrayInitStatic')
+        self.Subscript = self.ctor(m, 'Subscript')
+        self.Assign = self.ctor(m, 'Assign')
+        self.SubscriptAssign = self.ctor(m, 'SubscriptAssign')
+        self.StmtExp = self.ctor(m, 'StmtExp')
+        self.IfStmt = self.ctor(m, 'IfStmt')
+        self.WhileStmt = self.ctor(m, 'WhileStmt')
+        self.FunDef = self.ctor(m, 'FunDef')
+        # The class itself, ctor may return a function raising an error instead
+        self.FunDefCls: Optional[type[Any]] = getattr(m, 'FunDef', None)
+        self.FunParam = self.ctor(m, 'FunParam')
+        self.Return = self.ctor(m, 'Return')
+        self.Module = self.ctor(m, 'Module')
+        self.Void = self.ctor(m, 'Void')
+        self.NotVoid = self.ctor(m, 'NotVoid')
+        self.Int = self.ctor(m, 'Int')
+        self.Bool = self.ctor(m, 'Bool')
+        self.Array = self.ctor(m, 'Array')
+        self.Fun = self.ctor(m, 'Fun')
+        self.unOps: dict[type, Callable[[], Any]] = {
+            ast.USub: self.ctor(m, 'USub'),
+            ast.Not: self.ctor(m, 'Not')
+        }
+        self.binOps: dict[type, Callable[[], Any]] = {
+            ast.Add: self.ctor(m, 'Add'),
+            ast.Sub: self.ctor(m, 'Sub'),
+            ast.Mult: self.ctor(m, 'Mul')
+        }
+        self.compOps: dict[type, Callable[[], Any]] = {
+            ast.Eq: self.ctor(m, 'Eq'),
+            ast.NotEq: self.ctor(m, 'NotEq'),
+            ast.Lt: self.ctor(m, 'Less'),
+            ast.LtE: self.ctor(m, 'LessEq'),
+            ast.Gt: self.ctor(m, 'Greater'),
+            ast.GtE: self.ctor(m, 'GreaterEq'),
+            ast.Is: self.ctor(m, 'Is')
+        }
+        self.boolOps: dict[type, Callable[[], Any]] = {
+            ast.And: self.ctor(m, 'And'),
+            ast.Or: self.ctor(m, 'Or')
+        }
+        # Expressions without subexpressions
+        self.leaves: dict[type, Callable[[Any], Any]] = {
+            ast.Constant: self.transConstant,
+            ast.Name: self.transName
+        }
+        # Other expressions: returns the subexpressions and how to build the node
+        self.inner: dict[type, Callable[[Any], tuple[list[ast.expr], Build]]] = {
+            ast.Call: self.callFun if lang == 'fun' else self.callName,
+            ast.UnaryOp: self.unaryOp,
+            ast.BinOp: self.binOp,
+            ast.IfExp: self.ifExp,
+            ast.Compare: self.compare,
+            ast.BoolOp: self.boolOp,
+            ast.List: self.arrayStatic,
+            ast.Subscript: self.subscript
+        }
+        self.stmts: dict[type, Callable[[Any], Any]] = {
+            ast.Assign: self.transAssign,
+            ast.Expr: self.transExpr,
+            ast.If: self.transIf,
+            ast.While: self.transWhile,
+            ast.FunctionDef: self.transFunctionDef,
+            ast.Return: self.transReturn
+        }
+
+    def ctor(self, m: Any, name: str) -> Callable[..., Any]:
+        c = getattr(m, name, None)
+        if c is not None:
+            return c
+        lang = self.lang
+        def missing(*args: Any) -> Never:
+            abort(f'Language {lang} does not support AST node {name}')
+        return missing
+
+    def transOp(self, table: dict[type[Any], Callable[[], Any]], op: Any, kind: str) -> Any:
+        c = table.get(cast(type[Any], type(op)))
+        if c is None:
+            unsupported(f'{kind} operator {pp(op)}')
+        return c()
+
+    def transConstant(self, e: ast.Constant) -> Any:
+        c = e.value
+        if type(c) is int:
+            return self.IntConst(c)
+        elif type(c) is bool:
+            return self.BoolConst(c)
+        elif type(c) is str:
+            unsupported(f'string constant {repr(c)}')
+        elif type(c) is float:
+            unsupported(f'float constant {repr(c)}')
+        else:
+            unsupported(f'constant {c}')
+
+    def transName(self, e: ast.Name) -> Any:
+        return self.Name(self.Ident(e.id))
+
+    def callName(self, e: ast.Call) -> tuple[list[ast.expr], Build]:
+        match e:
+            case ast.Call(ast.Name(f, _), args, []):
+                return (args, lambda _e, xs: self.Call(self.Ident(f), xs))
+            case _:
+                unsupported(f'expression {pp(e)}')
+
+    def callFun(self, e: ast.Call) -> tuple[list[ast.expr], Build]:
+        match e:
+            case ast.Call(exp, args, []):
+                return ([exp] + args, lambda _e, xs: self.Call(xs[0], xs[1:]))
+            case _:
+                unsupported(f'expression {pp(e)}')
+
+    def unaryOp(self, e: ast.UnaryOp) -> tuple[list[ast.expr], Build]:
+        return ([e.operand], self.buildUnaryOp)
+
+    def buildUnaryOp(self, e: ast.UnaryOp, xs: list[Any]) -> Any:
+        return self.UnOp(self.transOp(self.unOps, e.op, 'unary'), xs[0])
+
+    def binOp(self, e: ast.BinOp) -> tuple[list[ast.expr], Build]:
+        match e:
+            case ast.BinOp(size, ast.Mult(), ast.List(l)):
+                match l:
+                    case [elem]:
+                        return ([size, elem], lambda _e, xs: self.ArrayInitDyn(xs[0], xs[1]))
+                    case _:
+                        unsupported(f'dynamic array initialization with not exactly one initial value')
+            case _:
+                return ([e.left, e.right], self.buildBinOp)
+
+    def buildBinOp(self, e: ast.BinOp, xs: list[Any]) -> Any:
+        return self.BinOp(xs[0], self.transOp(self.binOps, e.op, 'binary'), xs[1])
+
+    def ifExp(self, e: ast.IfExp) -> tuple[list[ast.expr], Build]:
+        return ([e.test, e.body, e.orelse], lambda _e, xs: self.CondExp(xs[0], xs[1], xs[2]))
+
+    def compare(self, e: ast.Compare) -> tuple[list[ast.expr], Build]:
+        match e:
+            case ast.Compare(left, [_], [right]):
+                return ([left, right], self.buildCompare)
+            case _:
+                unsupported(f'expression {pp(e)}')
+
+    def buildCompare(self, e: ast.Compare, xs: list[Any]) -> Any:
+        return self.BinOp(xs[0], self.transOp(self.compOps, e.ops[0], 'comparison'), xs[1])
+
+    def boolOp(self, e: ast.BoolOp) -> tuple[list[ast.expr], Build]:
+        match e:
+            case ast.BoolOp(_, [left, right]):
+                return ([left, right], self.buildBoolOp)
+            case _:
+                unsupported(f'expression {pp(e)}')
+
+    def buildBoolOp(self, e: ast.BoolOp, xs: list[Any]) -> Any:
+        return self.BinOp(xs[0], self.transOp(self.boolOps, e.op, 'bool'), xs[1])
+
+    def arrayStatic(self, e: ast.List) -> tuple[list[ast.expr], Build]:
+        return (e.elts, lambda _e, xs: self.ArrayInitStatic(xs))
+
+    def subscript(self, e: ast.Subscript) -> tuple[list[ast.expr], Build]:
+        return ([e.value, e.slice], lambda _e, xs: self.Subscript(xs[0], xs[1]))
+
+    def transExp(self, e: ast.expr) -> Any:
+        # Holds expressions still to translate and nodes to build from the last
+        # results, the next item is on top
+        todo: list[ast.expr | BuildTask] = [e]
+        results: list[Any] = []
+        leaves = self.leaves
+        inner = self.inner
+        while todo:
+            x = todo.pop()
+            if type(x) is BuildTask:
+                n = x.arity
+                if n == 0:
+                    xs = []
+                else:
+                    xs = results[-n:]
+                    del results[-n:]
+                results.append(x.build(x.e, xs))
+                continue
+            x = cast(ast.expr, x)
+            leaf = leaves.get(type(x))
+            if leaf is not None:
+                results.append(leaf(x))
+                continue
+            node = inner.get(type(x))
+            if node is None:
+                unsupported(f'expression {pp(x)}')
+            (subExps, build) = node(x)
+            todo.append(BuildTask(x, build, len(subExps)))
+            todo.extend(reversed(subExps))
+        return results[0]
+
+    def transStmt(self, s: ast.stmt) -> Any:
+        t = self.stmts.get(type(s))
+        if t is None:
             unsupported(f'statement {pp(s)}')
+        x = t(s)
+        x.lineno = s.lineno
+        return x
+
+    def transAssign(self, s: ast.Assign) -> Any:
+        match s:
+            case ast.Assign([ast.Name(x)], e):
+                return self.Assign(self.Ident(x), self.transExp(e))
+            case ast.Assign([ast.Subscript(leftExp, idx)], rightExp):
+                return self.SubscriptAssign(self.transExp(leftExp),
+                                            self.transExp(idx),
+                                            self.transExp(rightExp))
+            case _:
+                unsupported(f'statement {pp(s)}')
+
+    def transExpr(self, s: ast.Expr) -> Any:
+        return self.StmtExp(self.transExp(s.value))
+
+    def transIf(self, s: ast.If) -> Any:
+        return self.IfStmt(self.transExp(s.test), self.transStmts(s.body),
+                           self.transStmts(s.orelse))
+
+    def transWhile(self, s: ast.While) -> Any:
+        match s:
+            case ast.While(cond, body, []):
+                return self.WhileStmt(self.transExp(cond), self.transStmts(body))
+            case _:
+                unsupported(f'statement {pp(s)}')
+
+    def transFunctionDef(self, s: ast.FunctionDef) -> Any:
+        match s:
+            case ast.FunctionDef(name, ast.arguments([], args, None, [], [], None, []), body, [], ret):
+                return self.FunDef(self.Ident(name), [self.transArg(a) for a in args],
+                                   self.transResultTy(ret), self.transStmts(body))
+            case _:
+                unsupported(f'statement {pp(s)}')
+
+    def transReturn(self, s: ast.Return) -> Any:
+        if s.value is not None:
+            return self.Return(self.transExp(s.value))
+        else:
+            return self.Return(None)
+
+    def transArg(self, a: ast.arg) -> Any:
+        return self.FunParam(self.Ident(a.arg), self.transTy(a.annotation))
 
-def transArg(a: ast.arg, m: Any) -> Any:
-    match a:
-        case ast.arg(name, ty):
-            return m.FunParam(m.Ident(name), transTy(ty, m))
-
-def transResultTy(t: ast.expr | None, m: Any) -> Any:
-    match t:
-        case ast.Constant(None):
-            return m.Void()
-        case _:
-            return m.NotVoid(transTy(t, m))
-
-def transTy(t: ast.expr | None, m: Any) -> Any:
-    match t:
-        case ast.Constant(None):
-            abort('None type not allowed here')
-        case ast.Name(x, _):
-            match x:
-                case 'int': return m.Int()
-                case 'bool': return m.Bool()
-                case _: unsupported(f'type {pp(t)}')
-        case ast.Subscript(ast.Name('list'), arg):
-            return m.Array(transTy(arg, m))
-        case ast.Subscript(ast.Name('Callable'), ast.Tuple([ast.List(args), res])):
-            return m.Fun([transTy(a, m) for a in args], transResultTy(res, m))
-        case _:
-            unsupported(f'type {pp(t)}')
-
-def transStmts(ss: Iterable[ast.stmt], m: Any, lang: Language) -> Any:
-    match list(ss):
-        case [ast.Pass()]: return []
-        case l:
-            return [transStmt(s, m, lang) for s in l]
-
-def transModule(module: ast.mod, m: Any, lang: Language) -> Any:
-    match module:
-        case ast.Module(stmts, _):
-            newStmts: list[Any] = []
-            funDefs: list[Any] = []
-            if lang == 'fun':
-                for s in transStmts(stmts, m, lang):
-                    match s:
-                        case m.FunDef():
+    def transResultTy(self, t: ast.expr | None) -> Any:
+        match t:
+            case ast.Constant(None):
+                return self.Void()
+            case _:
+                return self.NotVoid(self.transTy(t))
+
+    def transTy(self, t: ast.expr | None) -> Any:
+        match t:
+            case ast.Constant(None):
+                abort('None type not allowed here')
+            case ast.Name(x, _):
+                match x:
+                    case 'int': return self.Int()
+                    case 'bool': return self.Bool()
+                    case _: unsupported(f'type {pp(t)}')
+            case ast.Subscript(ast.Name('list'), arg):
+                return self.Array(self.transTy(arg))
+            case ast.Subscript(ast.Name('Callable'), ast.Tuple([ast.List(args), res])):
+                return self.Fun([self.transTy(a) for a in args], self.transResultTy(res))
+            case _:
+                unsupported(f'type {pp(t)}')
+
+    def transStmts(self, ss: Iterable[ast.stmt]) -> Any:
+        match list(ss):
+            case [ast.Pass()]: return []
+            case l:
+                return [self.transStmt(s) for s in l]
+
+    def transModule(self, module: ast.mod) -> Any:
+        match module:
+            case ast.Module(stmts, _):
+                if self.lang == 'fun':
+                    funDefCls = utils.assertNotNone(self.FunDefCls)
+                    newStmts: list[Any] = []
+                    funDefs: list[Any] = []
+                    for s in self.transStmts(stmts):
+                        if isinstance(s, funDefCls):
                             funDefs.append(s)
-                        case _:
+                        else:
                             newStmts.append(s)
-                return m.Module(funDefs, newStmts)
-            else:
-                return m.Module(transStmts(stmts, m, lang))
-        case _:
-            unsupported(f'construct at module level: {pp(module)}')
-
-class ModWrapper:
-    def __init__(self, mod: Any, lang: Language):
-        self.mod = mod
-        self.lang = lang
-    def __getattr__(self, name: str) -> Any:
-        try:
-            return getattr(self.mod, name)
-        except AttributeError:
-            abort(f'Language {self.lang} does not support AST node {name}')
+                    return self.Module(funDefs, newStmts)
+                else:
+                    return self.Module(self.transStmts(stmts))
+            case _:
+                unsupported(f'construct at module level: {pp(module)}')
+
+_translators: dict[str, Translator] = {}
+
+def translator(m: Any) -> Translator:
+    """
+    Returns the translator for the ASDL module m.
+    """
+    modName: str = m.__name__
+    t = _translators.get(modName)
+    if t is None:
+        l = utils.stripPrefix('lang_', modName[:modName.index('.')])
+        t = Translator(m, constants.asLanguage(l))
+        _translators[modName] = t
+    return t
 
 def parseFile(filename: str, m: Any) -> Any:
     log.info(f'Parsing {filename} with ast module {m}')
-    modName: str = m.__name__
-    l = utils.stripPrefix('lang_', modName[:modName.index('.')])
-    lang = constants.asLanguage(l)
     with open(filename, 'r') as f:
         src = f.read()
-        module = ast.parse(src, filename)
-        w = ModWrapper(m, lang)
-        x = transModule(module, w, lang)
-        log.debug(f'AST: {pprint.pformat(x)}')
-        return x
+    k = parseCache.key(src, m) if parseCache.enabled() else None
+    x = parseCache.load(k) if k is not None else None
+    if x is None:
+        # The python AST and the translated AST have no cycles, but building them
+        # triggers many garbage collections, each traversing both ASTs
+        gcEnabled = gc.isenabled()
+        gc.disable()
+        try:
+            module = ast.parse(src, filename)
+            x = translator(m).transModule(module)
+        finally:
+            if gcEnabled:
+                gc.enable()
+        if k is not None:
+            parseCache.store(k, x)
+        log.debug(lambda: f'AST: {ppAst(x)}')
+    x.filename = filename
+    return x
 
 ParserArgs = p.ParserArgs
 
@@ -0,0 +1,112 @@
+"""
+Buffered input and output for the interpreters.
+
+input_int reads stdin in chunks and splits them into lines, each line holds one int.
+A chunk is what is available on stdin, up to CHUNK_SIZE bytes, so reading never waits
+for more input than the next line. print collects the output and writes it in large
+chunks. The output is flushed before reading blocks, as the input might depend on it
+(e.g. a driver that reads the output of the program before sending the next input).
+Call flush before the program ends or before reporting an error, so that the output so
+far is not lost. Output still buffered at exit is flushed by an atexit handler.
+
+Both buffers are tied to the current sys.stdin and sys.stdout. If one of them is
+replaced (e.g. to capture the output of a program), new buffers are created.
+"""
+import atexit
+import codecs
+import io
+import sys
+from typing import *
+import common.utils as utils
+
+CHUNK_SIZE = 64 * 1024
+
+class _Input:
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        # Streams without binary buffer (e.g. io.StringIO) do not block
+        self.buffer: Optional[io.BufferedReader] = getattr(stream, 'buffer', None)
+        self.decoder = codecs.getincrementaldecoder(stream.encoding or 'utf-8')()
+        self.lines: list[str] = []
+        self.pos = 0
+        # Incomplete line at the end of the last chunk
+        self.rest = ''
+    def readChunk(self) -> str:
+        if self.buffer is None:
+            return self.stream.read(CHUNK_SIZE)
+        flush()
+        while True:
+            data = self.buffer.read1(CHUNK_SIZE)
+            text = self.decoder.decode(data, final=not data)
+            # Incomplete characters at the end of data are decoded with the next chunk
+            if text or not data:
+                return text
+    def nextLine(self) -> str:
+        while self.pos >= len(self.lines):
+            chunk = self.readChunk()
+            if not chunk:
+                if not self.rest:
+                    raise EOFError('EOF when reading an int')
+                self.lines = [self.rest]
+                self.rest = ''
+            else:
+                self.lines = (self.rest + chunk).split('\n')
+                self.rest = self.lines.pop()
+            self.pos = 0
+        line = self.lines[self.pos]
+        self.pos += 1
+        return line
+
+class _Output:
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.parts: list[str] = []
+        self.size = 0
+    def write(self, s: str):
+        self.parts.append(s)
+        self.size += len(s)
+        if self.size >= CHUNK_SIZE:
+            self.flush()
+    def flush(self):
+        if self.parts:
+            self.stream.write(''.join(self.parts))
+            self.parts = []
+            self.size = 0
+        self.stream.flush()
+
+_input: Optional[_Input] = None
+_output: Optional[_Output] = None
+
+def _getOutput() -> _Output:
+    global _output
+    if _output is None or _output.stream is not sys.stdout:
+        if _output is not None:
+            _output.flush()
+        _output = _Output(sys.stdout)
+    return _output
+
+def inputInt(prompt: str) -> int:
+    global _input
+    if sys.stdin.isatty():
+        # Interactive use: the user must see the output and the prompt
+        flush()
+        return utils.inputInt(prompt)
+    if _input is None or _input.stream is not sys.stdin:
+        _input = _Input(sys.stdin)
+    s = _input.nextLine()
+    try:
+        return int(s)
+    except ValueError:
+        raise ValueError(f'input read from stdin was not integer: {s}')
+
+def printValue(v: Any):
+    _getOutput().write(f'{v}\n')
+
+def flush():
+    global _output
+    if _output is not None:
+        _output.flush()
+        # The stream might be closed before the next output, e.g. when capturing stdout
+        _output = None
+
+atexit.register(flush)
@@ -1,16 +1,19 @@
 import logging
 import sys
+from typing import *
 import common.utils as utils
 import lark
 
-def _setupLogging(consoleLevel: int, logfile: str|None):
+def _setupLogging(consoleLevel: int, logfile: str|None, fileLevel: int):
     log = logging.getLogger('minipy')
-    _setupLoggingForLogger(log, consoleLevel, logfile)
-    _setupLoggingForLogger(lark.logger, consoleLevel, logfile)
+    _setupLoggingForLogger(log, consoleLevel, logfile, fileLevel)
+    _setupLoggingForLogger(lark.logger, consoleLevel, logfile, fileLevel)
     return log
 
-def _setupLoggingForLogger(log: logging.Logger, consoleLevel: int, logfile: str|None):
-    log.setLevel(logging.DEBUG)
+def _setupLoggingForLogger(log: logging.Logger, consoleLevel: int, logfile: str|None,
+                           fileLevel: int):
+    # The logger drops messages below the level of all handlers before formatting them
+    log.setLevel(min(consoleLevel, fileLevel) if logfile is not None else consoleLevel)
     fmt = logging.Formatter('[%(asctime)s %(levelname)s %(filename)s:%(lineno)d] %(message)s',
                             datefmt='%Y-%m-%dT%H:%M:%S')
     consoleH = logging.StreamHandler()
@@ -19,12 +22,15 @@ def _setupLoggingForLogger(log: logging.Logger, consoleLevel: int, logfile: str|
     log.addHandler(consoleH)
     if logfile is not None:
         fileH = logging.FileHandler(filename=logfile, mode='w', encoding='utf-8')
-        fileH.setLevel(logging.DEBUG)
+        fileH.setLevel(fileLevel)
         fileH.setFormatter(fmt)
         log.addHandler(fileH)
     return log
 
-_log = _setupLogging(logging.WARNING, None)
+_log = _setupLogging(logging.WARNING, None, logging.DEBUG)
+
+# Level that turns off logging
+OFF = logging.CRITICAL + 10
 
 def resolveLevelName(s: str) -> int:
     s = s.lower()
@@ -33,6 +39,7 @@ def resolveLevelName(s: str) -> int:
         case "info": return logging.INFO
         case "warn": return logging.WARNING
         case "error": return logging.ERROR
+        case "off": return OFF
         case _:
             utils.abort(f"Invalid log level: {s}")
 
@@ -40,27 +47,47 @@ def removeAllHandlers(log: logging.Logger):
     for h in log.handlers[:]:
         log.removeHandler(h)
 
-def init(level: int, filename: str):
+def init(level: int, filename: str|None, fileLevel: int = logging.DEBUG):
+    """
+    Logs messages of at least the given level to stderr and messages of at least
+    fileLevel to filename (no log file if filename is None).
+    """
     global _log
     if _log:
         removeAllHandlers(_log)
     removeAllHandlers(lark.logger)
-    _log = _setupLogging(level, filename)
+    _log = _setupLogging(level, filename, fileLevel)
+
+def isEnabled(level: int) -> bool:
+    return _log.isEnabledFor(level)
+
+STACKLEVEL=3
+
+# A message is either a string, which is %-formatted with the arguments of the log
+# call, or a function returning the message. Both are only formatted or called if the
+# message is logged, so expensive messages should be passed as functions.
+type Msg = str | Callable[[], str]
 
-STACKLEVEL=2
+def _logMsg(level: int, s: Msg, args: tuple[Any, ...]):
+    if not _log.isEnabledFor(level):
+        return
+    if callable(s):
+        _log.log(level, '%s', s(), stacklevel=STACKLEVEL)
+    else:
+        _log.log(level, s, *args, stacklevel=STACKLEVEL)
 
-def debug(s: str):
-    _log.debug(s, stacklevel=STACKLEVEL)
+def debug(s: Msg, *args: Any):
+    _logMsg(logging.DEBUG, s, args)
 
-def info(s: str):
-    _log.info(s, stacklevel=STACKLEVEL)
+def info(s: Msg, *args: Any):
+    _logMsg(logging.INFO, s, args)
 
-def warn(s: str):
-    _log.warn(s, stacklevel=STACKLEVEL)
+def warn(s: Msg, *args: Any):
+    _logMsg(logging.WARNING, s, args)
 
-def error(s: str):
-    _log.error(s, stacklevel=STACKLEVEL)
+def error(s: Msg, *args: Any):
+    _logMsg(logging.ERROR, s, args)
 
 def abort(s: str):
-    _log.error(s, stacklevel=STACKLEVEL)
+    _log.error(s, stacklevel=2)
     sys.exit(1)
@@ -0,0 +1,135 @@
+"""
+On-disk cache for parsing source files (main.py --parse-cache DIR).
+
+The key of a source file is a hash of its content, of the name of the target ASDL
+module, and of the version of the parser: the source code of genericParser, of the
+ASDL module and of the python interpreter. An entry stores the translated ASDL AST as
+a pickle, so a hit skips reading the python AST and translating it. Entries are
+independent of the name of the source file.
+
+The size of the cache directory is bounded: after storing an entry, the least recently
+used entries are removed until the directory holds at most 3/4 of the maximum size.
+Each hit updates the modification time of the entry. Entries are written atomically,
+so several processes can share a cache directory.
+"""
+from typing import *
+import common.log as log
+import common.utils as utils
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_cacheDir: Optional[str] = None
+_maxBytes: int = DEFAULT_MAX_BYTES
+_parserHashes: dict[str, str] = {}
+
+def enable(cacheDir: Optional[str], maxBytes: int = DEFAULT_MAX_BYTES):
+    global _cacheDir, _maxBytes
+    _cacheDir = cacheDir
+    _maxBytes = maxBytes
+
+def enabled() -> bool:
+    return _cacheDir is not None
+
+def parserHash(m: Any) -> str:
+    """
+    Hash of the source code of the parser and of the ASDL module m (including the module
+    with the common definitions, if any).
+    """
+    modName: str = m.__name__
+    h = _parserHashes.get(modName)
+    if h is None:
+        import common.genericParser as genericParser
+        mods = [genericParser, m]
+        common = sys.modules.get(modName + 'Common')
+        if common is not None:
+            mods.append(common)
+        files = [utils.assertNotNone(x.__file__) for x in mods]
+        h = ' '.join([sys.version] + [utils.md5(f) for f in files])
+        _parserHashes[modName] = h
+    return h
+
+def key(src: str, m: Any) -> str:
+    data = '\0'.join([parserHash(m), m.__name__, src])
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+def cacheFile(k: str) -> str:
+    return os.path.join(utils.assertNotNone(_cacheDir), 'parse', k[:2], k + '.pickle')
+
+def load(k: str) -> Any:
+    """
+    Returns the AST stored under key k, or None.
+    """
+    file = cacheFile(k)
+    try:
+        with open(file, 'rb') as h:
+            x = pickle.load(h)
+    except FileNotFoundError:
+        log.debug(f'Parse cache miss for key {k}')
+        return None
+    except Exception as e:
+        log.warn(f'Ignoring broken parse cache entry {file}: {e}')
+        return None
+    try:
+        os.utime(file)
+    except OSError:
+        # Removed by another process in the meantime
+        pass
+    log.debug(f'Parse cache hit for key {k}')
+    return x
+
+def store(k: str, x: Any):
+    file = cacheFile(k)
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    # Other processes must never see a partially written file
+    (fd, tmp) = tempfile.mkstemp(dir=os.path.dirname(file), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as h:
+            pickle.dump(x, h, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, file)
+    except RecursionError:
+        # pickle is recursive, the AST of deeply nested expressions is not cached
+        os.unlink(tmp)
+        log.info('AST too deep for the parse cache')
+        return
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    evict(file)
+
+def evict(keep: str):
+    """
+    Removes the least recently used entries, except keep, if the cache is larger than
+    the maximum size.
+    """
+    entries: list[tuple[float, int, str]] = []
+    total = 0
+    for root, _dirs, files in os.walk(os.path.join(utils.assertNotNone(_cacheDir), 'parse')):
+        for f in files:
+            if not f.endswith('.pickle'):
+                continue
+            path = os.path.join(root, f)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+    if total <= _maxBytes:
+        return
+    entries.sort()
+    for (_, size, path) in entries:
+        if total <= _maxBytes * 3 // 4:
+            break
+        if path == keep:
+            continue
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        total -= size
+    log.info(f'Evicted entries from the parse cache, {total} bytes left')
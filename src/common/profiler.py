@@ -0,0 +1,149 @@
+"""
+Source-line profiler for the interpreters (main.py interp --profile=FILE).
+
+The profiler counts how often each statement and each function is executed and how
+much time is spent there. Statements are identified by the line number that
+genericParser.transStmt copies from the python AST.
+
+Profiling instruments the closures of the closure engines: while a profiler is
+active, wrapStmt and wrapFun return closures that record the time between entering
+and leaving a statement or function. Without an active profiler they return the
+closures unchanged, so the program runs exactly as without profiling.
+
+The results are written as a report of the hottest lines and functions, and as a
+collapsed-stack file (one line `frame;frame;... time` per stack), which can be
+turned into a flame graph with tools such as flamegraph.pl or speedscope.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import os
+import time
+from typing import *
+
+@dataclass
+class StmtCounter:
+    count: int = 0
+    total: int = 0 # in ns, including nested statements and called functions
+    own: int = 0   # in ns, without nested statements and called functions
+    active: int = 0 # number of frames for this counter on the stack
+
+class Frame:
+    __slots__ = ('counter', 'stack', 'start', 'children')
+    def __init__(self, counter: StmtCounter, stack: str, start: int):
+        self.counter = counter
+        self.stack = stack  # collapsed stack, e.g. '<module>;line 7;fib;line 3'
+        self.start = start
+        self.children = 0   # time spent in nested frames
+
+class Profiler:
+    def __init__(self):
+        self.lines: dict[int, StmtCounter] = {}
+        self.funs: dict[str, StmtCounter] = {}
+        self.stacks: dict[str, int] = {} # collapsed stack -> own time in ns
+        self.frames: list[Frame] = []
+    def enter(self, counter: StmtCounter, name: str):
+        stack = f'{self.frames[-1].stack};{name}' if self.frames else name
+        counter.active += 1
+        self.frames.append(Frame(counter, stack, time.perf_counter_ns()))
+    def leave(self):
+        fr = self.frames.pop()
+        t = time.perf_counter_ns() - fr.start
+        c = fr.counter
+        c.count += 1
+        c.active -= 1
+        if c.active == 0:
+            # Recursive frames are already included in the time of the outermost frame
+            c.total += t
+        own = t - fr.children
+        c.own += own
+        self.stacks[fr.stack] = self.stacks.get(fr.stack, 0) + own
+        if self.frames:
+            self.frames[-1].children += t
+    def totalTime(self) -> int:
+        return sum(self.stacks.values())
+    def writeReport(self, filename: str, srcFile: str):
+        """
+        Writes the report to filename and the collapsed stacks to the file with
+        extension .collapsed next to it.
+        """
+        src = readLines(srcFile)
+        total = self.totalTime()
+        def ms(ns: int) -> str:
+            return f'{ns / 1_000_000:10.3f}'
+        def pct(ns: int) -> str:
+            return f'{100 * ns / total:6.1f}%' if total > 0 else f'{0:6.1f}%'
+        out = [f'Profile of {srcFile}, total time {ms(total).strip()} ms', '',
+               'Hottest lines (sorted by own time)',
+               f'{"line":>6} {"count":>10} {"total ms":>10} {"own ms":>10} {"own":>7}  source']
+        lines = sorted([(n, c) for n, c in self.lines.items() if c.count > 0],
+                       key=lambda x: (-x[1].own, x[0]))
+        for n, c in lines:
+            code = src[n - 1].strip() if 0 < n <= len(src) else ''
+            out.append(f'{n:6} {c.count:10} {ms(c.total)} {ms(c.own)} {pct(c.own)}  {code}')
+        out.extend(['', 'Functions (sorted by total time)',
+                    f'{"calls":>10} {"total ms":>10} {"own ms":>10} {"total":>7}  function'])
+        funs = sorted([(n, c) for n, c in self.funs.items() if c.count > 0],
+                      key=lambda x: (-x[1].total, x[0]))
+        for n, c in funs:
+            out.append(f'{c.count:10} {ms(c.total)} {ms(c.own)} {pct(c.total)}  {n}')
+        with open(filename, 'w') as f:
+            f.write('\n'.join(out) + '\n')
+        with open(collapsedFile(filename), 'w') as f:
+            # Times in microseconds, the unit does not matter for flame graphs
+            for stack, ns in sorted(self.stacks.items()):
+                f.write(f'{stack} {(ns + 500) // 1000}\n')
+
+def collapsedFile(reportFile: str) -> str:
+    return os.path.splitext(reportFile)[0] + '.collapsed'
+
+def readLines(filename: str) -> list[str]:
+    try:
+        with open(filename, 'r') as f:
+            return f.read().splitlines()
+    except OSError:
+        return []
+
+_active: Optional[Profiler] = None
+
+def start() -> Profiler:
+    """
+    Activates a new profiler. Only closures wrapped after this call are profiled.
+    """
+    global _active
+    _active = Profiler()
+    return _active
+
+def stop():
+    global _active
+    _active = None
+
+def wrapStmt[F: Callable[..., Any]](lineno: Optional[int], f: F) -> F:
+    """
+    Returns f unchanged if no profiler is active. Otherwise, returns a closure that
+    runs f and records the time for the statement at line lineno.
+    """
+    p = _active
+    if p is None or lineno is None:
+        return f
+    return wrap(p, p.lines.setdefault(lineno, StmtCounter()), f'line {lineno}', f)
+
+def wrapFun[F: Callable[..., Any]](name: str, f: F) -> F:
+    """
+    Returns f unchanged if no profiler is active. Otherwise, returns a closure that
+    runs f and records the time for the function name.
+    """
+    p = _active
+    if p is None:
+        return f
+    return wrap(p, p.funs.setdefault(name, StmtCounter()), name, f)
+
+def wrap[F: Callable[..., Any]](p: Profiler, counter: StmtCounter, name: str, f: F) -> F:
+    enter = p.enter
+    leave = p.leave
+    def profiled(*args: Any) -> Any:
+        enter(counter, name)
+        try:
+            return f(*args)
+        finally:
+            leave()
+    return cast(F, profiled)
@@ -2,6 +2,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from common.compilerSupport import CompileError
 import common.log as log
+import common.utils as utils
 import pprint
 from typing import *
 
@@ -43,45 +44,125 @@ class VarInfo[T]:
     definitelyAssigned: bool
     scope: Scope
 
+class _Layer[K, T]:
+    """
+    An immutable set of bindings on top of a parent layer. A layer never has fewer than
+    twice as many bindings as its child layers (see push), so a chain of n bindings has
+    at most log2(n) + 1 layers.
+    """
+    __slots__ = ('parent', 'vars')
+    def __init__(self, parent: Optional[_Layer[K, T]], vars: dict[K, VarInfo[T]]):
+        self.parent = parent
+        self.vars = vars
+    def push(self, vars: dict[K, VarInfo[T]]) -> _Layer[K, T]:
+        """
+        Returns a new layer with vars on top of this layer. Layers that are not larger
+        than twice the new bindings are combined with them.
+        """
+        layer: Optional[_Layer[K, T]] = self
+        while layer is not None and len(vars) * 2 >= len(layer.vars):
+            # Keeps the order of the keys of the layer below
+            vars = layer.vars | vars
+            layer = layer.parent
+        return _Layer(layer, vars)
+    def get(self, var: K) -> Optional[VarInfo[T]]:
+        layer: Optional[_Layer[K, T]] = self
+        while layer is not None:
+            info = layer.vars.get(var)
+            if info is not None:
+                return info
+            layer = layer.parent
+        return None
+    def flatten(self) -> dict[K, VarInfo[T]]:
+        layers: list[_Layer[K, T]] = []
+        layer: Optional[_Layer[K, T]] = self
+        while layer is not None:
+            layers.append(layer)
+            layer = layer.parent
+        res: dict[K, VarInfo[T]] = {}
+        for l in reversed(layers):
+            res.update(l.vars)
+        return res
+
 class Symtab[K, T]:
+    """
+    The bindings are persistent: immutable layers, shared between a symtab and its
+    copies, plus the bindings assigned since the last copy. Thus copy() is O(1)
+    (amortized), and mergeBack only looks at the variables assigned in the two
+    branches.
+    """
     def __init__(self):
+        self.__frozen: _Layer[K, T] = _Layer(None, {})
         self.__vars: dict[K, VarInfo[T]] = {}
+        # The layer this symtab was copied from
+        self.__origin: Optional[_Layer[K, T]] = None
+        # The variables assigned since the copy, in the order of their first assignment
+        self.__changed: dict[K, None] = {}
     def __repr__(self):
-        return f'Symtab({self.__vars})'
-    def assign(self, var: K, ty: T, scope: Scope = 'var'):
+        return f'Symtab({self.__allVars()})'
+    def __allVars(self) -> dict[K, VarInfo[T]]:
+        return self.__frozen.flatten() | self.__vars
+    def __get(self, var: K) -> Optional[VarInfo[T]]:
         info = self.__vars.get(var)
+        if info is None:
+            info = self.__frozen.get(var)
+        return info
+    def __set(self, var: K, info: VarInfo[T]):
+        self.__vars[var] = info
+        self.__changed[var] = None
+    def assign(self, var: K, ty: T, scope: Scope = 'var'):
+        info = self.__get(var)
         if info and ty != info.ty:
             raise CompileError.typeError(
                 f'Inconsistent types for variable {var}: {info.ty} and {ty}')
         if info and info.scope == 'fun':
             raise CompileError.typeError(f'Cannot re-assign global function variable {var}')
-        self.__vars[var] = VarInfo(ty, True, scope)
+        self.__set(var, VarInfo(ty, True, scope))
     def use(self, var: K) -> T:
         return self.info(var).ty
     def scope(self, var: K) -> Scope:
         return self.info(var).scope
     def unsafeInfo(self, var: K) -> VarInfo[T]:
-        return self.__vars[var]
+        return utils.assertNotNone(self.__get(var))
+    def get(self, var: K) -> Optional[VarInfo[T]]:
+        return self.__get(var)
+    def changedVars(self) -> Iterable[K]:
+        """
+        The variables assigned since this symtab was copied.
+        """
+        return self.__changed.keys()
     def items(self) -> Iterable[tuple[K, VarInfo[T]]]:
-        return self.__vars.items()
+        return self.__allVars().items()
     def info(self, var: K) -> VarInfo[T]:
-        if var not in self.__vars:
-            log.debug(f"Symtab: {pprint.pformat(self.__vars)}")
+        info = self.__get(var)
+        if info is None:
+            log.debug(lambda: f"Symtab: {pprint.pformat(self.__allVars())}")
             raise CompileError.typeError(f'Unknown variable: {var}')
-        info = self.__vars[var]
         if not info.definitelyAssigned:
             raise CompileError.typeError(f'Variable {var} might not have been initialized')
         return info
     def types(self, scope: Optional[Scope] = None) -> list[tuple[K, T]]:
-        return [(x, info.ty) for x, info in self.__vars.items()
+        return [(x, info.ty) for x, info in self.items()
                 if scope is None or info.scope == scope]
     def hasVar(self, var: K):
-        return var in self.__vars
+        return self.__get(var) is not None
     def copy(self) -> Symtab[K, T]:
+        if self.__vars:
+            self.__frozen = self.__frozen.push(self.__vars)
+            self.__vars = {}
         st = Symtab[K, T]()
-        st.__vars.update(self.__vars)
+        st.__frozen = self.__frozen
+        st.__origin = self.__frozen
         return st
     def mergeBack(self, st1: Symtab[K, T], st2: Symtab[K, T]):
         import common.symtab_merge as symtab_merge
-        merged = symtab_merge.merge(st1, st2)
-        self.__vars = merged
+        if not self.__vars and st1.__origin is self.__frozen and st2.__origin is self.__frozen:
+            # Both symtabs are copies of this symtab, only their changes are merged
+            for x, info in symtab_merge.mergeChanged(st1, st2).items():
+                self.__set(x, info)
+        else:
+            merged = symtab_merge.merge(st1, st2)
+            self.__frozen = _Layer(None, {})
+            self.__vars = {}
+            for x, info in merged.items():
+                self.__set(x, info)
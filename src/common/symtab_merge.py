@@ -1,5 +1,6 @@
 from common.symtab import Symtab, VarInfo
 from common.compilerSupport import CompileError
+from typing import *
 
 def isDefinitelyAssigned[K, T](x: K, nested: list[Symtab[K, T]]) -> bool:
     for st in nested:
@@ -9,24 +10,31 @@ def isDefinitelyAssigned[K, T](x: K, nested: list[Symtab[K, T]]) -> bool:
             return False
     return True
 
+def mergeVar[K, T](x: K, st1: Symtab[K, T], st2: Symtab[K, T]) -> VarInfo[T]:
+    l = [info for info in [st1.get(x), st2.get(x)] if info is not None]
+    first = l[0]
+    rest = l[1:]
+    for v in rest:
+        if v.ty != first.ty:
+            raise CompileError.typeError(f'Inconsistent types for variable {x}')
+        if v.scope != first.scope:
+            raise CompileError.typeError(f'Inconsistent scope for variable {x}')
+    return VarInfo(first.ty, isDefinitelyAssigned(x, [st1, st2]), first.scope)
+
 def merge[K, T](st1: Symtab[K, T], st2: Symtab[K, T]) -> dict[K, VarInfo[T]]:
-    envs = [st1, st2]
-    union: dict[K, list[VarInfo[T]]] = {}
-    for st in envs:
-        for k, v in st.items():
-            old = union.get(k)
-            if old:
-                old.append(v)
-            else:
-                union[k] = [v]
-    res: dict[K, VarInfo[T]] = {}
-    for x, l in union.items():
-        first = l[0]
-        rest = l[1:]
-        for v in rest:
-            if v.ty != first.ty:
-                raise CompileError.typeError(f'Inconsistent types for variable {x}')
-            if v.scope != first.scope:
-                raise CompileError.typeError(f'Inconsistent scope for variable {x}')
-        res[x] = VarInfo(first.ty, isDefinitelyAssigned(x, [st1, st2]), first.scope)
-    return res
+    union: dict[K, None] = {}
+    for st in [st1, st2]:
+        for k, _ in st.items():
+            union[k] = None
+    return {x: mergeVar(x, st1, st2) for x in union}
+
+def mergeChanged[K, T](st1: Symtab[K, T], st2: Symtab[K, T]) -> dict[K, VarInfo[T]]:
+    """
+    Merges two copies of the same symtab. The result contains only the variables
+    assigned in st1 or st2, all other variables are unchanged.
+    """
+    union: dict[K, None] = {}
+    for st in [st1, st2]:
+        for k in st.changedVars():
+            union[k] = None
+    return {x: mergeVar(x, st1, st2) for x in union}
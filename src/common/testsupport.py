@@ -9,6 +9,9 @@ import common.constants as constants
 _CACHE_DIR = '.test_cache'
 _CACHE_LOCK = threading.Lock()
 
+# Option for main.py, re-runs over unchanged test files do not parse them again
+PARSE_CACHE_ARG = f'--parse-cache={_CACHE_DIR}'
+
 # If IGNORE_HASH is True, the golden file from .test_cache is considered as the only
 # source if truth. This can be useful if you changed test cases but want to make sure
 # that their output is still the same
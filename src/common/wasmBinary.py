@@ -0,0 +1,388 @@
+"""
+Encoder for the binary format of wasm modules (main.py compile --wasm-encoder=native).
+
+Encodes a WasmModule directly into a bytearray, without rendering it to the textual
+format and running wat2wasm. The output is the same as the output of wat2wasm (without
+--debug-names) for the textual format of the module:
+
+- Function types are numbered in the order of their first use: imported functions,
+  defined functions, and the call_indirect instructions in the body of each function.
+- Consecutive locals of the same type are declared together.
+- All LEB128 numbers have the minimal length.
+- An if without else instructions has no else.
+- Comments are dropped.
+
+See https://webassembly.github.io/spec/core/binary/index.html
+"""
+from __future__ import annotations
+from typing import *
+from common.wasm import *
+import struct
+
+MAGIC = b'\x00asm'
+VERSION = b'\x01\x00\x00\x00'
+
+SECTION_TYPE = 1
+SECTION_IMPORT = 2
+SECTION_FUNCTION = 3
+SECTION_TABLE = 4
+SECTION_GLOBAL = 6
+SECTION_EXPORT = 7
+SECTION_ELEM = 9
+SECTION_CODE = 10
+SECTION_DATA = 11
+
+VALTYPES: dict[str, int] = {'i32': 0x7f, 'i64': 0x7e, 'f32': 0x7d, 'f64': 0x7c}
+FUNCREF = 0x70
+FUNCTYPE = 0x60
+EMPTY_BLOCKTYPE = 0x40
+
+CONST_OPCODES: dict[str, int] = {'i32': 0x41, 'i64': 0x42, 'f32': 0x43, 'f64': 0x44}
+
+NUM_BIN_OPCODES: dict[tuple[str, str], int] = {
+    ('i32', 'add'): 0x6a, ('i32', 'sub'): 0x6b, ('i32', 'mul'): 0x6c,
+    ('i32', 'xor'): 0x73, ('i32', 'shl'): 0x74, ('i32', 'shr_u'): 0x76,
+    ('i64', 'add'): 0x7c, ('i64', 'sub'): 0x7d, ('i64', 'mul'): 0x7e,
+    ('i64', 'xor'): 0x85, ('i64', 'shl'): 0x86, ('i64', 'shr_u'): 0x88,
+    ('f32', 'add'): 0x92, ('f32', 'sub'): 0x93, ('f32', 'mul'): 0x94,
+    ('f64', 'add'): 0xa0, ('f64', 'sub'): 0xa1, ('f64', 'mul'): 0xa2
+}
+
+INT_REL_OPS = ['eq', 'ne', 'lt_s', 'lt_u', 'gt_s', 'gt_u', 'le_s', 'le_u', 'ge_s', 'ge_u']
+INT_REL_OPCODES: dict[tuple[str, str], int] = {
+    (ty, op): base + i
+    for (ty, base) in [('i32', 0x46), ('i64', 0x51)]
+    for i, op in enumerate(INT_REL_OPS)
+}
+
+CONV_OPCODES: dict[str, int] = {
+    'i32.wrap_i64': 0xa7, 'i64.extend_i32_s': 0xac, 'i64.extend_i32_u': 0xad
+}
+
+LOCAL_OPCODES: dict[str, int] = {'get': 0x20, 'set': 0x21, 'tee': 0x22}
+GLOBAL_OPCODES: dict[str, int] = {'get': 0x23, 'set': 0x24}
+
+# Opcode and alignment (log2 of the natural alignment) of loads and stores
+MEM_OPCODES: dict[tuple[str, str], tuple[int, int]] = {
+    ('i32', 'load'): (0x28, 2), ('i64', 'load'): (0x29, 3),
+    ('f32', 'load'): (0x2a, 2), ('f64', 'load'): (0x2b, 3),
+    ('i32', 'store'): (0x36, 2), ('i64', 'store'): (0x37, 3),
+    ('f32', 'store'): (0x38, 2), ('f64', 'store'): (0x39, 3)
+}
+
+OP_UNREACHABLE = 0x00
+OP_BLOCK = 0x02
+OP_LOOP = 0x03
+OP_IF = 0x04
+OP_ELSE = 0x05
+OP_END = 0x0b
+OP_BR = 0x0c
+OP_BR_IF = 0x0d
+OP_CALL = 0x10
+OP_CALL_INDIRECT = 0x11
+OP_DROP = 0x1a
+
+def uleb(out: bytearray, n: int):
+    while True:
+        b = n & 0x7f
+        n >>= 7
+        if n == 0:
+            out.append(b)
+            return
+        out.append(b | 0x80)
+
+def sleb(out: bytearray, n: int):
+    while True:
+        b = n & 0x7f
+        n >>= 7
+        if (n == 0 and not b & 0x40) or (n == -1 and b & 0x40):
+            out.append(b)
+            return
+        out.append(b | 0x80)
+
+def signed(val: int, bits: int) -> int:
+    """
+    Interprets val as integer with the given number of bits, the textual format allows
+    signed and unsigned values.
+    """
+    if not -(1 << (bits - 1)) <= val < (1 << bits):
+        raise ValueError(f'Constant {val} out of range for i{bits}')
+    if val >= 1 << (bits - 1):
+        val -= 1 << bits
+    return val
+
+def name(out: bytearray, s: str):
+    b = s.encode('utf-8')
+    uleb(out, len(b))
+    out += b
+
+def section(out: bytearray, id: int, content: bytearray):
+    out.append(id)
+    uleb(out, len(content))
+    out += content
+
+type FuncType = tuple[tuple[WasmValtype, ...], tuple[WasmValtype, ...]]
+
+def funcType(params: Iterable[WasmValtype], result: Optional[WasmValtype]) -> FuncType:
+    return (tuple(params), (result,) if result is not None else ())
+
+class ModuleEncoder:
+    """
+    Encodes one module, holds the indices of its types, functions and globals.
+    """
+    def __init__(self, m: WasmModule):
+        self.m = m
+        self.types: dict[FuncType, int] = {}
+        self.funcs: dict[WasmId, int] = {}
+        self.globals: dict[WasmId, int] = {}
+        self.funcTypes: list[int] = [] # type indices of the defined functions
+        for i in m.imports:
+            if isinstance(i.desc, WasmImportFunc):
+                self.funcs[i.desc.id] = len(self.funcs)
+                self.typeIndex(funcType(i.desc.params, i.desc.result))
+        for f in m.funcs:
+            self.funcs[f.id] = len(self.funcs)
+            self.funcTypes.append(self.typeIndex(funcType([t for _, t in f.params], f.result)))
+            self.collectTypes(f.instrs)
+        for g in m.globals:
+            self.globals[g.id] = len(self.globals)
+
+    def typeIndex(self, t: FuncType) -> int:
+        i = self.types.get(t)
+        if i is None:
+            i = len(self.types)
+            self.types[t] = i
+        return i
+
+    def collectTypes(self, instrs: list[WasmInstr]):
+        for i in instrs:
+            match i:
+                case WasmInstrCallIndirect(params, result):
+                    self.typeIndex(funcType(params, result))
+                case WasmInstrIf(_, thenInstrs, elseInstrs):
+                    self.collectTypes(thenInstrs)
+                    self.collectTypes(elseInstrs)
+                case WasmInstrLoop(_, body) | WasmInstrBlock(_, _, body):
+                    self.collectTypes(body)
+                case _:
+                    pass
+
+    def encode(self) -> bytearray:
+        m = self.m
+        out = bytearray(MAGIC + VERSION)
+        if self.types:
+            section(out, SECTION_TYPE, self.typeSection())
+        if m.imports:
+            section(out, SECTION_IMPORT, self.importSection())
+        if m.funcs:
+            s = bytearray()
+            uleb(s, len(self.funcTypes))
+            for t in self.funcTypes:
+                uleb(s, t)
+            section(out, SECTION_FUNCTION, s)
+        s = bytearray()
+        elems = m.funcTable.elems
+        # The table has exactly the size of its elements
+        uleb(s, 1)
+        s.append(FUNCREF)
+        s.append(0x01)
+        uleb(s, len(elems))
+        uleb(s, len(elems))
+        section(out, SECTION_TABLE, s)
+        if m.globals:
+            section(out, SECTION_GLOBAL, self.globalSection())
+        if m.exports:
+            section(out, SECTION_EXPORT, self.exportSection())
+        s = bytearray()
+        uleb(s, 1)
+        s.append(0x00) # active segment for table 0 with function indices
+        self.constExpr(s, [WasmInstrConst('i32', 0)])
+        uleb(s, len(elems))
+        for e in elems:
+            uleb(s, self.funcs[e])
+        section(out, SECTION_ELEM, s)
+        if m.funcs:
+            section(out, SECTION_CODE, self.codeSection())
+        if m.data:
+            section(out, SECTION_DATA, self.dataSection())
+        return out
+
+    def typeSection(self) -> bytearray:
+        s = bytearray()
+        uleb(s, len(self.types))
+        for (params, results) in self.types:
+            s.append(FUNCTYPE)
+            uleb(s, len(params))
+            for t in params:
+                s.append(VALTYPES[t])
+            uleb(s, len(results))
+            for t in results:
+                s.append(VALTYPES[t])
+        return s
+
+    def importSection(self) -> bytearray:
+        s = bytearray()
+        uleb(s, len(self.m.imports))
+        for i in self.m.imports:
+            name(s, i.module)
+            name(s, i.name)
+            match i.desc:
+                case WasmImportFunc(_, params, result):
+                    s.append(0x00)
+                    uleb(s, self.types[funcType(params, result)])
+                case WasmImportMemory(min, max):
+                    s.append(0x02)
+                    if max is None:
+                        s.append(0x00)
+                        uleb(s, min)
+                    else:
+                        s.append(0x01)
+                        uleb(s, min)
+                        uleb(s, max)
+        return s
+
+    def globalSection(self) -> bytearray:
+        s = bytearray()
+        uleb(s, len(self.m.globals))
+        for g in self.m.globals:
+            s.append(VALTYPES[g.ty])
+            s.append(0x01 if g.mutable else 0x00)
+            self.constExpr(s, g.init)
+        return s
+
+    def exportSection(self) -> bytearray:
+        s = bytearray()
+        uleb(s, len(self.m.exports))
+        for e in self.m.exports:
+            name(s, e.name)
+            match e.desc:
+                case WasmExportFunc(id):
+                    s.append(0x00)
+                    uleb(s, self.funcs[id])
+        return s
+
+    def codeSection(self) -> bytearray:
+        s = bytearray()
+        uleb(s, len(self.m.funcs))
+        for f in self.m.funcs:
+            body = bytearray()
+            locals: dict[WasmId, int] = {}
+            for (x, _) in f.params:
+                locals[x] = len(locals)
+            # Consecutive locals of the same type form one declaration
+            decls: list[tuple[int, WasmValtype]] = []
+            for (x, t) in f.locals:
+                locals[x] = len(locals)
+                if decls and decls[-1][1] == t:
+                    decls[-1] = (decls[-1][0] + 1, t)
+                else:
+                    decls.append((1, t))
+            uleb(body, len(decls))
+            for (n, t) in decls:
+                uleb(body, n)
+                body.append(VALTYPES[t])
+            self.instrs(body, f.instrs, locals, [])
+            body.append(OP_END)
+            uleb(s, len(body))
+            s += body
+        return s
+
+    def dataSection(self) -> bytearray:
+        s = bytearray()
+        uleb(s, len(self.m.data))
+        for d in self.m.data:
+            s.append(0x00) # active segment for memory 0
+            self.constExpr(s, [WasmInstrConst('i32', d.start)])
+            b = d.content.encode('utf-8')
+            uleb(s, len(b))
+            s += b
+        return s
+
+    def constExpr(self, out: bytearray, instrs: list[WasmInstr]):
+        self.instrs(out, instrs, {}, [])
+        out.append(OP_END)
+
+    def blockType(self, out: bytearray, t: Optional[WasmValtype]):
+        out.append(EMPTY_BLOCKTYPE if t is None else VALTYPES[t])
+
+    def instrs(self, out: bytearray, instrs: list[WasmInstr], locals: dict[WasmId, int],
+               labels: list[Optional[WasmId]]):
+        """
+        Encodes instrs, labels are the labels of the enclosing blocks, innermost last
+        (None for if).
+        """
+        for i in instrs:
+            match i:
+                case WasmInstrConst(ty, val):
+                    out.append(CONST_OPCODES[ty])
+                    match ty:
+                        case 'i32': sleb(out, signed(int(val), 32))
+                        case 'i64': sleb(out, signed(int(val), 64))
+                        case 'f32': out += struct.pack('<f', val)
+                        case 'f64': out += struct.pack('<d', val)
+                case WasmInstrDrop():
+                    out.append(OP_DROP)
+                case WasmInstrNumBinOp(ty, op):
+                    out.append(NUM_BIN_OPCODES[(ty, op)])
+                case WasmInstrIntRelOp(ty, op):
+                    out.append(INT_REL_OPCODES[(ty, op)])
+                case WasmInstrConvOp(op):
+                    out.append(CONV_OPCODES[op])
+                case WasmInstrCall(id):
+                    out.append(OP_CALL)
+                    uleb(out, self.funcs[id])
+                case WasmInstrCallIndirect(params, result):
+                    out.append(OP_CALL_INDIRECT)
+                    uleb(out, self.types[funcType(params, result)])
+                    out.append(0x00) # table 0
+                case WasmInstrVarLocal(op, id):
+                    out.append(LOCAL_OPCODES[op])
+                    uleb(out, locals[id])
+                case WasmInstrVarGlobal(op, id):
+                    out.append(GLOBAL_OPCODES[op])
+                    uleb(out, self.globals[id])
+                case WasmInstrMem(ty, op):
+                    (opcode, align) = MEM_OPCODES[(ty, op)]
+                    out.append(opcode)
+                    uleb(out, align)
+                    uleb(out, 0) # offset
+                case WasmInstrBranch(target, conditional):
+                    out.append(OP_BR_IF if conditional else OP_BR)
+                    uleb(out, labelIndex(labels, target))
+                case WasmInstrIf(resultType, thenInstrs, elseInstrs):
+                    out.append(OP_IF)
+                    self.blockType(out, resultType)
+                    labels.append(None)
+                    self.instrs(out, thenInstrs, locals, labels)
+                    if elseInstrs:
+                        out.append(OP_ELSE)
+                        self.instrs(out, elseInstrs, locals, labels)
+                    labels.pop()
+                    out.append(OP_END)
+                case WasmInstrLoop(label, body):
+                    out.append(OP_LOOP)
+                    self.blockType(out, None)
+                    labels.append(label)
+                    self.instrs(out, body, locals, labels)
+                    labels.pop()
+                    out.append(OP_END)
+                case WasmInstrBlock(label, result, body):
+                    out.append(OP_BLOCK)
+                    self.blockType(out, result)
+                    labels.append(label)
+                    self.instrs(out, body, locals, labels)
+                    labels.pop()
+                    out.append(OP_END)
+                case WasmInstrComment():
+                    pass
+                case WasmInstrTrap():
+                    out.append(OP_UNREACHABLE)
+
+def labelIndex(labels: list[Optional[WasmId]], target: WasmId) -> int:
+    for depth in range(len(labels)):
+        if labels[-1 - depth] == target:
+            return depth
+    raise ValueError(f'Unknown label {target.id}')
+
+def encodeModule(m: WasmModule) -> bytearray:
+    return ModuleEncoder(m).encode()
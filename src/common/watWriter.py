@@ -0,0 +1,116 @@
+"""
+Writer for the textual format of wasm modules (main.py compile --wat-style=compact).
+
+Writes a WasmModule to a file handle in a single pass over the module, without building
+SExp or prettyprinter documents and without holding the text of the module in memory.
+Each instruction, local, and module field is written on its own line; the bodies of
+block, loop, and if are indented by two more spaces than the enclosing instructions.
+
+The output consists of the same tokens as sexp.renderSExp(m.render()), only the
+whitespace differs.
+"""
+from __future__ import annotations
+from typing import *
+from common.wasm import *
+import json
+
+INDENT = '  '
+
+def writeModule(m: WasmModule, out: TextIO):
+    w = out.write
+    nl = '\n' + INDENT
+    w('(module')
+    for i in m.imports:
+        w(f'{nl}(import {json.dumps(i.module)} {json.dumps(i.name)} {importDesc(i.desc)})')
+    for e in m.exports:
+        w(f'{nl}(export {json.dumps(e.name)} (func {e.desc.id.id}))')
+    for g in m.globals:
+        t = f'(mut {g.ty})' if g.mutable else g.ty
+        init = ''.join([' ' + instrText(i) for i in g.init])
+        w(f'{nl}(global {g.id.id} {t}{init})')
+    for d in m.data:
+        w(f'{nl}(data (i32.const {d.start}) {json.dumps(d.content)})')
+    elems = ''.join([' ' + x.id for x in m.funcTable.elems])
+    w(f'{nl}(table funcref (elem{elems}))')
+    for f in m.funcs:
+        writeFunc(w, f, nl)
+    w(')\n')
+
+def importDesc(d: WasmImportDesc) -> str:
+    match d:
+        case WasmImportMemory(min, max):
+            return f'(memory {min})' if max is None else f'(memory {min} {max})'
+        case WasmImportFunc(id, params, result):
+            tys = ''.join([' ' + t for t in params])
+            res = '' if result is None else f' (result {result})'
+            return f'(func {id.id} (param{tys}){res})'
+
+def writeFunc(w: Callable[[str], Any], f: WasmFunc, nl: str):
+    params = ''.join([f' (param {i.id} {t})' for (i, t) in f.params])
+    res = '' if f.result is None else f' (result {f.result})'
+    w(f'{nl}(func {f.id.id}{params}{res}')
+    bodyNl = nl + INDENT
+    for (i, t) in f.locals:
+        w(f'{bodyNl}(local {i.id} {t})')
+    writeInstrs(w, f.instrs, bodyNl)
+    w(')')
+
+def instrText(i: WasmInstr) -> str:
+    """
+    The text of an instruction other than block, loop, and if.
+    """
+    match i:
+        case WasmInstrConst(ty, val):
+            return f'({ty}.const {val})'
+        case WasmInstrDrop():
+            return 'drop'
+        case WasmInstrNumBinOp(ty, op) | WasmInstrIntRelOp(ty, op):
+            return f'{ty}.{op}'
+        case WasmInstrConvOp(op):
+            return op
+        case WasmInstrCall(id):
+            return f'(call {id.id})'
+        case WasmInstrCallIndirect(params, result):
+            tys = ''.join([f' (param {t})' for t in params])
+            if result:
+                tys += f' (result {result})'
+            return f'(call_indirect{tys})'
+        case WasmInstrVarLocal(op, id):
+            return f'(local.{op} {id.id})'
+        case WasmInstrVarGlobal(op, id):
+            return f'(global.{op} {id.id})'
+        case WasmInstrMem(ty, op):
+            return f'{ty}.{op}'
+        case WasmInstrBranch(target, conditional):
+            return f'(br_if {target.id})' if conditional else f'(br {target.id})'
+        case WasmInstrComment(text):
+            return f'(;{text};)'
+        case WasmInstrTrap():
+            return 'unreachable'
+        case WasmInstrIf() | WasmInstrLoop() | WasmInstrBlock():
+            raise ValueError(f'Not a plain instruction: {i}')
+
+def writeInstrs(w: Callable[[str], Any], instrs: list[WasmInstr], nl: str):
+    """
+    Writes instrs, each on a new line starting with nl.
+    """
+    for i in instrs:
+        match i:
+            case WasmInstrIf(resultType, thenInstrs, elseInstrs):
+                res = '' if resultType is None else f' (result {resultType})'
+                w(f'{nl}if{res}')
+                writeInstrs(w, thenInstrs, nl + INDENT)
+                w(f'{nl}else')
+                writeInstrs(w, elseInstrs, nl + INDENT)
+                w(f'{nl}end')
+            case WasmInstrLoop(label, body):
+                w(f'{nl}loop {label.id}')
+                writeInstrs(w, body, nl + INDENT)
+                w(f'{nl}end')
+            case WasmInstrBlock(label, result, body):
+                res = '' if result is None else f' (result {result})'
+                w(f'{nl}block {label.id}{res}')
+                writeInstrs(w, body, nl + INDENT)
+                w(f'{nl}end')
+            case _:
+                w(nl + instrText(i))
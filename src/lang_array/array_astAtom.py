@@ -1,66 +1,66 @@
-# AUTOMATICALLY GENERATED (2024-03-01 17:54:19)
+# AUTOMATICALLY GENERATED (2026-10-18 23:58:21)
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from lang_array.array_astCommon import *
 
 @dataclass
 class IntConst:
     value: int
-    ty: optional[ty] = None
+    ty: optional[ty] = field(default=None, compare=False)
 
 @dataclass
 class BoolConst:
     value: bool
-    ty: optional[ty] = None
+    ty: optional[ty] = field(default=None, compare=False)
 
 @dataclass
 class Name:
     var: ident
-    ty: optional[ty] = None
+    ty: optional[ty] = field(default=None, compare=False)
 
 type atomExp = IntConst | BoolConst | Name
 
 @dataclass
 class AtomExp:
     e: atomExp
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class Call:
     var: ident
     args: list[exp]
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class UnOp:
     op: unaryop
     arg: exp
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class BinOp:
     left: exp
     op: binaryop
     right: exp
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class ArrayInitDyn:
     len: atomExp
     elemInit: atomExp
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class ArrayInitStatic:
     elemInit: list[atomExp]
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class Subscript:
     array: atomExp
     index: atomExp
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 type exp = AtomExp | Call | UnOp | BinOp | ArrayInitDyn | ArrayInitStatic | Subscript
 
@@ -1,6 +1,7 @@
-# AUTOMATICALLY GENERATED (2024-03-13 15:00:04)
+# AUTOMATICALLY GENERATED (2026-10-18 23:58:21)
 from __future__ import annotations
 from dataclasses import dataclass
+from typing import Any, Self
 
 type optional[T] = T | None
 
@@ -11,6 +12,15 @@ class Ident:
 type ident = Ident
 type string = str
 
+_interned: dict[tuple[Any, ...], Any] = {}
+
+def _intern[T](cls: type[T], key: tuple[Any, ...], **fields: Any) -> T:
+    x = object.__new__(cls)
+    for n, v in fields.items():
+        object.__setattr__(x, n, v)
+    _interned[key] = x
+    return x
+
 @dataclass
 class USub:
     pass
@@ -71,26 +81,63 @@ class Or:
 
 type binaryop = Add | Sub | Mul | Less | LessEq | Greater | GreaterEq | Eq | NotEq | Is | And | Or
 
-@dataclass
+@dataclass(frozen=True, eq=False, init=False)
 class Int:
-    pass
-
-@dataclass
+    def __new__(cls) -> Self:
+        key = (cls,)
+        x: Self | None = _interned.get(key)
+        if x is None:
+            x = _intern(cls, key)
+        return x
+    def __reduce__(self):
+        return (Int, ())
+
+@dataclass(frozen=True, eq=False, init=False)
 class Bool:
-    pass
-
-@dataclass
+    def __new__(cls) -> Self:
+        key = (cls,)
+        x: Self | None = _interned.get(key)
+        if x is None:
+            x = _intern(cls, key)
+        return x
+    def __reduce__(self):
+        return (Bool, ())
+
+@dataclass(frozen=True, eq=False, init=False)
 class Array:
     elemTy: ty
+    def __new__(cls, elemTy: ty) -> Self:
+        key = (cls, elemTy)
+        x: Self | None = _interned.get(key)
+        if x is None:
+            x = _intern(cls, key, elemTy=elemTy)
+        return x
+    def __reduce__(self):
+        return (Array, (self.elemTy,))
 
 type ty = Int | Bool | Array
 
-@dataclass
+@dataclass(frozen=True, eq=False, init=False)
 class NotVoid:
     ty: ty
-
-@dataclass
+    def __new__(cls, ty: ty) -> Self:
+        key = (cls, ty)
+        x: Self | None = _interned.get(key)
+        if x is None:
+            x = _intern(cls, key, ty=ty)
+        return x
+    def __reduce__(self):
+        return (NotVoid, (self.ty,))
+
+@dataclass(frozen=True, eq=False, init=False)
 class Void:
-    pass
+    def __new__(cls) -> Self:
+        key = (cls,)
+        x: Self | None = _interned.get(key)
+        if x is None:
+            x = _intern(cls, key)
+        return x
+    def __reduce__(self):
+        return (Void, ())
 
 type resultTy = NotVoid | Void
\ No newline at end of file
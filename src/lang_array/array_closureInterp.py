@@ -0,0 +1,183 @@
+"""
+Alternative execution engine for lang_array (main.py interp --engine=closures).
+
+After type checking, every node of the AST is translated exactly once into a python
+closure. Running the program then only calls these closures, so the pattern matching
+of array_interp.interpExp and array_interp.interpStmt is not repeated for every
+evaluation of an expression or statement. The store is shared with array_interp.
+"""
+from lang_array.array_ast import *
+import lang_array.array_tychecker as array_tychecker
+import lang_array.array_resolver as array_resolver
+import lang_array.array_vectorize as array_vectorize
+from lang_array.array_interp import Store, StoreValue, arrayElemTy, asInt, asValue, asAddress
+import common.utils as utils
+import common.interpIO as interpIO
+import common.profiler as profiler
+from common.compilerSupport import CompilerConfig
+import common.log as log
+from typing import *
+
+type Env = list[Any] # indexed by the slots of the variables
+type ExpFun = Callable[[Env], Any]
+type StmtFun = Callable[[Env], None]
+
+def compileFuncall(id: ident, args: list[exp], store: Store) -> ExpFun:
+    match (id.name, args):
+        case ('input_int', []):
+            return lambda env: interpIO.inputInt('Enter some int: ')
+        case ('print', [e]):
+            f = compileExp(e, store)
+            def printFun(env: Env):
+                interpIO.printValue(asInt(f(env)))
+            return printFun
+        case ('len', [e]):
+            f = compileExp(e, store)
+            return lambda env: len(store.resolve(asAddress(f(env))))
+        case _:
+            raise ValueError(f'Invalid function call of {id.name} with {len(args)} arguments')
+
+def compileExp(e: exp, store: Store) -> ExpFun:
+    match e:
+        case IntConst(value):
+            return lambda env: value
+        case BoolConst(value):
+            return lambda env: value
+        case Call(id, args):
+            return compileFuncall(id, args, store)
+        case UnOp(op, sub):
+            f = compileExp(sub, store)
+            match op:
+                case USub(): return lambda env: -f(env)
+                case Not(): return lambda env: not f(env)
+        case BinOp(left, op, right):
+            l = compileExp(left, store)
+            r = compileExp(right, store)
+            match op:
+                case Sub(): return lambda env: l(env) - r(env)
+                case Add(): return lambda env: l(env) + r(env)
+                case Mul(): return lambda env: l(env) * r(env)
+                case Less(): return lambda env: l(env) < r(env)
+                case LessEq(): return lambda env: l(env) <= r(env)
+                case Greater(): return lambda env: l(env) > r(env)
+                case GreaterEq(): return lambda env: l(env) >= r(env)
+                case Eq(): return lambda env: l(env) == r(env)
+                case NotEq(): return lambda env: l(env) != r(env)
+                case Is():
+                    def isOp(env: Env):
+                        # x must stay alive, otherwise r might reuse its address
+                        x = l(env)
+                        store.tmps.append(x)
+                        y = r(env)
+                        store.tmps.pop()
+                        return x == y # compare Address values by ==
+                    return isOp
+                case And(): return lambda env: r(env) if l(env) else False
+                case Or(): return lambda env: True if l(env) else r(env)
+        case Name(_, slot):
+            i = utils.assertNotNone(slot)
+            return lambda env: env[i]
+        case ArrayInitDyn(lenExp, initExp):
+            n = compileExp(lenExp, store)
+            v = compileExp(initExp, store)
+            elemTy = arrayElemTy(e)
+            def arrayInitDyn(env: Env):
+                k = asInt(n(env))
+                x = asValue(v(env))
+                store.tmps.append(x)
+                a = store.allocN(elemTy, k, x)
+                store.tmps.pop()
+                return a
+            return arrayInitDyn
+        case ArrayInitStatic(es):
+            fs = [compileExp(e, store) for e in es]
+            elemTy = arrayElemTy(e)
+            def arrayInitStatic(env: Env):
+                # The elements evaluated so far are roots while evaluating the others
+                tmps = store.tmps
+                n = len(tmps)
+                for f in fs:
+                    tmps.append(asValue(f(env)))
+                a = store.alloc(elemTy, cast(StoreValue, tmps[n:]))
+                del tmps[n:]
+                return a
+            return arrayInitStatic
+        case Subscript(arrayExp, indexExp):
+            a = compileExp(arrayExp, store)
+            i = compileExp(indexExp, store)
+            def subscript(env: Env):
+                x = asAddress(a(env))
+                store.tmps.append(x)
+                idx = asInt(i(env))
+                store.tmps.pop()
+                return store.load(x, idx)
+            return subscript
+    raise Exception(f'No match for expression {e}')
+
+def compileStmt(s: stmt, store: Store) -> StmtFun:
+    match s:
+        case StmtExp(e):
+            return compileExp(e, store)
+        case Assign(_, e, slot):
+            i = utils.assertNotNone(slot)
+            f = compileExp(e, store)
+            def assign(env: Env):
+                env[i] = f(env)
+            return assign
+        case IfStmt(cond, thenBody, elseBody):
+            c = compileExp(cond, store)
+            thenF = compileStmts(thenBody, store)
+            elseF = compileStmts(elseBody, store)
+            def ifStmt(env: Env):
+                if c(env):
+                    thenF(env)
+                else:
+                    elseF(env)
+            return ifStmt
+        case WhileStmt(cond, body):
+            c = compileExp(cond, store)
+            bodyF = compileStmts(body, store)
+            def whileStmt(env: Env):
+                while c(env):
+                    bodyF(env)
+            loop = array_vectorize.recognize(s)
+            if loop is None:
+                return whileStmt
+            def vectorizedWhileStmt(env: Env):
+                if not array_vectorize.run(loop, env, store.resolve):
+                    whileStmt(env)
+            return vectorizedWhileStmt
+        case SubscriptAssign(leftExp, idxExp, rightExp):
+            i = compileExp(idxExp, store)
+            r = compileExp(rightExp, store)
+            a = compileExp(leftExp, store)
+            def subscriptAssign(env: Env):
+                idx = asInt(i(env))
+                v = r(env)
+                store.tmps.append(v)
+                x = asAddress(a(env))
+                store.tmps.pop()
+                store.storeValue(x, idx, v)
+            return subscriptAssign
+
+def compileStmts(stmts: list[stmt], store: Store) -> StmtFun:
+    fs = [profiler.wrapStmt(s.lineno, compileStmt(s, store)) for s in stmts]
+    match fs:
+        case [f]:
+            return f
+        case _:
+            def block(env: Env):
+                for f in fs:
+                    f(env)
+            return block
+
+def interpModule(m: mod, cfg: CompilerConfig = CompilerConfig.default()):
+    utils.assertType(m, Module)
+    st = array_tychecker.tycheckModule(m)
+    env: Env = array_resolver.resolveModule(m, st) * [None]
+    store = Store(cfg)
+    store.envs.append(env)
+    prog = profiler.wrapFun('<module>', compileStmts(m.stmts, store))
+    prog(env)
+    log.info(f'Garbage collector: {store.stats}')
+    log.debug(lambda: f'After executing program.\nEnv: {env}\nStore: {store}')
@@ -9,7 +9,7 @@ import pprint
 type Symtab = symtab.Symtab[ident, ty]
 
 def isBaseTy(given: Optional[ty]):
-    return given in [Int(), Bool()]
+    return isinstance(given, Int | Bool)
 
 def isArrayTy(given: Optional[ty]):
     match given:
@@ -47,6 +47,9 @@ def assertNotVoid(given: resultTy, what: str) -> ty:
 
 def tycheckExpNotVoid(e: exp, st: Symtab) -> ty:
     t = tycheckExp(e, st)
+    if isinstance(t, NotVoid):
+        return t.ty
+    # Printing e takes time linear in its size, so only do it for the error message
     return assertNotVoid(t, str(e))
 
 def tycheckFuncall(id: ident, args: list[exp], st: Symtab) -> resultTy:
@@ -55,7 +58,7 @@ def tycheckFuncall(id: ident, args: list[exp], st: Symtab) -> resultTy:
             return NotVoid(Int())
         case ('print', [e]):
             t = tycheckExpNotVoid(e, st)
-            if t not in [Int(), Bool()]:
+            if not isBaseTy(t):
                 raise CompileError.typeError(f'{e} should have type int or bool but has type {t}')
             return Void()
         case ('len', [e]):
@@ -196,6 +199,6 @@ def tycheckModule(m: mod) -> Symtab:
     log.info(f'Typechecking array program')
     st: Symtab = symtab.Symtab()
     tycheckStmts(m.stmts, st)
-    log.debug(f'Symtab after typechecking: {st}')
-    log.debug(f'AST after typechecking: {pprint.pformat(m)}')
+    log.debug(lambda: f'Symtab after typechecking: {st}')
+    log.debug(lambda: f'AST after typechecking: {pprint.pformat(m)}')
     return st
@@ -0,0 +1,242 @@
+"""
+Vectorization of counted loops over int arrays, used by array_interp and
+array_closureInterp. The loops are executed with NumPy.
+
+A loop is vectorized if it has the form
+
+    while i < n:        (or i != n; n is a variable, a constant or len(a))
+        s
+        i = i + 1
+
+where s is either a reduction `acc = acc + e` (e.g. a sum or a dot product) or an
+element-wise map `a[i] = e` (a fill if e does not access an array). The expression e
+consists of int constants, variables not assigned in the loop, elements b[i] of int
+arrays, +, - and * and unary minus. All arrays are accessed at index i only, so the
+k-th iteration only reads and writes elements at index i+k. Hence aliasing between
+the arrays does not change the result.
+
+Recognizing a loop only depends on the AST. Whether a recognized loop really runs
+vectorized is decided each time the loop is entered. All arrays must be int64 buffers
+(see array_interp.mkBuffer), all indices must be in bounds, and no intermediate value
+may exceed 64 bits. The last condition is checked with python ints, from bounds on
+the absolute values of all subexpressions. Otherwise the loop runs element by element
+as usual. The results are therefore always those of python int arithmetic.
+
+NumPy is optional: without it, no loop is vectorized.
+"""
+from lang_array.array_ast import *
+from typing import *
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Shorter loops are cheaper to run element by element
+MIN_ITERATIONS = 16
+
+INT64_MAX = 2**63 - 1
+
+@dataclass
+class Reduction:
+    acc: int # slot of the accumulator
+    exp: exp
+
+@dataclass
+class Map:
+    array: int # slot of the array written
+    exp: exp
+
+@dataclass
+class CountedLoop:
+    counter: int # slot of i
+    strict: bool # i < n if True, i != n otherwise
+    bound: exp
+    body: Reduction | Map
+
+def isIntArray(e: exp) -> bool:
+    match e.ty:
+        case NotVoid(Array(Int())):
+            return True
+        case _:
+            return False
+
+def isElementwise(e: exp, counter: int, assigned: int) -> bool:
+    """
+    Checks that e only accesses arrays at the counter, and does not read the counter
+    or the variable assigned in the loop.
+    """
+    match e:
+        case IntConst():
+            return True
+        case Name(_, int(slot)):
+            return slot != counter and slot != assigned
+        case Subscript(Name(_, int(slot)) as a, Name(_, int(idx))):
+            return idx == counter and slot != counter and isIntArray(a)
+        case UnOp(USub(), sub):
+            return isElementwise(sub, counter, assigned)
+        case BinOp(left, Add() | Sub() | Mul(), right):
+            return isElementwise(left, counter, assigned) and \
+                isElementwise(right, counter, assigned)
+        case _:
+            return False
+
+def recognize(s: WhileStmt) -> Optional[CountedLoop]:
+    if np is None:
+        return None
+    match s:
+        case WhileStmt(BinOp(Name(_, int(i)), Less() | NotEq() as op, bound),
+                       [body, Assign(_, BinOp(Name(_, int(i2)), Add(), IntConst(1)), int(i3))]) \
+                if i == i2 == i3:
+            pass
+        case _:
+            return None
+    match body:
+        case Assign(_, BinOp(Name(_, int(acc)), Add(), e), int(acc2)) \
+                if acc == acc2 and acc != i and isElementwise(e, i, acc):
+            loop = Reduction(acc, e)
+        case Assign(_, BinOp(e, Add(), Name(_, int(acc))), int(acc2)) \
+                if acc == acc2 and acc != i and isElementwise(e, i, acc):
+            loop = Reduction(acc, e)
+        case SubscriptAssign(Name(_, int(a)) as left, Name(_, int(idx)), e) \
+                if idx == i and a != i and isIntArray(left) and isElementwise(e, i, i):
+            loop = Map(a, e)
+        case _:
+            return None
+    match bound:
+        case IntConst():
+            pass
+        case Name(_, int(n)) if n != i and (not isinstance(loop, Reduction) or n != loop.acc):
+            pass
+        case Call(Ident('len'), [Name(_, int(a))]) if a != i:
+            pass
+        case _:
+            return None
+    return CountedLoop(i, isinstance(op, Less), bound, loop)
+
+def arraySlots(e: exp, acc: list[int]):
+    match e:
+        case Subscript(Name(_, int(slot))):
+            acc.append(slot)
+        case UnOp(_, sub):
+            arraySlots(sub, acc)
+        case BinOp(left, _, right):
+            arraySlots(left, acc)
+            arraySlots(right, acc)
+        case _:
+            pass
+
+def isInt(v: Any) -> TypeGuard[int]:
+    # Addresses are ints as well, but they are never used as int values here
+    return type(v) is int
+
+def run(loop: CountedLoop, env: list[Any], resolve: Callable[[Any], Any]) -> bool:
+    """
+    Runs the loop vectorized, starting with the current value of the counter in env.
+    resolve maps an array value to its buffer. Returns False, without changing
+    anything, if the loop must run element by element.
+    """
+    assert np is not None
+    start = env[loop.counter]
+    match loop.bound:
+        case IntConst(n):
+            end = n
+        case Name(_, int(slot)):
+            end = env[slot]
+        case Call(_, [Name(_, int(slot))]):
+            end = len(resolve(env[slot]))
+        case _:
+            return False
+    if not isInt(start) or not isInt(end) or start < 0:
+        return False
+    if end < start:
+        if not loop.strict:
+            return False # does not terminate normally
+        return True
+    count = end - start
+    if count < MIN_ITERATIONS:
+        return False
+    # Views of the elements start, ..., end-1 of all arrays
+    slots: list[int] = []
+    arraySlots(loop.body.exp, slots)
+    if isinstance(loop.body, Map):
+        slots.append(loop.body.array)
+    views: dict[int, Any] = {}
+    for slot in slots:
+        buf: array[int] | bytearray | list[Any] = resolve(env[slot]) # see array_interp.Buffer
+        if not isinstance(buf, array) or buf.typecode != 'q' or len(buf) < end:
+            return False
+        views[slot] = np.frombuffer(buf, dtype=np.int64)[start:end]
+    bound = absBound(loop.body.exp, env, views)
+    if bound is None:
+        return False
+    match loop.body:
+        case Reduction(acc, e):
+            old = env[acc]
+            if not isInt(old) or count * bound > INT64_MAX:
+                return False
+            v = evalExp(e, env, views)
+            if isinstance(v, int):
+                total = count * v
+            else:
+                total = int(v.sum(dtype=np.int64))
+            env[acc] = old + total
+        case Map(a, e):
+            views[a][:] = evalExp(e, env, views)
+    env[loop.counter] = end
+    return True
+
+def absBound(e: exp, env: list[Any], views: dict[int, Any]) -> Optional[int]:
+    """
+    Returns a bound on the absolute values of e for all iterations, or None if some
+    subexpression might not fit into 64 bits.
+    """
+    match e:
+        case IntConst(v):
+            b = abs(v)
+        case Name(_, int(slot)):
+            v = env[slot]
+            if not isInt(v):
+                return None
+            b = abs(v)
+        case Subscript(Name(_, int(slot))):
+            view = views[slot]
+            b = max(abs(int(view.min())), abs(int(view.max())))
+        case UnOp(_, sub):
+            b = absBound(sub, env, views)
+        case BinOp(left, op, right):
+            l = absBound(left, env, views)
+            r = absBound(right, env, views)
+            if l is None or r is None:
+                return None
+            b = l * r if isinstance(op, Mul) else l + r
+        case _:
+            return None
+    if b is None or b > INT64_MAX:
+        return None
+    return b
+
+def evalExp(e: exp, env: list[Any], views: dict[int, Any]) -> Any:
+    """
+    Evaluates e for all iterations. The result is an int if e does not access arrays,
+    otherwise a NumPy array.
+    """
+    match e:
+        case IntConst(v):
+            return v
+        case Name(_, int(slot)):
+            return env[slot]
+        case Subscript(Name(_, int(slot))):
+            return views[slot]
+        case UnOp(_, sub):
+            return -evalExp(sub, env, views)
+        case BinOp(left, op, right):
+            l = evalExp(left, env, views)
+            r = evalExp(right, env, views)
+            match op:
+                case Add(): return l + r
+                case Sub(): return l - r
+                case _: return l * r
+        case _:
+            raise Exception(f'Unexpected expression in vectorized loop: {e}')
@@ -1,92 +1,100 @@
-# AUTOMATICALLY GENERATED (2024-02-28 12:34:07)
+# AUTOMATICALLY GENERATED (2026-10-18 21:22:48)
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from lang_fun.fun_astCommon import *
 
 @dataclass
 class IntConst:
     value: int
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class BoolConst:
     value: bool
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class Name:
     var: ident
     scope: optional[scope] = None
-    ty: optional[resultTy] = None
+    slot: optional[int] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class Call:
     fun: exp
     args: list[exp]
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class UnOp:
     op: unaryop
     arg: exp
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class BinOp:
     left: exp
     op: binaryop
     right: exp
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class ArrayInitDyn:
     len: exp
     elemInit: exp
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class ArrayInitStatic:
     elemInit: list[exp]
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class Subscript:
     array: exp
     index: exp
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 type exp = IntConst | BoolConst | Name | Call | UnOp | BinOp | ArrayInitDyn | ArrayInitStatic | Subscript
 
 @dataclass
 class StmtExp:
     exp: exp
+    lineno: optional[int] = field(default=None, compare=False)
 
 @dataclass
 class Assign:
     var: ident
     right: exp
+    slot: optional[int] = None
+    lineno: optional[int] = field(default=None, compare=False)
 
 @dataclass
 class IfStmt:
     cond: exp
     thenBody: list[stmt]
     elseBody: list[stmt]
+    lineno: optional[int] = field(default=None, compare=False)
 
 @dataclass
 class WhileStmt:
     cond: exp
     body: list[stmt]
+    lineno: optional[int] = field(default=None, compare=False)
 
 @dataclass
 class SubscriptAssign:
     left: exp
     index: exp
     right: exp
+    lineno: optional[int] = field(default=None, compare=False)
 
 @dataclass
 class Return:
     result: optional[exp] = None
+    lineno: optional[int] = field(default=None, compare=False)
 
 type stmt = StmtExp | Assign | IfStmt | WhileStmt | SubscriptAssign | Return
 
@@ -96,6 +104,8 @@ class FunDef:
     params: list[funParam]
     result: resultTy
     body: list[stmt]
+    frameSize: optional[int] = None
+    lineno: optional[int] = field(default=None, compare=False)
 
 type fun = FunDef
 
@@ -103,5 +113,6 @@ type fun = FunDef
 class Module:
     funs: list[fun]
     stmts: list[stmt]
+    filename: optional[string] = field(default=None, compare=False)
 
 type mod = Module
\ No newline at end of file
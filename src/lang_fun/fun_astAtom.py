@@ -1,4 +1,4 @@
-# AUTOMATICALLY GENERATED (2024-02-28 14:03:04)
+# AUTOMATICALLY GENERATED (2026-10-18 23:58:21)
 from __future__ import annotations
 from dataclasses import dataclass
 
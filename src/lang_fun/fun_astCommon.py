@@ -1,6 +1,7 @@
-# AUTOMATICALLY GENERATED (2024-03-13 15:00:05)
+# AUTOMATICALLY GENERATED (2026-10-18 23:58:21)
 from __future__ import annotations
 from dataclasses import dataclass
+from typing import Any, Self
 
 type optional[T] = T | None
 
@@ -11,6 +12,15 @@ class Ident:
 type ident = Ident
 type string = str
 
+_interned: dict[tuple[Any, ...], Any] = {}
+
+def _intern[T](cls: type[T], key: tuple[Any, ...], **fields: Any) -> T:
+    x = object.__new__(cls)
+    for n, v in fields.items():
+        object.__setattr__(x, n, v)
+    _interned[key] = x
+    return x
+
 @dataclass
 class USub:
     pass
@@ -71,32 +81,77 @@ class Or:
 
 type binaryop = Add | Sub | Mul | Less | LessEq | Greater | GreaterEq | Eq | NotEq | Is | And | Or
 
-@dataclass
+@dataclass(frozen=True, eq=False, init=False)
 class Int:
-    pass
-
-@dataclass
+    def __new__(cls) -> Self:
+        key = (cls,)
+        x: Self | None = _interned.get(key)
+        if x is None:
+            x = _intern(cls, key)
+        return x
+    def __reduce__(self):
+        return (Int, ())
+
+@dataclass(frozen=True, eq=False, init=False)
 class Bool:
-    pass
-
-@dataclass
+    def __new__(cls) -> Self:
+        key = (cls,)
+        x: Self | None = _interned.get(key)
+        if x is None:
+            x = _intern(cls, key)
+        return x
+    def __reduce__(self):
+        return (Bool, ())
+
+@dataclass(frozen=True, eq=False, init=False)
 class Array:
     elemTy: ty
-
-@dataclass
+    def __new__(cls, elemTy: ty) -> Self:
+        key = (cls, elemTy)
+        x: Self | None = _interned.get(key)
+        if x is None:
+            x = _intern(cls, key, elemTy=elemTy)
+        return x
+    def __reduce__(self):
+        return (Array, (self.elemTy,))
+
+@dataclass(frozen=True, eq=False, init=False)
 class Fun:
     params: list[ty]
     result: resultTy
+    def __new__(cls, params: list[ty], result: resultTy) -> Self:
+        key = (cls, tuple(params), result)
+        x: Self | None = _interned.get(key)
+        if x is None:
+            x = _intern(cls, key, params=params, result=result)
+        return x
+    def __reduce__(self):
+        return (Fun, (self.params, self.result))
 
 type ty = Int | Bool | Array | Fun
 
-@dataclass
+@dataclass(frozen=True, eq=False, init=False)
 class NotVoid:
     ty: ty
-
-@dataclass
+    def __new__(cls, ty: ty) -> Self:
+        key = (cls, ty)
+        x: Self | None = _interned.get(key)
+        if x is None:
+            x = _intern(cls, key, ty=ty)
+        return x
+    def __reduce__(self):
+        return (NotVoid, (self.ty,))
+
+@dataclass(frozen=True, eq=False, init=False)
 class Void:
-    pass
+    def __new__(cls) -> Self:
+        key = (cls,)
+        x: Self | None = _interned.get(key)
+        if x is None:
+            x = _intern(cls, key)
+        return x
+    def __reduce__(self):
+        return (Void, ())
 
 type resultTy = NotVoid | Void
 
@@ -0,0 +1,282 @@
+"""
+Alternative execution engine for lang_fun (main.py interp --engine=closures).
+
+After type checking, every node of the AST is translated exactly once into a python
+closure. Running the program then only calls these closures, so the pattern matching
+of fun_interp.interpExp and fun_interp.interpStmt is not repeated for every
+evaluation of an expression or statement. The store is shared with fun_interp.
+
+Statement closures return FALLTHROUGH if execution continues with the next statement.
+A statement `return f(...)` with a user-defined function f returns a TailCall, which
+Function.run executes without growing the python stack. Any other result is the
+value of a return statement.
+"""
+from __future__ import annotations
+from lang_fun.fun_ast import *
+import lang_fun.fun_tychecker as fun_tychecker
+import lang_fun.fun_resolver as fun_resolver
+from lang_fun.fun_interp import Store, StoreValue, arrayElemTy, FALLTHROUGH, asInt, asValue, asAddress
+import common.utils as utils
+import common.interpIO as interpIO
+import common.profiler as profiler
+from common.compilerSupport import CompilerConfig
+import common.log as log
+from typing import *
+
+type Env = list[Any] # indexed by the slots of the variables
+type ExpFun = Callable[[Env], Any]
+type StmtFun = Callable[[Env], Any]
+
+class Function:
+    """
+    Runtime value of a user-defined function. The body is filled in after all
+    functions have been created, so that functions can refer to each other.
+    """
+    def __init__(self, name: ident, frameSize: int, store: Store):
+        self.name = name
+        self.body: StmtFun = lambda env: FALLTHROUGH
+        self.frameSize = frameSize
+        self.store = store
+    def mkFrame(self, argFs: list[ExpFun], env: Env) -> Env:
+        """
+        Evaluates the arguments in env and returns a fresh frame for the body. The frame
+        is pushed on store.envs first, so that the arguments are roots for the garbage
+        collector.
+        """
+        frame: Env = self.frameSize * [None]
+        self.store.envs.append(frame)
+        # The arguments occupy the first slots of the frame
+        for i, a in enumerate(argFs):
+            frame[i] = asValue(a(env))
+        return frame
+    def run(self, frame: Env) -> Any:
+        """
+        Runs the body in the frame created by mkFrame and pops the frame afterwards.
+        """
+        envs = self.store.envs
+        f = self
+        while True:
+            r = f.body(frame)
+            if isinstance(r, TailCall):
+                # The frame of the called function is already on top of store.envs
+                del envs[-2]
+                f = r.fun
+                frame = r.frame
+            else:
+                envs.pop()
+                return None if r is FALLTHROUGH else r
+    def __repr__(self):
+        return f'Function({self.name.name})'
+
+@dataclass
+class TailCall:
+    fun: Function
+    frame: Env
+
+type FunTable = list[Function] # indexed by the slots of the functions
+
+def asFunction(v: Any) -> Function:
+    assert isinstance(v, Function)
+    return v
+
+def compileFuncall(fun: exp, args: list[exp], funs: FunTable, store: Store) -> ExpFun:
+    match (fun, args):
+        case (Name(Ident('input_int')), []):
+            return lambda env: interpIO.inputInt('Enter some int: ')
+        case (Name(Ident('print')), [e]):
+            f = compileExp(e, funs, store)
+            def printFun(env: Env):
+                interpIO.printValue(asInt(f(env)))
+            return printFun
+        case (Name(Ident('len')), [e]):
+            f = compileExp(e, funs, store)
+            return lambda env: len(store.resolve(asAddress(f(env))))
+        case (Name(_, UserFun(), slot), _):
+            # Direct call of a global function, no need to evaluate fun
+            g = funs[utils.assertNotNone(slot)]
+            argFs = [compileExp(a, funs, store) for a in args]
+            return lambda env: g.run(g.mkFrame(argFs, env))
+        case _:
+            f = compileExp(fun, funs, store)
+            argFs = [compileExp(a, funs, store) for a in args]
+            def call(env: Env):
+                g = asFunction(f(env))
+                return g.run(g.mkFrame(argFs, env))
+            return call
+
+def compileExp(e: exp, funs: FunTable, store: Store) -> ExpFun:
+    match e:
+        case IntConst(value):
+            return lambda env: value
+        case BoolConst(value):
+            return lambda env: value
+        case Call(fun, args):
+            return compileFuncall(fun, args, funs, store)
+        case UnOp(op, sub):
+            f = compileExp(sub, funs, store)
+            match op:
+                case USub(): return lambda env: -f(env)
+                case Not(): return lambda env: not f(env)
+        case BinOp(left, op, right):
+            l = compileExp(left, funs, store)
+            r = compileExp(right, funs, store)
+            match op:
+                case Sub(): return lambda env: l(env) - r(env)
+                case Add(): return lambda env: l(env) + r(env)
+                case Mul(): return lambda env: l(env) * r(env)
+                case Less(): return lambda env: l(env) < r(env)
+                case LessEq(): return lambda env: l(env) <= r(env)
+                case Greater(): return lambda env: l(env) > r(env)
+                case GreaterEq(): return lambda env: l(env) >= r(env)
+                case Eq(): return lambda env: l(env) == r(env)
+                case NotEq(): return lambda env: l(env) != r(env)
+                case Is():
+                    def isOp(env: Env):
+                        # x must stay alive, otherwise r might reuse its address
+                        x = l(env)
+                        store.tmps.append(x)
+                        y = r(env)
+                        store.tmps.pop()
+                        return x == y # compare Address values by ==
+                    return isOp
+                case And(): return lambda env: r(env) if l(env) else False
+                case Or(): return lambda env: True if l(env) else r(env)
+        case Name(_, UserFun(), slot):
+            g = funs[utils.assertNotNone(slot)]
+            return lambda env: g
+        case Name(_, Var(), slot):
+            i = utils.assertNotNone(slot)
+            return lambda env: env[i]
+        case Name(name):
+            raise ValueError(f'Variable {name.name} not resolved')
+        case ArrayInitDyn(lenExp, initExp):
+            n = compileExp(lenExp, funs, store)
+            v = compileExp(initExp, funs, store)
+            elemTy = arrayElemTy(e)
+            def arrayInitDyn(env: Env):
+                k = asInt(n(env))
+                x = asValue(v(env))
+                store.tmps.append(x)
+                a = store.allocN(elemTy, k, x)
+                store.tmps.pop()
+                return a
+            return arrayInitDyn
+        case ArrayInitStatic(es):
+            fs = [compileExp(e, funs, store) for e in es]
+            elemTy = arrayElemTy(e)
+            def arrayInitStatic(env: Env):
+                # The elements evaluated so far are roots while evaluating the others
+                tmps = store.tmps
+                n = len(tmps)
+                for f in fs:
+                    tmps.append(asValue(f(env)))
+                a = store.alloc(elemTy, cast(StoreValue, tmps[n:]))
+                del tmps[n:]
+                return a
+            return arrayInitStatic
+        case Subscript(arrayExp, indexExp):
+            a = compileExp(arrayExp, funs, store)
+            i = compileExp(indexExp, funs, store)
+            def subscript(env: Env):
+                x = asAddress(a(env))
+                store.tmps.append(x)
+                idx = asInt(i(env))
+                store.tmps.pop()
+                return store.load(x, idx)
+            return subscript
+    raise Exception(f'No match for expression {e}')
+
+def compileStmt(s: stmt, funs: FunTable, store: Store) -> StmtFun:
+    match s:
+        case StmtExp(e):
+            f = compileExp(e, funs, store)
+            def stmtExp(env: Env):
+                f(env)
+                return FALLTHROUGH
+            return stmtExp
+        case Assign(_, e, slot):
+            i = utils.assertNotNone(slot)
+            f = compileExp(e, funs, store)
+            def assign(env: Env):
+                env[i] = f(env)
+                return FALLTHROUGH
+            return assign
+        case IfStmt(cond, thenBody, elseBody):
+            c = compileExp(cond, funs, store)
+            thenF = compileStmts(thenBody, funs, store)
+            elseF = compileStmts(elseBody, funs, store)
+            def ifStmt(env: Env):
+                if c(env):
+                    return thenF(env)
+                else:
+                    return elseF(env)
+            return ifStmt
+        case WhileStmt(cond, body):
+            c = compileExp(cond, funs, store)
+            bodyF = compileStmts(body, funs, store)
+            def whileStmt(env: Env):
+                while c(env):
+                    r = bodyF(env)
+                    if r is not FALLTHROUGH:
+                        return r
+                return FALLTHROUGH
+            return whileStmt
+        case SubscriptAssign(leftExp, idxExp, rightExp):
+            i = compileExp(idxExp, funs, store)
+            r = compileExp(rightExp, funs, store)
+            a = compileExp(leftExp, funs, store)
+            def subscriptAssign(env: Env):
+                idx = asInt(i(env))
+                v = r(env)
+                store.tmps.append(v)
+                x = asAddress(a(env))
+                store.tmps.pop()
+                store.storeValue(x, idx, v)
+                return FALLTHROUGH
+            return subscriptAssign
+        case Return(Call(Name(_, BuiltinFun())) as e):
+            return compileExp(e, funs, store)
+        case Return(Call(Name(_, UserFun(), slot), args)):
+            g = funs[utils.assertNotNone(slot)]
+            argFs = [compileExp(a, funs, store) for a in args]
+            return lambda env: TailCall(g, g.mkFrame(argFs, env))
+        case Return(Call(fun, args)):
+            f = compileExp(fun, funs, store)
+            argFs = [compileExp(a, funs, store) for a in args]
+            def tailCall(env: Env):
+                g = asFunction(f(env))
+                return TailCall(g, g.mkFrame(argFs, env))
+            return tailCall
+        case Return(e):
+            if e is None:
+                return lambda env: None
+            else:
+                return compileExp(e, funs, store)
+
+def compileStmts(stmts: list[stmt], funs: FunTable, store: Store) -> StmtFun:
+    fs = [profiler.wrapStmt(s.lineno, compileStmt(s, funs, store)) for s in stmts]
+    match fs:
+        case [f]:
+            return f
+        case _:
+            def block(env: Env):
+                for f in fs:
+                    r = f(env)
+                    if r is not FALLTHROUGH:
+                        return r
+                return FALLTHROUGH
+            return block
+
+def interpModule(m: mod, cfg: CompilerConfig = CompilerConfig.default()):
+    utils.assertType(m, Module)
+    tyRes = fun_tychecker.tycheckModule(m)
+    env: Env = fun_resolver.resolveModule(m, tyRes) * [None]
+    store = Store(cfg)
+    store.envs.append(env)
+    funs: FunTable = [Function(f.name, utils.assertNotNone(f.frameSize), store) for f in m.funs]
+    for f, g in zip(m.funs, funs):
+        g.body = profiler.wrapFun(f.name.name, compileStmts(f.body, funs, store))
+    prog = profiler.wrapFun('<module>', compileStmts(m.stmts, funs, store))
+    prog(env)
+    log.info(f'Garbage collector: {store.stats}')
+    log.debug(lambda: f'After executing program.\nEnv: {env}\nStore: {store}')
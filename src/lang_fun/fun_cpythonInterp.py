@@ -0,0 +1,14 @@
+"""
+Alternative execution engine for lang_fun (main.py interp --engine=cpython). After type
+checking, the source of the program runs with CPython, see common.cpythonInterp.
+"""
+from lang_fun.fun_ast import *
+import lang_fun.fun_tychecker as fun_tychecker
+import common.cpythonInterp as cpythonInterp
+import common.utils as utils
+from common.compilerSupport import CompilerConfig
+
+def interpModule(m: mod, cfg: CompilerConfig = CompilerConfig.default()):
+    utils.assertType(m, Module)
+    fun_tychecker.tycheckModule(m)
+    cpythonInterp.runModule(m.filename, cfg)
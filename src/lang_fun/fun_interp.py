@@ -1,63 +1,298 @@
 from lang_fun.fun_ast import *
 import lang_fun.fun_tychecker as fun_tychecker
+import lang_fun.fun_resolver as fun_resolver
+import lang_fun.fun_purity as fun_purity
 import common.utils as utils
+import common.interpIO as interpIO
+from common.compilerSupport import CompilerConfig
+from common.genericInterp import ArraySizeError, OutOfMemoryError
 import common.log as log
 from typing import *
+from array import array
+from collections import OrderedDict
+import time
 
-@dataclass(frozen=True)
-class Address:
-    value: int
+class Address(int):
+    """
+    Index into Store.content. Addresses are ints, the subclass allows the garbage
+    collector to tell them apart from int values.
+    """
     def __repr__(self):
-        return f'Address({self.value})'
+        return f'Address({int(self)})'
 
-type FunEnv = dict[Ident, FunDef]
-type Env = dict[Ident, TyValue]
+type FunTable = tuple[FunDef, ...] # indexed by the slots of the functions
+type Env = list[Optional[TyValue]] # indexed by the slots of the variables
 type TyValue = int | bool | Address | FunDef
 type StoreValue = list[TyValue]
+type Buffer = array[int] | bytearray | StoreValue
 
-class ReturnException(Exception):
-    def __init__(self, value: TyValue | None):
-        self.value = value
+def mkBuffer(elemTy: ty, vals: StoreValue) -> Buffer:
+    """
+    Returns a buffer holding vals. Arrays of ints and bools are stored compactly, all
+    other arrays (and int arrays with values not fitting into 64 bits) as python lists.
+    """
+    try:
+        match elemTy:
+            case Int():
+                return array('q', cast(list[int], vals))
+            case Bool():
+                return bytearray(cast(list[bool], vals))
+            case _:
+                return vals
+    except OverflowError:
+        return vals
+
+def elemSize(elemTy: ty) -> int:
+    """
+    Size of an array element in bytes, as in the Wasm backend.
+    """
+    match elemTy:
+        case Int():
+            return 8
+        case _:
+            return 4
+
+# Size of the header (the length) of an array in bytes
+ARRAY_HEADER_SIZE = 4
+# The memory of the Wasm backend starts with the data for the error messages
+DATA_SIZE = 100
+PAGE_SIZE = 64 * 1024
+
+def arrayElemTy(e: exp) -> ty:
+    match e.ty:
+        case NotVoid(Array(elemTy)):
+            return elemTy
+        case t:
+            raise Exception(f'Expression {e} does not have an array type but {t}')
+
+class Fallthrough:
+    def __repr__(self):
+        return 'FALLTHROUGH'
+
+# Result of executing a statement that does not return from the current function
+FALLTHROUGH = Fallthrough()
+
+# The garbage collector runs when the bytes allocated since the last collection exceed
+# the live bytes after the last collection, but not before GC_MIN_BYTES were allocated.
+# All sizes are computed as in the Wasm backend.
+GC_MIN_BYTES = 1024 * 1024
+
+@dataclass
+class GcStats:
+    collections: int = 0
+    liveBytes: int = 0
+    freedBytes: int = 0
+    totalPause: float = 0.0 # seconds
+    maxPause: float = 0.0 # seconds
+    def __str__(self):
+        return f'{self.collections} collections, {self.liveBytes} live bytes, ' \
+            f'{self.freedBytes} bytes freed, total pause {self.totalPause * 1000:.3f}ms, ' \
+            f'max pause {self.maxPause * 1000:.3f}ms'
+
+class MemoCache:
+    """
+    Results of calls of a pure function, keyed by the arguments. Holds at most maxSize
+    results, the least recently used result is evicted first.
+    """
+    def __init__(self, name: str, maxSize: int):
+        self.name = name
+        self.maxSize = maxSize
+        self.results: OrderedDict[tuple[TyValue, ...], Optional[TyValue]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    def lookup(self, key: tuple[TyValue, ...]) -> tuple[bool, Optional[TyValue]]:
+        if key in self.results:
+            self.hits += 1
+            self.results.move_to_end(key)
+            return (True, self.results[key])
+        self.misses += 1
+        return (False, None)
+    def add(self, key: tuple[TyValue, ...], v: Optional[TyValue]):
+        self.results[key] = v
+        if len(self.results) > self.maxSize:
+            self.results.popitem(last=False)
+            self.evictions += 1
+    def __str__(self):
+        return f'{self.name}: {self.hits} hits, {self.misses} misses, ' \
+            f'{self.evictions} evictions, {len(self.results)} cached results'
 
 class Store:
-    def __init__(self):
-        self.content: dict[Address, StoreValue] = {}
-        self.funEnv: FunEnv = {}
-        self.__freshAddress = Address(0)
-    def alloc(self, val: StoreValue):
-        x = self.__freshAddress
-        self.__freshAddress = Address(x.value + 1)
-        self.content[x] = val
-        return x
-    def resolve(self, a: Address) -> StoreValue:
-        return self.content[a]
+    def __init__(self, cfg: CompilerConfig, funs: FunTable = ()):
+        # None marks an address whose buffer has been collected
+        self.content: list[Optional[Buffer]] = []
+        self.sizes: list[int] = [] # size in bytes of the buffer at each address
+        self.freeAddresses: list[Address] = []
+        self.maxArraySize = cfg.maxArraySize
+        self.maxHeapSize = cfg.maxMemSize * PAGE_SIZE - DATA_SIZE
+        # Shared by all calls, never modified after construction
+        self.funs = funs
+        # Indexed by the slots of the functions, empty if memoization is off
+        self.memo: tuple[Optional[MemoCache], ...] = ()
+        # Roots for the garbage collector: the environments of all running code and
+        # the values the interpreter holds while evaluating an expression
+        self.envs: list[Env] = []
+        self.tmps: list[Optional[TyValue]] = []
+        self.stats = GcStats()
+        self.heapBytes = 0 # size of all buffers not collected yet
+        self.__allocatedBytes = 0
+        self.__threshold = GC_MIN_BYTES
+    def __reserve(self, elemTy: ty, n: int) -> int:
+        """
+        Checks that an array with n elements can be allocated, returns its size. The
+        caller must keep all values to be stored in the array alive.
+        """
+        size = ARRAY_HEADER_SIZE + n * elemSize(elemTy)
+        if n < 0 or size > self.maxArraySize:
+            raise ArraySizeError(f'Invalid size of array: {n} elements')
+        if self.heapBytes + size > self.maxHeapSize:
+            self.collect()
+            if self.heapBytes + size > self.maxHeapSize:
+                raise OutOfMemoryError(f'Cannot allocate {size} bytes, ' \
+                    f'{self.heapBytes} of {self.maxHeapSize} bytes are in use')
+        return size
+    def __add(self, buf: Buffer, size: int) -> Address:
+        if self.freeAddresses:
+            a = self.freeAddresses.pop()
+            self.content[a] = buf
+            self.sizes[a] = size
+        else:
+            a = Address(len(self.content))
+            self.content.append(buf)
+            self.sizes.append(size)
+        self.heapBytes += size
+        self.__allocatedBytes += size
+        if self.__allocatedBytes > self.__threshold:
+            self.tmps.append(a)
+            self.collect()
+            self.tmps.pop()
+        return a
+    def alloc(self, elemTy: ty, vals: StoreValue) -> Address:
+        size = self.__reserve(elemTy, len(vals))
+        return self.__add(mkBuffer(elemTy, vals), size)
+    def allocN(self, elemTy: ty, n: int, v: TyValue) -> Address:
+        """
+        Allocates an array with n copies of v, without creating a list of size n.
+        """
+        size = self.__reserve(elemTy, n)
+        return self.__add(mkBuffer(elemTy, [v]) * n, size)
+    def resolve(self, a: Address) -> Buffer:
+        return utils.assertNotNone(self.content[a])
+    def load(self, a: Address, i: int) -> TyValue:
+        buf = self.resolve(a)
+        if isinstance(buf, bytearray):
+            return bool(buf[i])
+        return buf[i]
     def storeValue(self, a: Address, i: int, v: TyValue):
-        l = self.content[a]
-        l[i] = v
+        buf = self.resolve(a)
+        try:
+            buf[i] = v # type: ignore
+        except OverflowError:
+            # v does not fit into 64 bits, continue with a python list
+            l: StoreValue = list(buf)
+            l[i] = v
+            self.content[a] = l
+    def collect(self):
+        """
+        Mark and sweep. Only python lists can hold addresses, typed buffers are
+        never scanned.
+        """
+        t0 = time.perf_counter()
+        marked = bytearray(len(self.content))
+        todo: list[Address] = [v for env in self.envs for v in env if isinstance(v, Address)]
+        todo.extend(v for v in self.tmps if isinstance(v, Address))
+        while todo:
+            a = todo.pop()
+            if marked[a]:
+                continue
+            marked[a] = 1
+            buf = self.content[a]
+            if isinstance(buf, list):
+                todo.extend(v for v in buf if isinstance(v, Address))
+        live = 0
+        freed = 0
+        for i, buf in enumerate(self.content):
+            if buf is None:
+                continue
+            if marked[i]:
+                live += self.sizes[i]
+            else:
+                freed += self.sizes[i]
+                self.content[i] = None
+                self.freeAddresses.append(Address(i))
+        self.heapBytes = live
+        self.__allocatedBytes = 0
+        self.__threshold = max(GC_MIN_BYTES, live)
+        pause = time.perf_counter() - t0
+        self.stats.collections += 1
+        self.stats.liveBytes = live
+        self.stats.freedBytes += freed
+        self.stats.totalPause += pause
+        self.stats.maxPause = max(self.stats.maxPause, pause)
     def __repr__(self):
         return f'Store({self.content})'
 
 def interpFuncall(fun: exp, args: list[exp], env: Env, store: Store) -> Optional[TyValue]:
+    match fun:
+        case Name(_, UserFun(), int(slot)):
+            # Direct call of a global function, no need to evaluate fun
+            if store.memo and (cache := store.memo[slot]) is not None:
+                return callMemoized(store.funs[slot], cache, args, env, store)
+            return callFun(store.funs[slot], args, env, store)
+        case Name(_, BuiltinFun()):
+            return interpBuiltinFuncall(fun, args, env, store)
+        case _:
+            return callFun(asFunDef(interpExp(fun, env, store)), args, env, store)
+
+def interpBuiltinFuncall(fun: exp, args: list[exp], env: Env, store: Store) -> Optional[TyValue]:
     match (fun, args):
         case (Name(Ident('input_int')), []):
-            return int(utils.inputInt('Enter some int: '))
+            return interpIO.inputInt('Enter some int: ')
         case (Name(Ident('print')), [e]):
             v = asInt(interpExp(e, env, store))
-            print(v)
+            interpIO.printValue(v)
             return None
         case (Name(Ident('len')), [e]):
             v = asAddress(interpExp(e, env, store))
             return len(store.resolve(v))
         case _:
-            f = asFunDef(interpExp(fun, env, store))
-            xs = [p.var for p in f.params]
-            vs = [asValue(interpExp(a, env, store)) for a in args]
-            localEnv = cast(Env, store.funEnv.copy())
-            localEnv.update(zip(xs, vs))
-            try:
-                interpStmts(f.body, localEnv, store)
-            except ReturnException as e:
-                return e.value
+            raise Exception(f'No match for builtin function call of {fun}')
+
+def mkFrameEnv(f: FunDef, args: list[exp], env: Env, store: Store) -> Env:
+    """
+    Evaluates the arguments in env and returns a fresh environment for the body of f.
+    The new environment is pushed on store.envs before evaluating the arguments, so
+    that the values of the arguments are roots for the garbage collector.
+    """
+    localEnv = cast(Env, utils.assertNotNone(f.frameSize) * [None])
+    store.envs.append(localEnv)
+    # The parameters occupy the first slots of the frame
+    for i, a in enumerate(args):
+        localEnv[i] = asValue(interpExp(a, env, store))
+    return localEnv
+
+def callFun(f: FunDef, args: list[exp], env: Env, store: Store) -> Optional[TyValue]:
+    """
+    Calls the user-defined function f, its body runs in a fresh frame.
+    """
+    r = interpStmts(f.body, mkFrameEnv(f, args, env, store), store)
+    store.envs.pop()
+    return r
+
+def callMemoized(f: FunDef, cache: MemoCache, args: list[exp], env: Env,
+                 store: Store) -> Optional[TyValue]:
+    """
+    Calls the memoizable function f, the body only runs if the cache has no result
+    for the arguments.
+    """
+    localEnv = mkFrameEnv(f, args, env, store)
+    key = tuple(cast(list[TyValue], localEnv[:len(f.params)]))
+    (found, r) = cache.lookup(key)
+    if not found:
+        r = interpStmts(f.body, localEnv, store)
+        cache.add(key, r)
+    store.envs.pop()
+    return r
 
 def asInt(v: Optional[TyValue]) -> int:
     assert isinstance(v, int)
@@ -104,7 +339,12 @@ def interpExp(e: exp, env: Env, store: Store) -> Optional[TyValue]:
                 case GreaterEq(): return x >= interpExp(right, env, store)
                 case Eq(): return x == interpExp(right, env, store)
                 case NotEq(): return x != interpExp(right, env, store)
-                case Is(): return x == interpExp(right, env, store) # compare Address values by ==
+                case Is():
+                    # x must stay alive, otherwise right might reuse its address
+                    store.tmps.append(x)
+                    y = interpExp(right, env, store)
+                    store.tmps.pop()
+                    return x == y # compare Address values by ==
                 case And():
                     if x:
                         return interpExp(right, env, store)
@@ -115,69 +355,150 @@ def interpExp(e: exp, env: Env, store: Store) -> Optional[TyValue]:
                         return True
                     else:
                         return interpExp(right, env, store)
+        case Name(_, Var(), int(slot)):
+            return env[slot]
+        case Name(_, UserFun(), int(slot)):
+            return store.funs[slot]
         case Name(name):
-            if name in env:
-                return env[name]
-            else:
-                return store.funEnv[name]
+            raise ValueError(f'Variable {name.name} not resolved')
         case ArrayInitDyn(lenExp, initExp):
             n = asInt(interpExp(lenExp, env, store))
             v = asValue(interpExp(initExp, env, store))
-            return store.alloc(n * [v])
+            store.tmps.append(v)
+            a = store.allocN(arrayElemTy(e), n, v)
+            store.tmps.pop()
+            return a
         case ArrayInitStatic(es):
-            l = [asValue(interpExp(e, env, store)) for e in es]
-            return store.alloc(l)
+            # The elements evaluated so far are roots while evaluating the others
+            n = len(store.tmps)
+            for x in es:
+                store.tmps.append(asValue(interpExp(x, env, store)))
+            a = store.alloc(arrayElemTy(e), cast(StoreValue, store.tmps[n:]))
+            del store.tmps[n:]
+            return a
         case Subscript(arrayExp, indexExp):
             a = asAddress(interpExp(arrayExp, env, store))
+            store.tmps.append(a)
             i = asInt(interpExp(indexExp, env, store))
-            l = store.resolve(a)
-            return l[i]
+            store.tmps.pop()
+            return store.load(a, i)
     raise Exception(f'No match for expression {e}')
 
-def interpStmt(s: stmt, env: Env, store: Store, cont: list[stmt]) -> None:
+@dataclass
+class TailCall:
+    """
+    Result of a statement `return f(...)` where f is a user-defined function. The
+    function being executed is replaced by f, env holds the arguments for f.
+    """
+    fun: FunDef
+    env: Env
+
+@dataclass
+class Frame:
+    """
+    A block of statements under execution, pc is the index of the next statement.
+    """
+    stmts: list[stmt]
+    pc: int = 0
+
+type StmtResult = Optional[TyValue] | Fallthrough | TailCall
+
+def interpStmt(s: stmt, env: Env, store: Store, frames: list[Frame]) -> StmtResult:
+    """
+    Executes a single statement. Nested blocks are not executed directly, instead
+    a new frame is pushed on the frame stack. The result is FALLTHROUGH unless the
+    statement is a return statement.
+    """
     match s:
         case StmtExp(e):
             interpExp(e, env, store)
-            interpStmts(cont, env, store)
-        case Assign(x, e):
+        case Assign(_, e, int(slot)):
             v: Any = interpExp(e, env, store)
-            env[x] = v
-            interpStmts(cont, env, store)
+            env[slot] = v
         case IfStmt(cond, thenBody, elseBody):
             v = asBool(interpExp(cond, env, store))
             if v:
-                interpStmts(thenBody + cont, env, store)
+                frames.append(Frame(thenBody))
             else:
-                interpStmts(elseBody + cont, env, store)
+                frames.append(Frame(elseBody))
         case WhileStmt(cond, body):
             v = asBool(interpExp(cond, env, store))
             if v:
-                interpStmts(body + [s] + cont, env, store)
-            else:
-                interpStmts(cont, env, store)
+                # Re-execute the loop after the body has finished
+                frames[-1].pc -= 1
+                frames.append(Frame(body))
         case SubscriptAssign(leftExp, idxExp, rightExp):
             idx = asInt(interpExp(idxExp, env, store))
-            v = interpExp(rightExp, env, store)
+            v = asValue(interpExp(rightExp, env, store))
+            store.tmps.append(v)
             a = asAddress(interpExp(leftExp, env, store))
+            store.tmps.pop()
             store.storeValue(a, idx, v)
-            interpStmts(cont, env, store)
+        case Return(Call(Name(_, BuiltinFun())) as e):
+            return interpExp(e, env, store)
+        case Return(Call(Name(_, UserFun(), int(slot)), args)):
+            f = store.funs[slot]
+            if store.memo and (cache := store.memo[slot]) is not None:
+                # The result must be cached, so this is not a tail call
+                return callMemoized(f, cache, args, env, store)
+            return TailCall(f, mkFrameEnv(f, args, env, store))
+        case Return(Call(fun, args)):
+            f = asFunDef(interpExp(fun, env, store))
+            return TailCall(f, mkFrameEnv(f, args, env, store))
         case Return(e):
             if e is not None:
-                x = interpExp(e, env, store)
+                return interpExp(e, env, store)
             else:
-                x = None
-            raise ReturnException(x)
+                return None
+        case _:
+            raise Exception(f'No match for statement {s}')
+    return FALLTHROUGH
+
+def interpStmts(stmts: list[stmt], env: Env, store: Store) -> Optional[TyValue]:
+    """
+    Executes the statements, returns the value of the first return statement
+    executed (or None if there is no such statement).
 
-def interpStmts(stmts: list[stmt], env: Env, store: Store) -> None:
-    if len(stmts) > 0:
-        interpStmt(stmts[0], env, store, stmts[1:])
+    Tail calls do not grow the python stack: the frames and the environment of the
+    current function are replaced by those of the called function.
+    """
+    frames = [Frame(stmts)]
+    while frames:
+        f = frames[-1]
+        if f.pc < len(f.stmts):
+            s = f.stmts[f.pc]
+            f.pc += 1
+            r = interpStmt(s, env, store, frames)
+            if isinstance(r, Fallthrough):
+                continue
+            elif isinstance(r, TailCall):
+                # The environment of the called function is already on top of store.envs
+                del store.envs[-2]
+                env = r.env
+                frames = [Frame(r.fun.body)]
+            else:
+                return r
+        else:
+            frames.pop()
+    return None
 
-def interpModule(m: mod):
+def interpModule(m: mod, cfg: CompilerConfig = CompilerConfig.default(), memoSize: int = 0):
+    """
+    With memoSize > 0, the results of calls of pure functions with int and bool
+    parameters are cached, at most memoSize results per function.
+    """
     utils.assertType(m, Module)
-    fun_tychecker.tycheckModule(m)
-    env: Env = {}
-    store = Store()
-    for f in m.funs:
-        store.funEnv[f.name] = f
+    tyRes = fun_tychecker.tycheckModule(m)
+    env = cast(Env, fun_resolver.resolveModule(m, tyRes) * [None])
+    store = Store(cfg, tuple(m.funs))
+    if memoSize > 0:
+        pure = fun_purity.pureFuns(m)
+        store.memo = tuple([MemoCache(f.name.name, memoSize)
+                            if fun_purity.isMemoizable(f, pure) else None for f in m.funs])
+    store.envs.append(env)
     interpStmts(m.stmts, env, store)
-    log.debug(f'After executing program.\nEnv: {env}\nStore: {store}')
+    for c in store.memo:
+        if c is not None:
+            log.info(f'Memoization of {c}')
+    log.info(f'Garbage collector: {store.stats}')
+    log.debug(lambda: f'After executing program.\nEnv: {env}\nStore: {store}')
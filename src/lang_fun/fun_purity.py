@@ -0,0 +1,84 @@
+"""
+Purity analysis, runs after type checking.
+
+A function is pure if it does not call print or input_int, does not allocate or
+modify arrays, and only calls pure functions. Calls through function values (e.g. a
+parameter of type Callable) are not analyzed, so a function making such a call is
+not pure. Recursive functions may be pure: the analysis starts by assuming all
+functions pure and then removes functions violating the conditions, until nothing
+changes.
+
+For a pure function with only int and bool parameters, the result of a call depends
+only on the arguments, so the interpreter may cache it (see main.py interp --memoize).
+"""
+from lang_fun.fun_ast import *
+from typing import *
+
+def calledFuns(e: exp, acc: set[ident]) -> bool:
+    """
+    Adds the global functions called in e to acc. Returns False if e is impure by
+    itself.
+    """
+    match e:
+        case IntConst() | BoolConst() | Name():
+            return True
+        case Call(Name(Ident('print') | Ident('input_int'), BuiltinFun()), _):
+            return False
+        case Call(Name(_, BuiltinFun()), args):
+            return all([calledFuns(a, acc) for a in args])
+        case Call(Name(f, UserFun()), args):
+            acc.add(f)
+            return all([calledFuns(a, acc) for a in args])
+        case Call():
+            return False
+        case UnOp(_, sub):
+            return calledFuns(sub, acc)
+        case BinOp(left, _, right):
+            return calledFuns(left, acc) and calledFuns(right, acc)
+        case ArrayInitDyn() | ArrayInitStatic():
+            return False
+        case Subscript(arrayExp, indexExp):
+            return calledFuns(arrayExp, acc) and calledFuns(indexExp, acc)
+
+def calledFunsStmts(stmts: list[stmt], acc: set[ident]) -> bool:
+    for s in stmts:
+        match s:
+            case StmtExp(e) | Assign(_, e):
+                ok = calledFuns(e, acc)
+            case IfStmt(cond, thenBody, elseBody):
+                ok = calledFuns(cond, acc) and calledFunsStmts(thenBody, acc) \
+                    and calledFunsStmts(elseBody, acc)
+            case WhileStmt(cond, body):
+                ok = calledFuns(cond, acc) and calledFunsStmts(body, acc)
+            case SubscriptAssign():
+                ok = False
+            case Return(e):
+                ok = e is None or calledFuns(e, acc)
+        if not ok:
+            return False
+    return True
+
+def pureFuns(m: Module) -> set[ident]:
+    """
+    Returns the names of the pure functions of m.
+    """
+    calls: dict[ident, set[ident]] = {}
+    for f in m.funs:
+        acc: set[ident] = set()
+        if calledFunsStmts(f.body, acc):
+            calls[f.name] = acc
+    pure = set(calls.keys())
+    changed = True
+    while changed:
+        changed = False
+        for f in list(pure):
+            if not calls[f] <= pure:
+                pure.remove(f)
+                changed = True
+    return pure
+
+def isMemoizable(f: FunDef, pure: set[ident]) -> bool:
+    """
+    True if the result of calling f depends only on the values of its arguments.
+    """
+    return f.name in pure and all([isinstance(p.ty, Int | Bool) for p in f.params])
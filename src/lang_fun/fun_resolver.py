@@ -0,0 +1,88 @@
+"""
+Resolution of variables to slots, runs after type checking.
+
+Every local variable of a function and every variable of the toplevel statements gets a
+dense integer slot, taken from the result of the type checker. The parameters of a
+function occupy the first slots of its frame. The slots are stored in the Name and
+Assign nodes of the AST, the size of a function's frame is stored in its FunDef. Names
+referring to global functions get the index of the function in Module.funs as their
+slot. Names of builtin functions do not get a slot.
+"""
+from lang_fun.fun_ast import *
+import lang_fun.fun_tychecker as fun_tychecker
+import common.utils as utils
+
+type Slots = dict[ident, int]
+
+def resolveExp(e: exp, slots: Slots, funSlots: Slots):
+    match e:
+        case IntConst() | BoolConst():
+            pass
+        case Name(x, Var()):
+            e.slot = slots[x]
+        case Name(x, UserFun()):
+            e.slot = funSlots[x]
+        case Name():
+            pass
+        case Call(fun, args):
+            resolveExp(fun, slots, funSlots)
+            for a in args:
+                resolveExp(a, slots, funSlots)
+        case UnOp(_, sub):
+            resolveExp(sub, slots, funSlots)
+        case BinOp(left, _, right):
+            resolveExp(left, slots, funSlots)
+            resolveExp(right, slots, funSlots)
+        case ArrayInitDyn(lenExp, initExp):
+            resolveExp(lenExp, slots, funSlots)
+            resolveExp(initExp, slots, funSlots)
+        case ArrayInitStatic(es):
+            for a in es:
+                resolveExp(a, slots, funSlots)
+        case Subscript(arrayExp, indexExp):
+            resolveExp(arrayExp, slots, funSlots)
+            resolveExp(indexExp, slots, funSlots)
+
+def resolveStmt(s: stmt, slots: Slots, funSlots: Slots):
+    match s:
+        case StmtExp(e):
+            resolveExp(e, slots, funSlots)
+        case Assign(x, e):
+            resolveExp(e, slots, funSlots)
+            s.slot = slots[x]
+        case IfStmt(cond, thenBody, elseBody):
+            resolveExp(cond, slots, funSlots)
+            resolveStmts(thenBody, slots, funSlots)
+            resolveStmts(elseBody, slots, funSlots)
+        case WhileStmt(cond, body):
+            resolveExp(cond, slots, funSlots)
+            resolveStmts(body, slots, funSlots)
+        case SubscriptAssign(leftExp, indexExp, rightExp):
+            resolveExp(leftExp, slots, funSlots)
+            resolveExp(indexExp, slots, funSlots)
+            resolveExp(rightExp, slots, funSlots)
+        case Return(e):
+            if e is not None:
+                resolveExp(e, slots, funSlots)
+
+def resolveStmts(stmts: list[stmt], slots: Slots, funSlots: Slots):
+    for s in stmts:
+        resolveStmt(s, slots, funSlots)
+
+def mkSlots(vars: list[ident]) -> Slots:
+    return {x: i for i, x in enumerate(vars)}
+
+def resolveModule(m: mod, tyRes: fun_tychecker.TycheckResult) -> int:
+    """
+    Assigns slots to all variables of the module m, returns the number of slots
+    needed for the toplevel statements.
+    """
+    utils.assertType(m, Module)
+    funSlots = mkSlots([f.name for f in m.funs])
+    for f in m.funs:
+        slots = mkSlots([p.var for p in f.params] + [x.name for x in tyRes.funLocals[f.name]])
+        resolveStmts(f.body, slots, funSlots)
+        f.frameSize = len(slots)
+    slots = mkSlots([x.name for x in tyRes.toplevelLocals])
+    resolveStmts(m.stmts, slots, funSlots)
+    return len(slots)
@@ -0,0 +1,175 @@
+"""
+On-disk cache for type checking the functions of a lang_fun module (main.py
+--tycheck-cache DIR).
+
+Type checking a function only depends on the function itself and on the types of the
+global functions it refers to. The cache key of a function is a hash of its structure
+(without line numbers and annotations), of the types (or absence) of all global
+functions whose names occur in the function, and of the source code of the type checker.
+The cache stores the local variables of the function and the annotations the type
+checker writes into the AST: the types of all expressions and the scopes of all names.
+
+Only functions that type check are cached. Each entry is a separate file, written
+atomically, so that several processes can share a cache directory.
+"""
+from __future__ import annotations
+from lang_fun.fun_ast import *
+import common.log as log
+import common.utils as utils
+from typing import *
+import dataclasses
+import hashlib
+import os
+import pickle
+import tempfile
+
+if TYPE_CHECKING:
+    from lang_fun.fun_tychecker import LocalVar, Symtab
+
+type Annotation = tuple[Optional[resultTy], Optional[scope]]
+
+EXP_CLASSES = (IntConst, BoolConst, Name, Call, UnOp, BinOp, ArrayInitDyn, ArrayInitStatic,
+               Subscript)
+
+_cacheDir: Optional[str] = None
+_checkerHash: Optional[str] = None
+
+def enable(cacheDir: Optional[str]):
+    global _cacheDir
+    _cacheDir = cacheDir
+
+def enabled() -> bool:
+    return _cacheDir is not None
+
+# Names of the fields taking part in comparing nodes per class, None for classes
+# that are not nodes
+_nodeFields: dict[type[Any], Optional[tuple[str, ...]]] = {}
+
+def nodeFields(cls: type[Any]) -> Optional[tuple[str, ...]]:
+    if cls in _nodeFields:
+        return _nodeFields[cls]
+    fs: Optional[tuple[str, ...]] = None
+    if dataclasses.is_dataclass(cls):
+        fs = tuple([f.name for f in dataclasses.fields(cls) if f.compare])
+    _nodeFields[cls] = fs
+    return fs
+
+def walk(x: Any, names: set[ident], exps: list[exp]) -> Any:
+    """
+    Returns x as nested tuples, without the fields that do not take part in comparing
+    nodes (line numbers, types). Collects all identifiers and all expressions of x, in a
+    fixed order.
+    """
+    if isinstance(x, list):
+        return tuple([walk(y, names, exps) for y in cast(list[Any], x)])
+    if isinstance(x, Ident):
+        names.add(x)
+        return x.name
+    cls = cast(type[Any], type(x))
+    fs = nodeFields(cls)
+    if fs is None:
+        return x
+    if isinstance(x, EXP_CLASSES):
+        exps.append(x)
+    values: list[Any] = [getattr(x, n) for n in fs]
+    return (type(x).__name__, *[walk(y, names, exps) for y in values])
+
+def collectExps(x: Any, exps: list[exp]):
+    # Same order as walk
+    if isinstance(x, list):
+        for y in cast(list[Any], x):
+            collectExps(y, exps)
+        return
+    cls = cast(type[Any], type(x))
+    fs = nodeFields(cls)
+    if fs is None or isinstance(x, Ident):
+        return
+    if isinstance(x, EXP_CLASSES):
+        exps.append(x)
+    for n in fs:
+        y: Any = getattr(x, n)
+        collectExps(y, exps)
+
+def expressions(f: FunDef) -> list[exp]:
+    exps: list[exp] = []
+    collectExps(f, exps)
+    return exps
+
+def getAnnotations(exps: list[exp]) -> list[Annotation]:
+    return [(e.ty, e.scope if isinstance(e, Name) else None) for e in exps]
+
+def setAnnotations(exps: list[exp], annotations: list[Annotation]):
+    for e, (t, sc) in zip(exps, annotations):
+        e.ty = t
+        if isinstance(e, Name):
+            e.scope = sc
+
+def checkerHash() -> str:
+    """
+    Hash of the source code of the type checker, entries of older versions are not used.
+    """
+    global _checkerHash
+    if _checkerHash is None:
+        import lang_fun.fun_tychecker as fun_tychecker
+        import common.symtab as symtab
+        import common.symtab_merge as symtab_merge
+        files = [m.__file__ for m in [fun_tychecker, symtab, symtab_merge]]
+        _checkerHash = ' '.join([utils.md5(utils.assertNotNone(f)) for f in files])
+    return _checkerHash
+
+def cacheFile(k: str) -> str:
+    return os.path.join(utils.assertNotNone(_cacheDir), 'fun', k[:2], k + '.pickle')
+
+@dataclass
+class Entry:
+    fun: FunDef
+    key: str
+    exps: list[exp]
+    def load(self) -> Optional[list[LocalVar]]:
+        """
+        Returns the local variables of the function and writes the annotations into the
+        function, if the cache has an entry.
+        """
+        name = self.fun.name.name
+        try:
+            with open(cacheFile(self.key), 'rb') as h:
+                (annotations, locals) = pickle.load(h)
+        except FileNotFoundError:
+            log.debug(f'Type check cache miss for function {name}')
+            return None
+        except Exception as e:
+            log.warn(f'Ignoring broken type check cache entry for {name}: {e}')
+            return None
+        if len(self.exps) != len(annotations):
+            log.warn(f'Ignoring type check cache entry for {name} with wrong size')
+            return None
+        setAnnotations(self.exps, annotations)
+        log.debug(f'Type check cache hit for function {name}')
+        return locals
+    def store(self, locals: list[LocalVar]):
+        annotations = getAnnotations(self.exps)
+        file = cacheFile(self.key)
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        # Other processes must never see a partially written file
+        (fd, tmp) = tempfile.mkstemp(dir=os.path.dirname(file), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as h:
+                pickle.dump((annotations, locals), h)
+            os.replace(tmp, file)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+def entry(f: FunDef, st: Symtab) -> Entry:
+    """
+    Returns the cache entry of f, whose global functions are in st.
+    """
+    names: set[ident] = set()
+    exps: list[exp] = []
+    struct = walk(f, names, exps)
+    deps: list[tuple[str, Optional[ty]]] = []
+    for x in sorted(names, key=lambda x: x.name):
+        info = st.get(x)
+        deps.append((x.name, info.ty if info is not None and info.scope == 'fun' else None))
+    data = repr((checkerHash(), struct, deps))
+    return Entry(f, hashlib.sha256(data.encode('utf-8')).hexdigest(), exps)
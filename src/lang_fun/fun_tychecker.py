@@ -5,12 +5,14 @@ from common.compilerSupport import *
 import common.log as log
 import common.symtab as symtab
 import common.utils as utils
+import lang_fun.fun_tycache as fun_tycache
+import lang_fun.fun_typarallel as fun_typarallel
 import pprint
 
 type Symtab = symtab.Symtab[ident, ty]
 
 def isBaseTy(given: Optional[ty]):
-    return given in [Int(), Bool()]
+    return isinstance(given, Int | Bool)
 
 def isArrayTy(given: Optional[ty]):
     match given:
@@ -40,6 +42,9 @@ def assertNotVoid(given: resultTy, what: str) -> ty:
 
 def tycheckExpNotVoid(e: exp, st: Symtab) -> ty:
     t = tycheckExp(e, st)
+    if isinstance(t, NotVoid):
+        return t.ty
+    # Printing e takes time linear in its size, so only do it for the error message
     return assertNotVoid(t, str(e))
 
 builtinFunNames = ['input_int', 'print', 'len']
@@ -55,7 +60,7 @@ def tycheckBuiltinFuncall(target: exp, args: list[exp], st: Symtab) -> optional[
             return Fun([], NotVoid(Int()))
         case (Name(Ident('print')), [e]):
             t = tycheckExpNotVoid(e, st)
-            if t not in [Int(), Bool()]:
+            if not isBaseTy(t):
                 raise CompileError.typeError(f'{e} should have type int or bool but has type {t}')
             return Fun([t], Void())
         case (Name(Ident('len')), [e]):
@@ -320,6 +325,33 @@ def localsFromSymtab(st: Symtab, params: list[funParam]) -> list[LocalVar]:
     paramNames = [p.var for p in params]
     return [LocalVar(x, t) for x, t in st.types('var') if x not in paramNames]
 
+def tycheckFunDefLocals(f: FunDef, st: Symtab) -> list[LocalVar]:
+    """
+    Typechecks f with the global functions in st, returns the local variables of f.
+    """
+    funSt = st.copy()
+    tycheckFunDef(f, funSt)
+    return localsFromSymtab(funSt, f.params)
+
+def tycheckFunDefs(funs: list[FunDef], st: Symtab) -> list[list[LocalVar]]:
+    """
+    Typechecks all functions, using the cache (see fun_tycache) and checking in
+    parallel (see fun_typarallel) if enabled. Errors are reported in source order.
+    """
+    entries = [fun_tycache.entry(f, st) if fun_tycache.enabled() else None for f in funs]
+    result = [e.load() if e is not None else None for e in entries]
+    todo = [i for i, locals in enumerate(result) if locals is None]
+    if fun_typarallel.shouldRun(len(todo)):
+        checked = fun_typarallel.tycheckFunDefs([funs[i] for i in todo], st)
+    else:
+        checked = (tycheckFunDefLocals(funs[i], st) for i in todo)
+    for i, locals in zip(todo, checked):
+        result[i] = locals
+        entry = entries[i]
+        if entry is not None:
+            entry.store(locals)
+    return [utils.assertNotNone(locals) for locals in result]
+
 def tycheckModule(m: mod) -> TycheckResult:
     """
     Typechecks the given module, returns the symtab for all variables used by the module.
@@ -329,14 +361,11 @@ def tycheckModule(m: mod) -> TycheckResult:
     for f in m.funs:
         ty = Fun([p.ty for p in f.params], f.result)
         st.assign(f.name, ty, 'fun')
-    funLocalsDict: dict[ident, list[LocalVar]] = {}
-    for f in m.funs:
-        funSt = st.copy()
-        tycheckFunDef(f, funSt)
-        funLocalsDict[f.name] = localsFromSymtab(funSt, f.params)
+    funLocals = tycheckFunDefs(m.funs, st)
+    funLocalsDict = {f.name: locals for f, locals in zip(m.funs, funLocals)}
     t = tycheckStmts(m.stmts, st)
     if t is not None:
         raise CompileError.typeError(f'Return is only allowed inside a function')
-    log.debug(f'Symtab after typechecking: {st}')
-    log.debug(f'AST after typechecking: {pprint.pformat(m)}')
+    log.debug(lambda: f'Symtab after typechecking: {st}')
+    log.debug(lambda: f'AST after typechecking: {pprint.pformat(m)}')
     return TycheckResult(funLocalsDict, localsFromSymtab(st, []))
@@ -0,0 +1,110 @@
+"""
+Parallel type checking of the functions of a lang_fun module (main.py
+--tycheck-parallel MIN_FUNS).
+
+The body of a function only depends on the signatures of the global functions, so
+after collecting the signatures, the functions are checked independently in a pool of
+processes. The processes are forked after storing the functions and their signatures
+in module variables, so the ASTs are not copied. The functions are split into
+contiguous chunks. A worker checks the functions of its chunk in order and sends back
+the annotations of their expressions (see fun_tycache.getAnnotations) and their local
+variables, or the message of the first type error. The results are merged in source
+order, so the first type error in source order is reported, as when checking
+sequentially.
+
+Starting the processes and merging the annotations has a cost, so parallel checking
+is only used for modules with at least MIN_FUNS functions and with more than one CPU.
+"""
+from __future__ import annotations
+from lang_fun.fun_ast import *
+import lang_fun.fun_tycache as fun_tycache
+from lang_fun.fun_tycache import Annotation
+from common.compilerSupport import CompileError
+import common.symtab as symtab
+import common.log as log
+from concurrent.futures import ProcessPoolExecutor
+from typing import *
+import multiprocessing
+import os
+
+if TYPE_CHECKING:
+    from lang_fun.fun_tychecker import LocalVar, Symtab
+
+# Chunks per worker, more chunks balance the load better
+CHUNKS_PER_WORKER = 4
+
+# Result of checking a function: its annotations and local variables, or an error
+type Result = tuple[list[Annotation], list[LocalVar]] | str
+
+_minFuns: Optional[int] = None
+
+# The input of the worker processes, inherited when forking them
+_funs: list[FunDef] = []
+_sigs: list[tuple[ident, ty]] = []
+
+def enable(minFuns: Optional[int]):
+    global _minFuns
+    _minFuns = minFuns
+
+def shouldRun(funCount: int) -> bool:
+    if _minFuns is None or funCount < max(_minFuns, 2):
+        return False
+    if (os.cpu_count() or 1) < 2:
+        log.info('Not typechecking in parallel, only one CPU available')
+        return False
+    return True
+
+def checkChunk(start: int, end: int) -> list[Result]:
+    """
+    Checks the functions start, ..., end-1 in a worker process. Stops after the first
+    type error.
+    """
+    import lang_fun.fun_tychecker as fun_tychecker
+    st: Symtab = symtab.Symtab()
+    for (name, t) in _sigs:
+        st.assign(name, t, 'fun')
+    results: list[Result] = []
+    for f in _funs[start:end]:
+        try:
+            locals = fun_tychecker.tycheckFunDefLocals(f, st)
+        except CompileError as e:
+            results.append(str(e))
+            break
+        results.append((fun_tycache.getAnnotations(fun_tycache.expressions(f)), locals))
+    return results
+
+def compileError(msg: str) -> CompileError:
+    (prefix, rest) = msg.split(': ', 1)
+    return CompileError(prefix, rest)
+
+def tycheckFunDefs(funs: list[FunDef], st: Symtab) -> Iterator[list[LocalVar]]:
+    """
+    Typechecks funs in parallel, yields the local variables of each function in order.
+    Raises the first type error in source order.
+    """
+    global _funs, _sigs
+    workers = min(os.cpu_count() or 1, len(funs))
+    chunkCount = min(workers * CHUNKS_PER_WORKER, len(funs))
+    size = (len(funs) + chunkCount - 1) // chunkCount
+    bounds = [(i, min(i + size, len(funs))) for i in range(0, len(funs), size)]
+    log.info(f'Typechecking {len(funs)} functions in {len(bounds)} chunks with {workers} ' \
+             'processes')
+    _funs = funs
+    _sigs = st.types('fun')
+    try:
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as pool:
+            futures = [pool.submit(checkChunk, start, end) for (start, end) in bounds]
+            try:
+                for (start, end), future in zip(bounds, futures):
+                    for f, res in zip(funs[start:end], future.result()):
+                        if isinstance(res, str):
+                            raise compileError(res)
+                        (annotations, locals) = res
+                        fun_tycache.setAnnotations(fun_tycache.expressions(f), annotations)
+                        yield locals
+            finally:
+                for future in futures:
+                    future.cancel()
+    finally:
+        _funs = []
+        _sigs = []
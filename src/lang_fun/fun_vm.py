@@ -0,0 +1,487 @@
+"""
+Bytecode engine for lang_fun (main.py interp --engine=vm).
+
+After type checking, every function and the toplevel statements are compiled to code
+for a stack machine. The code of a function is a flat array of ints: each opcode is
+followed by its operands. Constants (ints, bools and the element types of arrays) are
+kept in the constant pool of the program and referenced by their index, jump targets
+are absolute positions in the code of the function.
+
+All code runs in a single dispatch loop. A call saves the code, program counter and
+environment of the caller on the frame stack of the VM, so neither deep recursion nor
+tail calls grow the python stack. The store is shared with fun_interp.
+"""
+from __future__ import annotations
+from lang_fun.fun_ast import *
+import lang_fun.fun_tychecker as fun_tychecker
+import lang_fun.fun_resolver as fun_resolver
+from lang_fun.fun_interp import Store, Address, TyValue, arrayElemTy
+import common.utils as utils
+import common.interpIO as interpIO
+from common.compilerSupport import CompilerConfig
+import common.log as log
+from typing import *
+from array import array
+
+type Env = list[Any] # indexed by the slots of the variables
+
+# Opcodes, the operands follow in the comment
+CONST = 0               # k: push consts[k]
+LOAD = 1                # slot: push the variable in slot
+STORE = 2               # slot: pop into the variable in slot
+LOAD_FUN = 3            # f: push the function with index f
+POP = 4
+ADD = 5
+SUB = 6
+MUL = 7
+LESS = 8
+LESS_EQ = 9
+GREATER = 10
+GREATER_EQ = 11
+EQ = 12
+NOT_EQ = 13
+IS = 14
+NEG = 15
+NOT = 16
+JUMP = 17               # target
+JUMP_IF_FALSE = 18      # target: pop the condition, jump if it is false
+JUMP_IF_FALSE_OR_POP = 19 # target: jump if top is false, otherwise pop it
+JUMP_IF_TRUE_OR_POP = 20  # target: jump if top is true, otherwise pop it
+CALL = 21               # f, n: call function f with the top n values as arguments
+CALL_VALUE = 22         # n: call the function below the top n values
+TAIL_CALL = 23          # f, n: as CALL, but replaces the frame of the current function
+TAIL_CALL_VALUE = 24    # n: as CALL_VALUE, but replaces the frame of the current function
+RETURN = 25             # return the top value
+RETURN_NONE = 26
+PRINT = 27
+INPUT_INT = 28
+LEN = 29
+ARRAY_DYN = 30          # k: pop length and initial value, consts[k] is the element type
+ARRAY_STATIC = 31       # k, n: array of the top n values, consts[k] is the element type
+SUBSCRIPT = 32          # pop array and index, push the element
+SUBSCRIPT_STORE = 33    # pop index, value and array, store the value
+
+# Name and number of operands of each opcode
+OPCODES: dict[int, tuple[str, int]] = {
+    CONST: ('CONST', 1), LOAD: ('LOAD', 1), STORE: ('STORE', 1), LOAD_FUN: ('LOAD_FUN', 1),
+    POP: ('POP', 0), ADD: ('ADD', 0), SUB: ('SUB', 0), MUL: ('MUL', 0), LESS: ('LESS', 0),
+    LESS_EQ: ('LESS_EQ', 0), GREATER: ('GREATER', 0), GREATER_EQ: ('GREATER_EQ', 0),
+    EQ: ('EQ', 0), NOT_EQ: ('NOT_EQ', 0), IS: ('IS', 0), NEG: ('NEG', 0), NOT: ('NOT', 0),
+    JUMP: ('JUMP', 1), JUMP_IF_FALSE: ('JUMP_IF_FALSE', 1),
+    JUMP_IF_FALSE_OR_POP: ('JUMP_IF_FALSE_OR_POP', 1),
+    JUMP_IF_TRUE_OR_POP: ('JUMP_IF_TRUE_OR_POP', 1),
+    CALL: ('CALL', 2), CALL_VALUE: ('CALL_VALUE', 1), TAIL_CALL: ('TAIL_CALL', 2),
+    TAIL_CALL_VALUE: ('TAIL_CALL_VALUE', 1), RETURN: ('RETURN', 0),
+    RETURN_NONE: ('RETURN_NONE', 0), PRINT: ('PRINT', 0), INPUT_INT: ('INPUT_INT', 0),
+    LEN: ('LEN', 0), ARRAY_DYN: ('ARRAY_DYN', 1), ARRAY_STATIC: ('ARRAY_STATIC', 2),
+    SUBSCRIPT: ('SUBSCRIPT', 0), SUBSCRIPT_STORE: ('SUBSCRIPT_STORE', 0)
+}
+
+BINOPS: dict[type, int] = {
+    Add: ADD, Sub: SUB, Mul: MUL, Less: LESS, LessEq: LESS_EQ, Greater: GREATER,
+    GreaterEq: GREATER_EQ, Eq: EQ, NotEq: NOT_EQ, Is: IS
+}
+
+class Code:
+    """
+    The compiled code of a function or of the toplevel statements. Code objects are
+    also the runtime values of functions.
+    """
+    def __init__(self, name: str, params: int, frameSize: int):
+        self.name = name
+        self.params = params
+        self.frameSize = frameSize
+        self.instrs: array[int] = array('i')
+        # Slots of the frame not occupied by parameters
+        self.locals: Env = (frameSize - params) * [None]
+    def __repr__(self):
+        return f'Code({self.name})'
+
+@dataclass
+class Program:
+    funs: list[Code] # indexed by the slots of the functions
+    main: Code
+    consts: list[Any]
+
+class ConstPool:
+    def __init__(self):
+        self.consts: list[Any] = []
+        self.indices: dict[tuple[type[Any], str], int] = {}
+    def index(self, v: Any) -> int:
+        # Types are not hashable and True == 1, so key by the type and repr
+        key: tuple[type[Any], str] = (cast(type[Any], type(v)), repr(v))
+        i = self.indices.get(key)
+        if i is None:
+            i = len(self.consts)
+            self.consts.append(v)
+            self.indices[key] = i
+        return i
+
+class CodeBuilder:
+    """
+    Emits the instructions of a single Code object. Jumps refer to labels, their
+    targets are filled in by finish once all labels are placed.
+    """
+    def __init__(self, code: Code, pool: ConstPool):
+        self.code = code
+        self.pool = pool
+        self.instrs: list[int] = []
+        self.labels: list[int] = []
+        self.fixups: list[int] = [] # positions of jump operands, holding label numbers
+    def emit(self, op: int, *operands: int):
+        self.instrs.append(op)
+        self.instrs.extend(operands)
+    def emitConst(self, v: Any):
+        self.emit(CONST, self.pool.index(v))
+    def newLabel(self) -> int:
+        self.labels.append(-1)
+        return len(self.labels) - 1
+    def placeLabel(self, label: int):
+        self.labels[label] = len(self.instrs)
+    def emitJump(self, op: int, label: int):
+        self.emit(op, label)
+        self.fixups.append(len(self.instrs) - 1)
+    def finish(self) -> Code:
+        for pos in self.fixups:
+            target = self.labels[self.instrs[pos]]
+            assert target >= 0
+            self.instrs[pos] = target
+        self.code.instrs = array('i', self.instrs)
+        return self.code
+
+def compileArgs(args: list[exp], b: CodeBuilder):
+    for a in args:
+        compileExp(a, b)
+
+def compileFuncall(fun: exp, args: list[exp], b: CodeBuilder):
+    match (fun, args):
+        case (Name(Ident('input_int'), BuiltinFun()), []):
+            b.emit(INPUT_INT)
+        case (Name(Ident('print'), BuiltinFun()), [e]):
+            compileExp(e, b)
+            b.emit(PRINT)
+        case (Name(Ident('len'), BuiltinFun()), [e]):
+            compileExp(e, b)
+            b.emit(LEN)
+        case (Name(_, BuiltinFun()), _):
+            raise Exception(f'No match for builtin function call of {fun}')
+        case (Name(_, UserFun(), slot), _):
+            # Direct call of a global function, no need to evaluate fun
+            compileArgs(args, b)
+            b.emit(CALL, utils.assertNotNone(slot), len(args))
+        case _:
+            compileExp(fun, b)
+            compileArgs(args, b)
+            b.emit(CALL_VALUE, len(args))
+
+def compileExp(e: exp, b: CodeBuilder):
+    match e:
+        case IntConst(value):
+            b.emitConst(value)
+        case BoolConst(value):
+            b.emitConst(value)
+        case Call(fun, args):
+            compileFuncall(fun, args, b)
+        case UnOp(op, sub):
+            compileExp(sub, b)
+            match op:
+                case USub(): b.emit(NEG)
+                case Not(): b.emit(NOT)
+        case BinOp(left, And() | Or() as op, right):
+            end = b.newLabel()
+            compileExp(left, b)
+            b.emitJump(JUMP_IF_FALSE_OR_POP if isinstance(op, And) else JUMP_IF_TRUE_OR_POP, end)
+            compileExp(right, b)
+            b.placeLabel(end)
+        case BinOp(left, op, right):
+            compileExp(left, b)
+            compileExp(right, b)
+            b.emit(BINOPS[type(op)])
+        case Name(_, Var(), slot):
+            b.emit(LOAD, utils.assertNotNone(slot))
+        case Name(_, UserFun(), slot):
+            b.emit(LOAD_FUN, utils.assertNotNone(slot))
+        case ArrayInitDyn(lenExp, initExp):
+            compileExp(lenExp, b)
+            compileExp(initExp, b)
+            b.emit(ARRAY_DYN, b.pool.index(arrayElemTy(e)))
+        case ArrayInitStatic(es):
+            compileArgs(es, b)
+            b.emit(ARRAY_STATIC, b.pool.index(arrayElemTy(e)), len(es))
+        case Subscript(arrayExp, indexExp):
+            compileExp(arrayExp, b)
+            compileExp(indexExp, b)
+            b.emit(SUBSCRIPT)
+        case _:
+            raise Exception(f'No match for expression {e}')
+
+def compileStmt(s: stmt, b: CodeBuilder):
+    match s:
+        case StmtExp(e):
+            compileExp(e, b)
+            b.emit(POP)
+        case Assign(_, e, slot):
+            compileExp(e, b)
+            b.emit(STORE, utils.assertNotNone(slot))
+        case IfStmt(cond, thenBody, elseBody):
+            elseL = b.newLabel()
+            compileExp(cond, b)
+            b.emitJump(JUMP_IF_FALSE, elseL)
+            compileStmts(thenBody, b)
+            if elseBody:
+                end = b.newLabel()
+                b.emitJump(JUMP, end)
+                b.placeLabel(elseL)
+                compileStmts(elseBody, b)
+                b.placeLabel(end)
+            else:
+                b.placeLabel(elseL)
+        case WhileStmt(cond, body):
+            start = b.newLabel()
+            end = b.newLabel()
+            b.placeLabel(start)
+            compileExp(cond, b)
+            b.emitJump(JUMP_IF_FALSE, end)
+            compileStmts(body, b)
+            b.emitJump(JUMP, start)
+            b.placeLabel(end)
+        case SubscriptAssign(leftExp, idxExp, rightExp):
+            # Same evaluation order as fun_interp
+            compileExp(idxExp, b)
+            compileExp(rightExp, b)
+            compileExp(leftExp, b)
+            b.emit(SUBSCRIPT_STORE)
+        case Return(Call(Name(_, BuiltinFun())) as e):
+            compileExp(e, b)
+            b.emit(RETURN)
+        case Return(Call(Name(_, UserFun(), slot), args)):
+            compileArgs(args, b)
+            b.emit(TAIL_CALL, utils.assertNotNone(slot), len(args))
+        case Return(Call(fun, args)):
+            compileExp(fun, b)
+            compileArgs(args, b)
+            b.emit(TAIL_CALL_VALUE, len(args))
+        case Return(e):
+            if e is None:
+                b.emit(RETURN_NONE)
+            else:
+                compileExp(e, b)
+                b.emit(RETURN)
+
+def compileStmts(stmts: list[stmt], b: CodeBuilder):
+    for s in stmts:
+        compileStmt(s, b)
+
+def compileModule(m: Module, frameSize: int) -> Program:
+    """
+    Compiles a type checked and resolved module. frameSize is the number of slots of
+    the toplevel variables.
+    """
+    pool = ConstPool()
+    funs = [Code(f.name.name, len(f.params), utils.assertNotNone(f.frameSize)) for f in m.funs]
+    for f, code in zip(m.funs, funs):
+        b = CodeBuilder(code, pool)
+        compileStmts(f.body, b)
+        b.emit(RETURN_NONE)
+        b.finish()
+    b = CodeBuilder(Code('<module>', 0, frameSize), pool)
+    compileStmts(m.stmts, b)
+    b.emit(RETURN_NONE)
+    return Program(funs, b.finish(), pool.consts)
+
+def disassemble(code: Code, prog: Program) -> str:
+    lines = [f'{code.name} (params: {code.params}, frame size: {code.frameSize}):']
+    instrs = code.instrs
+    pc = 0
+    while pc < len(instrs):
+        op = instrs[pc]
+        name, n = OPCODES[op]
+        operands = list(instrs[pc + 1:pc + 1 + n])
+        comment = ''
+        match op:
+            case c if c in (CONST, ARRAY_DYN, ARRAY_STATIC):
+                comment = repr(prog.consts[operands[0]])
+            case c if c in (LOAD_FUN, CALL, TAIL_CALL):
+                comment = prog.funs[operands[0]].name
+            case _:
+                pass
+        args = ' '.join(str(x) for x in operands)
+        line = f'{pc:6}  {name:<20} {args}'
+        if comment:
+            line = f'{line:<40} # {comment}'
+        lines.append(line.rstrip())
+        pc += 1 + n
+    return '\n'.join(lines)
+
+def disassembleProgram(prog: Program) -> str:
+    return '\n\n'.join(disassemble(c, prog) for c in prog.funs + [prog.main])
+
+def mkFrame(f: Code, stack: list[Any], n: int) -> Env:
+    """
+    Pops the n arguments from the stack, they occupy the first slots of the new frame.
+    """
+    k = len(stack) - n
+    frame = stack[k:]
+    del stack[k:]
+    frame += f.locals
+    return frame
+
+def run(prog: Program, store: Store):
+    consts = prog.consts
+    funs = prog.funs
+    stack: list[Any] = []
+    env: Env = prog.main.frameSize * [None]
+    # Values on the stack are roots for the garbage collector, just like the frames
+    envs = store.envs
+    envs.append(stack)
+    envs.append(env)
+    # Code, program counter and environment of the callers
+    frames: list[tuple[array[int], int, Env]] = []
+    instrs = prog.main.instrs
+    pc = 0
+    while True:
+        op = instrs[pc]
+        if op == LOAD:
+            stack.append(env[instrs[pc + 1]])
+            pc += 2
+        elif op == CONST:
+            stack.append(consts[instrs[pc + 1]])
+            pc += 2
+        elif op == STORE:
+            env[instrs[pc + 1]] = stack.pop()
+            pc += 2
+        elif op == JUMP_IF_FALSE:
+            if stack.pop():
+                pc += 2
+            else:
+                pc = instrs[pc + 1]
+        elif op == JUMP:
+            pc = instrs[pc + 1]
+        elif op <= NOT_EQ and op >= ADD:
+            y = stack.pop()
+            x: Any = stack[-1]
+            if op == ADD: stack[-1] = x + y
+            elif op == SUB: stack[-1] = x - y
+            elif op == MUL: stack[-1] = x * y
+            elif op == LESS: stack[-1] = x < y
+            elif op == LESS_EQ: stack[-1] = x <= y
+            elif op == GREATER: stack[-1] = x > y
+            elif op == GREATER_EQ: stack[-1] = x >= y
+            elif op == EQ: stack[-1] = x == y
+            else: stack[-1] = x != y
+            pc += 1
+        elif op == SUBSCRIPT:
+            i = stack.pop()
+            stack[-1] = store.load(cast(Address, stack[-1]), i)
+            pc += 1
+        elif op == CALL:
+            f = funs[instrs[pc + 1]]
+            frames.append((instrs, pc + 3, env))
+            env = mkFrame(f, stack, instrs[pc + 2])
+            envs.append(env)
+            instrs = f.instrs
+            pc = 0
+        elif op == RETURN or op == RETURN_NONE:
+            v = stack.pop() if op == RETURN else None
+            envs.pop()
+            if not frames:
+                envs.pop()
+                return
+            instrs, pc, env = frames.pop()
+            stack.append(v)
+        elif op == TAIL_CALL:
+            f = funs[instrs[pc + 1]]
+            env = mkFrame(f, stack, instrs[pc + 2])
+            envs[-1] = env
+            instrs = f.instrs
+            pc = 0
+        elif op == POP:
+            stack.pop()
+            pc += 1
+        elif op == SUBSCRIPT_STORE:
+            a = stack.pop()
+            v = stack.pop()
+            i = stack.pop()
+            store.storeValue(a, i, v)
+            pc += 1
+        elif op == JUMP_IF_FALSE_OR_POP:
+            if stack[-1]:
+                stack.pop()
+                pc += 2
+            else:
+                pc = instrs[pc + 1]
+        elif op == JUMP_IF_TRUE_OR_POP:
+            if stack[-1]:
+                pc = instrs[pc + 1]
+            else:
+                stack.pop()
+                pc += 2
+        elif op == IS:
+            y = stack.pop()
+            stack[-1] = stack[-1] == y # compare Address values by ==
+            pc += 1
+        elif op == NEG:
+            stack[-1] = -cast(int, stack[-1])
+            pc += 1
+        elif op == NOT:
+            stack[-1] = not stack[-1]
+            pc += 1
+        elif op == LOAD_FUN:
+            stack.append(funs[instrs[pc + 1]])
+            pc += 2
+        elif op == CALL_VALUE:
+            n = instrs[pc + 1]
+            f = stack[-n - 1]
+            assert isinstance(f, Code)
+            frames.append((instrs, pc + 2, env))
+            env = mkFrame(f, stack, n)
+            stack.pop() # the function
+            envs.append(env)
+            instrs = f.instrs
+            pc = 0
+        elif op == TAIL_CALL_VALUE:
+            n = instrs[pc + 1]
+            f = stack[-n - 1]
+            assert isinstance(f, Code)
+            env = mkFrame(f, stack, n)
+            stack.pop() # the function
+            envs[-1] = env
+            instrs = f.instrs
+            pc = 0
+        elif op == PRINT:
+            interpIO.printValue(stack[-1])
+            stack[-1] = None
+            pc += 1
+        elif op == INPUT_INT:
+            stack.append(interpIO.inputInt('Enter some int: '))
+            pc += 1
+        elif op == LEN:
+            stack[-1] = len(store.resolve(cast(Address, stack[-1])))
+            pc += 1
+        elif op == ARRAY_DYN:
+            # The initial value stays on the stack during allocation, so it is a root
+            a = store.allocN(consts[instrs[pc + 1]], stack[-2], cast(TyValue, stack[-1]))
+            del stack[-2:]
+            stack.append(a)
+            pc += 2
+        elif op == ARRAY_STATIC:
+            n = instrs[pc + 2]
+            k = len(stack) - n
+            a = store.alloc(consts[instrs[pc + 1]], stack[k:])
+            del stack[k:]
+            stack.append(a)
+            pc += 3
+        else:
+            raise Exception(f'Invalid opcode {op} at position {pc}')
+
+def interpModule(m: mod, cfg: CompilerConfig = CompilerConfig.default(),
+                 printBytecode: bool = False):
+    utils.assertType(m, Module)
+    tyRes = fun_tychecker.tycheckModule(m)
+    frameSize = fun_resolver.resolveModule(m, tyRes)
+    prog = compileModule(m, frameSize)
+    if printBytecode:
+        print(disassembleProgram(prog))
+    store = Store(cfg)
+    run(prog, store)
+    log.info(f'Garbage collector: {store.stats}')
@@ -1,6 +1,7 @@
-# AUTOMATICALLY GENERATED (2024-03-13 15:00:03)
+# AUTOMATICALLY GENERATED (2026-10-18 23:58:21)
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Any, Self
 
 type optional[T] = T | None
 
@@ -11,6 +12,15 @@ class Ident:
 type ident = Ident
 type string = str
 
+_interned: dict[tuple[Any, ...], Any] = {}
+
+def _intern[T](cls: type[T], key: tuple[Any, ...], **fields: Any) -> T:
+    x = object.__new__(cls)
+    for n, v in fields.items():
+        object.__setattr__(x, n, v)
+    _interned[key] = x
+    return x
+
 @dataclass
 class USub:
     pass
@@ -67,86 +77,122 @@ class Or:
 
 type binaryop = Add | Sub | Mul | Less | LessEq | Greater | GreaterEq | Eq | NotEq | And | Or
 
-@dataclass
+@dataclass(frozen=True, eq=False, init=False)
 class Int:
-    pass
-
-@dataclass
+    def __new__(cls) -> Self:
+        key = (cls,)
+        x: Self | None = _interned.get(key)
+        if x is None:
+            x = _intern(cls, key)
+        return x
+    def __reduce__(self):
+        return (Int, ())
+
+@dataclass(frozen=True, eq=False, init=False)
 class Bool:
-    pass
+    def __new__(cls) -> Self:
+        key = (cls,)
+        x: Self | None = _interned.get(key)
+        if x is None:
+            x = _intern(cls, key)
+        return x
+    def __reduce__(self):
+        return (Bool, ())
 
 type ty = Int | Bool
 
-@dataclass
+@dataclass(frozen=True, eq=False, init=False)
 class NotVoid:
     ty: ty
-
-@dataclass
+    def __new__(cls, ty: ty) -> Self:
+        key = (cls, ty)
+        x: Self | None = _interned.get(key)
+        if x is None:
+            x = _intern(cls, key, ty=ty)
+        return x
+    def __reduce__(self):
+        return (NotVoid, (self.ty,))
+
+@dataclass(frozen=True, eq=False, init=False)
 class Void:
-    pass
+    def __new__(cls) -> Self:
+        key = (cls,)
+        x: Self | None = _interned.get(key)
+        if x is None:
+            x = _intern(cls, key)
+        return x
+    def __reduce__(self):
+        return (Void, ())
 
 type resultTy = NotVoid | Void
 
 @dataclass
 class IntConst:
     value: int
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class BoolConst:
     value: bool
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class Name:
     name: ident
-    ty: optional[resultTy] = None
+    slot: optional[int] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class Call:
     name: ident
     args: list[exp]
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class UnOp:
     op: unaryop
     arg: exp
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 @dataclass
 class BinOp:
     left: exp
     op: binaryop
     right: exp
-    ty: optional[resultTy] = None
+    ty: optional[resultTy] = field(default=None, compare=False)
 
 type exp = IntConst | BoolConst | Name | Call | UnOp | BinOp
 
 @dataclass
 class StmtExp:
     exp: exp
+    lineno: optional[int] = field(default=None, compare=False)
 
 @dataclass
 class Assign:
     var: ident
     right: exp
+    slot: optional[int] = None
+    lineno: optional[int] = field(default=None, compare=False)
 
 @dataclass
 class IfStmt:
     cond: exp
     thenBody: list[stmt]
     elseBody: list[stmt]
+    lineno: optional[int] = field(default=None, compare=False)
 
 @dataclass
 class WhileStmt:
     cond: exp
     body: list[stmt]
+    lineno: optional[int] = field(default=None, compare=False)
 
 type stmt = StmtExp | Assign | IfStmt | WhileStmt
 
 @dataclass
 class Module:
     stmts: list[stmt]
+    filename: optional[string] = field(default=None, compare=False)
 
 type mod = Module
\ No newline at end of file
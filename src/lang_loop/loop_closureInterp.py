@@ -0,0 +1,112 @@
+"""
+Alternative execution engine for lang_loop (main.py interp --engine=closures).
+
+After type checking, every node of the AST is translated exactly once into a python
+closure. Running the program then only calls these closures, so the pattern matching
+of loop_interp.interpExp and loop_interp.interpStmt is not repeated for every
+evaluation of an expression or statement.
+"""
+from lang_loop.loop_ast import *
+import lang_loop.loop_tychecker as loop_tychecker
+import lang_loop.loop_resolver as loop_resolver
+import common.utils as utils
+import common.interpIO as interpIO
+import common.profiler as profiler
+from common.compilerSupport import CompilerConfig
+from typing import *
+
+type Environ = list[Optional[TyValue]] # indexed by the slots of the variables
+type TyValue = int | bool
+type ExpFun = Callable[[Environ], Any]
+type StmtFun = Callable[[Environ], None]
+
+def compileFuncall(id: ident, args: list[exp]) -> ExpFun:
+    match (id.name, args):
+        case ('input_int', []):
+            return lambda env: interpIO.inputInt('Enter some int: ')
+        case ('print', [e]):
+            f = compileExp(e)
+            def printFun(env: Environ):
+                interpIO.printValue(f(env))
+            return printFun
+        case _:
+            raise ValueError(f'Invalid function call of {id.name} with {len(args)} arguments')
+
+def compileExp(e: exp) -> ExpFun:
+    match e:
+        case IntConst(value):
+            return lambda env: value
+        case BoolConst(value):
+            return lambda env: value
+        case Call(id, args):
+            return compileFuncall(id, args)
+        case UnOp(op, sub):
+            f = compileExp(sub)
+            match op:
+                case USub(): return lambda env: -f(env)
+                case Not(): return lambda env: not f(env)
+        case BinOp(left, op, right):
+            l = compileExp(left)
+            r = compileExp(right)
+            match op:
+                case Sub(): return lambda env: l(env) - r(env)
+                case Add(): return lambda env: l(env) + r(env)
+                case Mul(): return lambda env: l(env) * r(env)
+                case Less(): return lambda env: l(env) < r(env)
+                case LessEq(): return lambda env: l(env) <= r(env)
+                case Greater(): return lambda env: l(env) > r(env)
+                case GreaterEq(): return lambda env: l(env) >= r(env)
+                case Eq(): return lambda env: l(env) == r(env)
+                case NotEq(): return lambda env: l(env) != r(env)
+                case And(): return lambda env: r(env) if l(env) else False
+                case Or(): return lambda env: True if l(env) else r(env)
+        case Name(_, slot):
+            i = utils.assertNotNone(slot)
+            return lambda env: env[i]
+    raise Exception(f'No match for expression {e}')
+
+def compileStmt(s: stmt) -> StmtFun:
+    match s:
+        case StmtExp(e):
+            return compileExp(e)
+        case Assign(_, e, slot):
+            i = utils.assertNotNone(slot)
+            f = compileExp(e)
+            def assign(env: Environ):
+                env[i] = f(env)
+            return assign
+        case IfStmt(cond, thenBody, elseBody):
+            c = compileExp(cond)
+            thenF = compileStmts(thenBody)
+            elseF = compileStmts(elseBody)
+            def ifStmt(env: Environ):
+                if c(env):
+                    thenF(env)
+                else:
+                    elseF(env)
+            return ifStmt
+        case WhileStmt(cond, body):
+            c = compileExp(cond)
+            bodyF = compileStmts(body)
+            def whileStmt(env: Environ):
+                while c(env):
+                    bodyF(env)
+            return whileStmt
+
+def compileStmts(stmts: list[stmt]) -> StmtFun:
+    fs = [profiler.wrapStmt(s.lineno, compileStmt(s)) for s in stmts]
+    match fs:
+        case [f]:
+            return f
+        case _:
+            def block(env: Environ):
+                for f in fs:
+                    f(env)
+            return block
+
+def interpModule(m: mod, cfg: CompilerConfig = CompilerConfig.default()):
+    utils.assertType(m, Module)
+    st = loop_tychecker.tycheckModule(m)
+    n = loop_resolver.resolveModule(m, st)
+    prog = profiler.wrapFun('<module>', compileStmts(m.stmts))
+    prog(cast(Environ, n * [None]))
@@ -0,0 +1,14 @@
+"""
+Alternative execution engine for lang_loop (main.py interp --engine=cpython). After type
+checking, the source of the program runs with CPython, see common.cpythonInterp.
+"""
+from lang_loop.loop_ast import *
+import lang_loop.loop_tychecker as loop_tychecker
+import common.cpythonInterp as cpythonInterp
+import common.utils as utils
+from common.compilerSupport import CompilerConfig
+
+def interpModule(m: mod, cfg: CompilerConfig = CompilerConfig.default()):
+    utils.assertType(m, Module)
+    loop_tychecker.tycheckModule(m)
+    cpythonInterp.runModule(m.filename, cfg)
@@ -1,18 +1,21 @@
 from lang_loop.loop_ast import *
 import lang_loop.loop_tychecker as loop_tychecker
+import lang_loop.loop_resolver as loop_resolver
 import common.utils as utils
+import common.interpIO as interpIO
+from common.compilerSupport import CompilerConfig
 from typing import *
 
-type Environ = dict[Ident, TyValue]
+type Environ = list[Optional[TyValue]] # indexed by the slots of the variables
 type TyValue = int | bool
 
 def interpFuncall(id: ident, args: list[exp], env: Environ) -> Optional[TyValue]:
     match (id.name, args):
         case ('input_int', []):
-            return int(utils.inputInt('Enter some int: '))
+            return interpIO.inputInt('Enter some int: ')
         case ('print', [e]):
             v = interpExp(e, env)
-            print(v)
+            interpIO.printValue(v)
             return None
         case _:
             raise ValueError(f'Invalid function call of {id.name} with {len(args)} arguments')
@@ -52,37 +55,59 @@ def interpExp(e: exp, env: Environ) -> Optional[TyValue]:
                         return True
                     else:
                         return interpExp(right, env)
+        case Name(_, int(slot)):
+            return env[slot]
         case Name(name):
-            return env[name]
+            raise ValueError(f'Variable {name.name} not resolved')
     raise Exception(f'No match for expression {e}')
 
-def interpStmt(s: stmt, env: Environ, cont: list[stmt]) -> None:
+@dataclass
+class Frame:
+    """
+    A block of statements under execution, pc is the index of the next statement.
+    """
+    stmts: list[stmt]
+    pc: int = 0
+
+def interpStmt(s: stmt, env: Environ, frames: list[Frame]) -> None:
+    """
+    Executes a single statement. Nested blocks are not executed directly, instead
+    a new frame is pushed on the frame stack.
+    """
     match s:
         case StmtExp(e):
             interpExp(e, env)
-            interpStmts(cont, env)
-        case Assign(x, e):
+        case Assign(_, e, int(slot)):
             v: Any = interpExp(e, env)
-            env[x] = v
-            interpStmts(cont, env)
+            env[slot] = v
         case IfStmt(cond, thenBody, elseBody):
             v: Any = interpExp(cond, env)
             if v:
-                interpStmts(thenBody + cont, env)
+                frames.append(Frame(thenBody))
             else:
-                interpStmts(elseBody + cont, env)
+                frames.append(Frame(elseBody))
         case WhileStmt(cond, body):
             v: Any = interpExp(cond, env)
             if v:
-                interpStmts(body + [s] + cont, env)
-            else:
-                interpStmts(cont, env)
+                # Re-execute the loop after the body has finished
+                frames[-1].pc -= 1
+                frames.append(Frame(body))
+        case _:
+            raise Exception(f'No match for statement {s}')
 
 def interpStmts(stmts: list[stmt], env: Environ) -> None:
-    if len(stmts) > 0:
-        interpStmt(stmts[0], env, stmts[1:])
+    frames = [Frame(stmts)]
+    while frames:
+        f = frames[-1]
+        if f.pc < len(f.stmts):
+            s = f.stmts[f.pc]
+            f.pc += 1
+            interpStmt(s, env, frames)
+        else:
+            frames.pop()
 
-def interpModule(m: mod):
+def interpModule(m: mod, cfg: CompilerConfig = CompilerConfig.default()):
     utils.assertType(m, Module)
-    loop_tychecker.tycheckModule(m)
-    interpStmts(m.stmts, {})
+    st = loop_tychecker.tycheckModule(m)
+    n = loop_resolver.resolveModule(m, st)
+    interpStmts(m.stmts, cast(Environ, n * [None]))
@@ -0,0 +1,55 @@
+"""
+Resolution of variables to slots, runs after type checking.
+
+Every variable of the module gets a dense integer slot, taken from the symtab built by
+the type checker. The slots are stored in the Name and Assign nodes of the AST, so the
+interpreters can keep the values of variables in a list indexed by slot.
+"""
+from lang_loop.loop_ast import *
+import lang_loop.loop_tychecker as loop_tychecker
+import common.utils as utils
+
+type Slots = dict[ident, int]
+
+def resolveExp(e: exp, slots: Slots):
+    match e:
+        case IntConst() | BoolConst():
+            pass
+        case Name(x):
+            e.slot = slots[x]
+        case Call(_, args):
+            for a in args:
+                resolveExp(a, slots)
+        case UnOp(_, sub):
+            resolveExp(sub, slots)
+        case BinOp(left, _, right):
+            resolveExp(left, slots)
+            resolveExp(right, slots)
+
+def resolveStmt(s: stmt, slots: Slots):
+    match s:
+        case StmtExp(e):
+            resolveExp(e, slots)
+        case Assign(x, e):
+            resolveExp(e, slots)
+            s.slot = slots[x]
+        case IfStmt(cond, thenBody, elseBody):
+            resolveExp(cond, slots)
+            resolveStmts(thenBody, slots)
+            resolveStmts(elseBody, slots)
+        case WhileStmt(cond, body):
+            resolveExp(cond, slots)
+            resolveStmts(body, slots)
+
+def resolveStmts(stmts: list[stmt], slots: Slots):
+    for s in stmts:
+        resolveStmt(s, slots)
+
+def resolveModule(m: mod, st: loop_tychecker.Symtab) -> int:
+    """
+    Assigns slots to all variables of the module m, returns the number of slots.
+    """
+    utils.assertType(m, Module)
+    slots: Slots = {x: i for i, (x, _) in enumerate(st.types())}
+    resolveStmts(m.stmts, slots)
+    return len(slots)
@@ -124,6 +124,6 @@ def tycheckModule(m: mod) -> Symtab:
     log.info(f'Typechecking loop program')
     st: Symtab = symtab.Symtab()
     tycheckStmts(m.stmts, st)
-    log.debug(f'Symtab after typechecking: {st}')
-    log.debug(f'AST after typechecking: {pprint.pformat(m)}')
+    log.debug(lambda: f'Symtab after typechecking: {st}')
+    log.debug(lambda: f'AST after typechecking: {pprint.pformat(m)}')
     return st
@@ -1,6 +1,6 @@
-# AUTOMATICALLY GENERATED (2024-03-13 15:00:03)
+# AUTOMATICALLY GENERATED (2026-10-18 21:22:48)
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 type optional[T] = T | None
 
@@ -38,6 +38,7 @@ class IntConst:
 @dataclass
 class Name:
     name: ident
+    slot: optional[int] = None
 
 @dataclass
 class Call:
@@ -60,16 +61,20 @@ type exp = IntConst | Name | Call | UnOp | BinOp
 @dataclass
 class StmtExp:
     exp: exp
+    lineno: optional[int] = field(default=None, compare=False)
 
 @dataclass
 class Assign:
     var: ident
     right: exp
+    slot: optional[int] = None
+    lineno: optional[int] = field(default=None, compare=False)
 
 type stmt = StmtExp | Assign
 
 @dataclass
 class Module:
     stmts: list[stmt]
+    filename: optional[string] = field(default=None, compare=False)
 
 type mod = Module
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""
+Alternative execution engine for lang_var (main.py interp --engine=closures).
+
+After type checking, every node of the AST is translated exactly once into a python
+closure. Running the program then only calls these closures, so the pattern matching
+of var_interp.interpExp is not repeated for every evaluation of an expression.
+"""
+from lang_var.var_ast import *
+import lang_var.var_tychecker as var_tychecker
+import lang_var.var_resolver as var_resolver
+import common.utils as utils
+import common.interpIO as interpIO
+import common.profiler as profiler
+from common.compilerSupport import CompilerConfig
+from typing import *
+
+type Env = list[Optional[TyValue]] # indexed by the slots of the variables
+type TyValue = int
+type ExpFun = Callable[[Env], Any]
+type StmtFun = Callable[[Env], None]
+
+def compileFuncall(id: ident, args: list[exp]) -> ExpFun:
+    match (id.name, args):
+        case ('input_int', []):
+            return lambda env: interpIO.inputInt('Enter some int: ')
+        case ('print', [e]):
+            f = compileExp(e)
+            def printFun(env: Env):
+                interpIO.printValue(f(env))
+            return printFun
+        case _:
+            raise ValueError(f'Invalid function call of {id.name} with {len(args)} arguments')
+
+def compileExp(e: exp) -> ExpFun:
+    match e:
+        case IntConst(value):
+            return lambda env: value
+        case Call(id, args):
+            return compileFuncall(id, args)
+        case UnOp(USub(), sub):
+            f = compileExp(sub)
+            return lambda env: -f(env)
+        case BinOp(left, op, right):
+            l = compileExp(left)
+            r = compileExp(right)
+            match op:
+                case Sub(): return lambda env: l(env) - r(env)
+                case Add(): return lambda env: l(env) + r(env)
+                case Mul(): return lambda env: l(env) * r(env)
+        case Name(_, slot):
+            i = utils.assertNotNone(slot)
+            return lambda env: env[i]
+    raise Exception(f'No match for expression {e}')
+
+def compileStmt(s: stmt) -> StmtFun:
+    match s:
+        case StmtExp(e):
+            return compileExp(e)
+        case Assign(_, e, slot):
+            i = utils.assertNotNone(slot)
+            f = compileExp(e)
+            def assign(env: Env):
+                env[i] = f(env)
+            return assign
+
+def compileStmts(stmts: list[stmt]) -> StmtFun:
+    fs = [profiler.wrapStmt(s.lineno, compileStmt(s)) for s in stmts]
+    def block(env: Env):
+        for f in fs:
+            f(env)
+    return block
+
+def interpModule(m: mod, cfg: CompilerConfig = CompilerConfig.default()):
+    utils.assertType(m, Module)
+    vars = var_tychecker.tycheckModule(m)
+    n = var_resolver.resolveModule(m, vars)
+    prog = profiler.wrapFun('<module>', compileStmts(m.stmts))
+    prog(cast(Env, n * [None]))
@@ -1,18 +1,21 @@
 from lang_var.var_ast import *
 import lang_var.var_tychecker as var_tychecker
+import lang_var.var_resolver as var_resolver
 import common.utils as utils
+import common.interpIO as interpIO
+from common.compilerSupport import CompilerConfig
 from typing import *
 
-type Env = dict[Ident, TyValue]
+type Env = list[Optional[TyValue]] # indexed by the slots of the variables
 type TyValue = int
 
 def interpFuncall(id: ident, args: list[exp], env: Env) -> TyValue | None:
     match (id.name, args):
         case ('input_int', []):
-            return int(utils.inputInt('Enter some int: '))
+            return interpIO.inputInt('Enter some int: ')
         case ('print', [e]):
             v = interpExp(e, env)
-            print(v)
+            interpIO.printValue(v)
             return None
         case _:
             raise ValueError(f'Invalid function call of {id.name} with {len(args)} arguments')
@@ -33,23 +36,28 @@ def interpExp(e: exp, env: Env) -> TyValue | None:
                 case Sub(): return x - y
                 case Add(): return x + y
                 case Mul(): return x * y
+        case Name(_, int(slot)):
+            return env[slot]
         case Name(name):
-            return env[name]
+            raise ValueError(f'Variable {name.name} not resolved')
     raise Exception(f'No match for expression {e}')
 
 def interpStmt(s: stmt, env: Env) -> None:
     match s:
         case StmtExp(e):
             interpExp(e, env)
-        case Assign(x, e):
+        case Assign(_, e, int(slot)):
             v: Any = interpExp(e, env)
-            env[x] = v
+            env[slot] = v
+        case _:
+            raise Exception(f'No match for statement {s}')
 
 def interpStmts(stmts: list[stmt], env: Env) -> None:
     for stmt in stmts:
         interpStmt(stmt, env)
 
-def interpModule(m: mod):
+def interpModule(m: mod, cfg: CompilerConfig = CompilerConfig.default()):
     utils.assertType(m, Module)
-    var_tychecker.tycheckModule(m)
-    interpStmts(m.stmts, {})
+    vars = var_tychecker.tycheckModule(m)
+    n = var_resolver.resolveModule(m, vars)
+    interpStmts(m.stmts, cast(Env, n * [None]))
@@ -0,0 +1,45 @@
+"""
+Resolution of variables to slots, runs after type checking.
+
+Every variable of the module gets a dense integer slot. The slots are stored in the
+Name and Assign nodes of the AST, so the interpreters can keep the values of variables
+in a list indexed by slot.
+"""
+from lang_var.var_ast import *
+import common.utils as utils
+
+type Slots = dict[ident, int]
+
+def resolveExp(e: exp, slots: Slots):
+    match e:
+        case IntConst():
+            pass
+        case Name(x):
+            e.slot = slots[x]
+        case Call(_, args):
+            for a in args:
+                resolveExp(a, slots)
+        case UnOp(_, sub):
+            resolveExp(sub, slots)
+        case BinOp(left, _, right):
+            resolveExp(left, slots)
+            resolveExp(right, slots)
+
+def resolveStmt(s: stmt, slots: Slots):
+    match s:
+        case StmtExp(e):
+            resolveExp(e, slots)
+        case Assign(x, e):
+            resolveExp(e, slots)
+            s.slot = slots[x]
+
+def resolveModule(m: mod, vars: set[ident]) -> int:
+    """
+    Assigns slots to all variables of the module m, returns the number of slots.
+    vars is the set of variables as returned by the type checker.
+    """
+    utils.assertType(m, Module)
+    slots: Slots = {x: i for i, x in enumerate(sorted(vars, key=lambda x: x.name))}
+    for s in m.stmts:
+        resolveStmt(s, slots)
+    return len(slots)
@@ -66,5 +66,5 @@ def tycheckModule(m: mod) -> set[ident]:
     result: set[ident] = set()
     for s in m.stmts:
         result = result.union(tycheckStmt(s, result))
-    log.debug(f'Set of variables after typechecking: {result}')
+    log.debug(lambda: f'Set of variables after typechecking: {result}')
     return result
@@ -6,22 +6,64 @@ import common.genericParser as genericParser
 import common.utils as utils
 import common.log as log
 import common.constants as constants
+import common.parseCache as parseCache
+import lang_fun.fun_tycache as fun_tycache
+import lang_fun.fun_typarallel as fun_typarallel
+from common.cpythonInterp import PRELUDE_DICT, runWithDeepStack
+import parsers.common as parserCommon
 import parsers.lang_simple.simple_parser as simple_parser
 import assembly.compiler as tac_comp
 import assembly.tacInterp as tac_interp
 import importlib
+import functools
 import shell
 import sys
 import os
-import typing
 
 DEFAULT_OUTPUT = 'out.wasm'
 
+type ModuleKind = Literal['compile', 'interp', 'closureInterp', 'vm', 'cpythonInterp', 'ast',
+                          'parse']
+
+# Maps the execution engines of the interp command to the module implementing the engine
+INTERP_ENGINES: dict[str, ModuleKind] = {
+    'tree': 'interp',
+    'closures': 'closureInterp',
+    'vm': 'vm',
+    'cpython': 'cpythonInterp'
+}
+
+# Engines not available for all languages
+ENGINE_LANGS: dict[str, list[str]] = {
+    'vm': ['fun']
+}
+
+def engineSupportsLang(engine: str, lang: str) -> bool:
+    return engine not in ENGINE_LANGS or lang in ENGINE_LANGS[engine]
+
 def parseArgs():
     parser = argparse.ArgumentParser(description=f'Run the compiler or interpreter for some language')
     parser.add_argument('--lang', choices=['simple', 'var', 'loop', 'array', 'fun', 'tinyJson'],
                         help='The language (guessed from path of input file if not given)')
     parser.add_argument('--level', help='The loglevel (debug, info, warn)')
+    parser.add_argument('--log-file', default='minipy.log', metavar='FILE',
+                        help='The log file. Default: minipy.log')
+    parser.add_argument('--log-file-level',
+                        help='The loglevel of the log file (debug, info, warn, off). ' \
+                            'Default: info, or the loglevel if it is lower')
+    parser.add_argument('--parse-cache', type=str, metavar='DIR',
+                        help='Cache the ASTs of parsed input files and the tables of ' \
+                            'LALR parsers in DIR')
+    parser.add_argument('--parse-cache-size', type=int, metavar='MB',
+                        default=parseCache.DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help='Maximum size of the parse cache in MB, the least recently ' \
+                            'used entries are removed when it grows larger')
+    parser.add_argument('--tycheck-cache', type=str, metavar='DIR',
+                        help='Cache the type checking results of the functions of lang_fun ' \
+                            'programs in DIR, so that only changed functions are checked again')
+    parser.add_argument('--tycheck-parallel', type=int, metavar='MIN_FUNS',
+                        help='Type check the functions of lang_fun programs with at least ' \
+                            'MIN_FUNS functions in parallel')
     subparsers = parser.add_subparsers(help='Commands', dest='cmd')
 
     helpCompiler = f'''Compiles the given input file. Depending on the extension of the output file,
@@ -33,6 +75,16 @@ exit codes signal a bug in the compiler itself.'''
     def addCompilerArgs(p: argparse.ArgumentParser):
         p.add_argument('--wat2wasm', default='wat2wasm',
                            help='Path to the wat2wasm tool')
+        p.add_argument('--wasm-encoder', choices=['native', 'wat2wasm', 'check'],
+                       default='wat2wasm',
+                       help='How .wasm output is produced: wat2wasm converts the .wat file ' \
+                           'with wat2wasm, native encodes it directly, check encodes it ' \
+                           'directly and checks that wat2wasm produces the same bytes. ' \
+                           'Default: wat2wasm')
+        p.add_argument('--wat-style', choices=['pretty', 'compact'], default='pretty',
+                       help='Layout of the textual representation of wasm: pretty uses a ' \
+                           'pretty printer, compact writes one instruction per line and is ' \
+                           'much faster for large programs. Default: pretty')
         p.add_argument('--output', default=DEFAULT_OUTPUT,
                        help=f'Output file (.wat or .wasm). Default: {DEFAULT_OUTPUT}')
         p.add_argument('--max-mem-size', type=int,
@@ -49,6 +101,24 @@ exit codes signal a bug in the compiler itself.'''
 
     interp = subparsers.add_parser('interp', help='Runs the given file through our own interpeter')
     interp.add_argument('--level', help='The loglevel (debug, info, warn)')
+    interp.add_argument('--engine', choices=list(INTERP_ENGINES),
+                        help='Execution engine: tree walks the AST, closures translates the ' \
+                            'AST to python closures before execution, vm compiles the AST to ' \
+                            'bytecode (only lang_fun), cpython runs the source with python after type ' \
+                            'checking (default: tree, closures with --profile)')
+    interp.add_argument('--memoize', type=int, metavar='SIZE',
+                        help='Cache the results of pure functions with int and bool parameters, ' \
+                            'at most SIZE results per function (only lang_fun with --engine=tree)')
+    interp.add_argument('--print-bytecode', action='store_true',
+                        help='Print the bytecode before running it (only with --engine=vm)')
+    interp.add_argument('--max-mem-size', type=int,
+                        help="Max memory size in number of 64kB pages")
+    interp.add_argument('--max-array-size', type=int,
+                        help="Max size of an array in bytes")
+    interp.add_argument('--profile', type=str, metavar='FILE',
+                        help='Profile the program and write a report of the hottest lines to ' \
+                            'FILE and collapsed stacks for flame graphs to FILE with extension ' \
+                            '.collapsed. Requires the closures engine.')
     interp.add_argument('input', help='Input file .py')
 
     tacInterp = subparsers.add_parser('tacInterp',
@@ -58,6 +128,10 @@ exit codes signal a bug in the compiler itself.'''
     tacInterp.add_argument('input', help='Input file .py')
     tacInterp.add_argument('--print-tac', action='store_true',
                            help='Print the three-address code instructions')
+    tacInterp.add_argument('--wat', metavar='FILE',
+                           help='Write the textual representation of the wasm code to FILE')
+    tacInterp.add_argument('--wat-style', choices=['pretty', 'compact'], default='pretty',
+                           help='Layout of the file given with --wat. Default: pretty')
 
 
     assembly = subparsers.add_parser('assembly',
@@ -66,6 +140,10 @@ exit codes signal a bug in the compiler itself.'''
     assembly.add_argument('--level', help='The loglevel (debug, info, warn)')
     assembly.add_argument('--max-registers', type=int,
                           help="Max number of registers used")
+    assembly.add_argument('--wat', metavar='FILE',
+                          help='Write the textual representation of the wasm code to FILE')
+    assembly.add_argument('--wat-style', choices=['pretty', 'compact'], default='pretty',
+                          help='Layout of the file given with --wat. Default: pretty')
     assembly.add_argument('input', help='Input file .py')
     assembly.add_argument('output', default='out.as', help='Output file .as (default: out.as)')
 
@@ -90,7 +168,7 @@ exit codes signal a bug in the compiler itself.'''
         utils.abort('Language simple only available when parsing')
     return args
 
-def importModule(lang: str, kind: Literal['compile', 'interp', 'ast', 'parse']):
+def importModule(lang: str, kind: ModuleKind):
     if lang == 'simple':
         return None
     match kind:
@@ -100,6 +178,12 @@ def importModule(lang: str, kind: Literal['compile', 'interp', 'ast', 'parse']):
             modName = f'parsers.lang_{lang}.{lang}_parser'
         case "interp":
             modName = f'lang_{lang}.{lang}_interp'
+        case "closureInterp":
+            modName = f'lang_{lang}.{lang}_closureInterp'
+        case "vm":
+            modName = f'lang_{lang}.{lang}_vm'
+        case "cpythonInterp":
+            modName = f'lang_{lang}.{lang}_cpythonInterp'
         case "ast":
             modName = f'lang_{lang}.{lang}_ast'
     m = importlib.import_module(modName)
@@ -125,19 +209,23 @@ def runWasm(runWasmCmd: str, file: str):
     print(f'Finished running wasm file {file}, exit code: {ecode}')
     sys.exit(ecode)
 
-PRELUDE_DICT = {
-    'input_int': lambda: utils.inputInt('Input some int: '),
-    'Callable': cast(Any, typing.Callable)
-}
-
 def runWithPython(srcFile: str):
     src = utils.readTextFile(srcFile)
-    exec(src, PRELUDE_DICT)
+    runWithDeepStack(lambda: exec(src, PRELUDE_DICT))
 
 def main():
     args = parseArgs()
     level = log.resolveLevelName(args.level or 'warn')
-    log.init(level, 'minipy.log')
+    if args.log_file_level:
+        fileLevel = log.resolveLevelName(args.log_file_level)
+    else:
+        fileLevel = min(level, log.resolveLevelName('info'))
+    log.init(level, args.log_file if fileLevel != log.OFF else None, fileLevel)
+    parseCache.enable(args.parse_cache, args.parse_cache_size * 1024 * 1024)
+    if args.parse_cache:
+        parserCommon.setLarkCacheDir(os.path.join(args.parse_cache, 'lark'))
+    fun_tycache.enable(args.tycheck_cache)
+    fun_typarallel.enable(args.tycheck_parallel)
     if args.lang:
         lang = args.lang
     else:
@@ -159,15 +247,35 @@ def main():
             compilerMod = importModule(lang, 'compile')
             compileFun = getFun(compilerMod, 'compileModule')
             compileArgs = genericCompiler.Args(args.input, args.output, args.wat2wasm,
-                                                args.max_mem_size, args.max_array_size)
+                                                args.max_mem_size, args.max_array_size,
+                                                wasmEncoder=args.wasm_encoder,
+                                                watStyle=args.wat_style)
             genericCompiler.compileMain(compileArgs, compileFun, ast)
             if args.cmd == "run":
                 runWasm(args.run_wasm, args.output)
         case "interp":
             ast = importModule(lang, 'ast')
-            interpMod = importModule(lang, 'interp')
+            # The profiler instruments the closures of the closures engine
+            if args.profile:
+                if args.engine not in [None, 'closures']:
+                    utils.abort('--profile requires --engine=closures')
+                engine = 'closures'
+            else:
+                engine = args.engine or 'tree'
+            if not engineSupportsLang(engine, lang):
+                utils.abort(f'Engine {engine} not available for language {lang}')
+            interpMod = importModule(lang, INTERP_ENGINES[engine])
             interpFun = getFun(interpMod, 'interpModule')
-            interpArgs = genericInterp.Args(args.input)
+            if args.print_bytecode:
+                if engine != 'vm':
+                    utils.abort('--print-bytecode requires --engine=vm')
+                interpFun = functools.partial(interpFun, printBytecode=True)
+            if args.memoize:
+                if lang != 'fun' or engine != 'tree':
+                    utils.abort('--memoize requires lang_fun and --engine=tree')
+                interpFun = functools.partial(interpFun, memoSize=args.memoize)
+            interpArgs = genericInterp.Args(args.input, args.max_mem_size, args.max_array_size,
+                                            args.profile)
             genericInterp.interpMain(interpArgs, interpFun, ast)
         case "pyrun":
             runWithPython(args.input)
@@ -188,11 +296,13 @@ def main():
                 parseFun = getFun(parseMod, 'parseModule')
                 genericParser.parseWithOwnParser(args.input, parserArgs, ast, parseFun)
         case "tacInterp":
-            compileArgs = genericCompiler.Args(args.input, '/tmp/dummy.wasm', 'wat2wasm', 1, 1)
+            compileArgs = genericCompiler.Args(args.input, '', 'wat2wasm', 1, 1, wat=args.wat,
+                                               watStyle=args.wat_style)
             tac_interp.interpFile(compileArgs, args.print_tac)
         case "assembly":
             compileArgs = genericCompiler.Args(args.input, args.output, 'wat2wasm', 1, 1,
-                                               args.max_registers)
+                                               args.max_registers, args.wat,
+                                               watStyle=args.wat_style)
             tac_comp.compileFile(compileArgs)
         case _:
             utils.abort(f'Unknown command: {args.cmd}')
@@ -3,7 +3,9 @@ from lark import Lark, Token, Tree, ParseTree, tree, exceptions
 import common.log as log
 import common.utils as utils
 from dataclasses import dataclass
+import hashlib
 import os
+import logging
 
 type ParseAlg = Literal['earley', 'lalr']
 
@@ -112,34 +114,69 @@ class ParseError(Exception):
     def __init__(self, msg: str):
         super().__init__(msg)
 
-def mkLexer(grammarFile: str) -> Lark:
-    return mkParser('earley', grammarFile, 'start')
+# Built parsers and lexers, keyed by the hash of the grammar, the parsing algorithm
+# ('lexer' for lexers), the start symbol and the lexer
+type ParserKind = ParseAlg | Literal['lexer']
+_parsers: dict[tuple[str, ParserKind, str, str], Lark] = {}
+
+# Directory for the parse tables of LALR parsers, None for the default of lark (the
+# temporary directory). Lark can only store LALR parsers.
+_larkCacheDir: Optional[str] = None
+
+def setLarkCacheDir(cacheDir: Optional[str]):
+    global _larkCacheDir
+    _larkCacheDir = cacheDir
+
+def larkCacheOpt(key: tuple[str, ParserKind, str, str]) -> str | bool:
+    if _larkCacheDir is None:
+        return True
+    os.makedirs(_larkCacheDir, exist_ok=True)
+    h = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+    return os.path.join(_larkCacheDir, h + '.lark')
+
+def mkLexer(grammarFile: str, start: str = 'start') -> Lark:
+    """
+    Returns a lark instance that can only lex (method lex), without building a parser.
+    """
+    return _mkLark('lexer', grammarFile, start)
 
 def mkParser(alg: ParseAlg, grammarFile: str, start: str) -> Lark:
+    return _mkLark(alg, grammarFile, start)
+
+def _mkLark(kind: ParserKind, grammarFile: str, start: str) -> Lark:
     grammar = utils.readTextFile(grammarFile)
+    key = (hashlib.sha256(grammar.encode('utf-8')).hexdigest(), kind, start, 'basic')
+    parser = _parsers.get(key)
+    if parser is not None:
+        return parser
     try:
-        match alg:
+        match kind:
             case 'earley':
-                return Lark(grammar, start=start, ambiguity='explicit', parser='earley',
-                            lexer='basic', debug=True)
+                parser = Lark(grammar, start=start, ambiguity='explicit', parser='earley',
+                              lexer='basic', debug=True)
             case 'lalr':
-                return Lark(grammar, start=start, parser='lalr', strict=True,
-                            debug=True, lexer='basic')
+                parser = Lark(grammar, start=start, parser='lalr', strict=True,
+                              debug=True, lexer='basic', cache=larkCacheOpt(key))
+            case 'lexer':
+                parser = Lark(grammar, start=start, parser=None, lexer='basic')
     except exceptions.LarkError as err:
-        raise ParseError(f'Error constructing {alg} parser from grammar in {grammarFile}: {err}')
+        raise ParseError(f'Error constructing {kind} parser from grammar in {grammarFile}: {err}')
+    _parsers[key] = parser
+    return parser
 
 def _parseAsParseTree(parser: Lark, s: str, png: Optional[str]) -> ParseTree:
     s = s.rstrip() + '\n' # ensure there is one trailing newline
     try:
-        lexed = parser.lex(s)
-        lexedRepr = ['  ' + repr(tok) for tok in lexed]
-        log.debug('tokens:\n' + '\n'.join(lexedRepr))
+        if log.isEnabled(logging.DEBUG):
+            # Lexing is repeated by the parser, only done for the log
+            lexedRepr = ['  ' + repr(tok) for tok in parser.lex(s)]
+            log.debug('tokens:\n' + '\n'.join(lexedRepr))
         parseTree = parser.parse(s)
     except exceptions.LarkError as err:
         raise ParseError(str(err))
     removeNewlines(parseTree)
-    log.debug(f'parse tree:\n{parseTree}')
-    log.debug(f'parse tree (pretty):\n{parseTree.pretty()}')
+    log.debug(lambda: f'parse tree:\n{parseTree}')
+    log.debug(lambda: f'parse tree (pretty):\n{parseTree.pretty()}')
     if png is not None:
         parseTreeToPng(png, parseTree)
     if isAmbiguous(parseTree):
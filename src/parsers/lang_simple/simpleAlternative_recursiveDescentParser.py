@@ -13,7 +13,7 @@ grammarPath = "./src/parsers/lang_simple/"
 
 def parse(code: str):
     grammarFile = grammarPath + f"simple_grammar.lark"
-    parser = mkParser('earley', grammarFile, 'exp') # only need the lexer
+    parser = mkLexer(grammarFile, 'exp')
     lexed = parser.lex(code)
     toks = TokenStream(lexed)
     ast = ruleE(toks)
@@ -5,7 +5,7 @@ import logging
 # we want to have pytest assert introspection in the helpers
 pytest.register_assert_rewrite('common.testsupport')
 
-def _logLevel():
+def logLevel():
     import sys
     argv = sys.argv
     n = len(argv)
@@ -14,4 +14,4 @@ def _logLevel():
             return log.resolveLevelName(sys.argv[i + 1])
     return logging.WARNING
 
-log.init(_logLevel(), 'minipy_tests.log')
+log.init(logLevel(), 'minipy_tests.log')
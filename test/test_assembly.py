@@ -26,7 +26,7 @@ def checkMaxRegisters(asFile: str, maxRegisters: int):
 def runTest(lang: str, srcFile: str, maxRegisters: int,
             tmp: str, hasErr: bool, input: str|None, extraArgs: str|None) -> shell.RunResult:
     out = shell.mkTempFile('.as')
-    cmd = f'python src/main.py --lang={lang} assembly --max-registers {maxRegisters} {srcFile} {out}'
+    cmd = f'python src/main.py {testsupport.PARSE_CACHE_ARG} --lang={lang} assembly --max-registers {maxRegisters} {srcFile} {out}'
     log.info(f'Running command {cmd}')
     res1 = shell.run(cmd, onError='ignore')
     if res1.exitcode != 0:
@@ -17,7 +17,7 @@ def run(wasm: str, input: str|None) -> shell.RunResult:
 
 def runTest(lang: str, srcFile: str, tmp: str, captureErr: bool, input: str|None, extraArgs: str|None) -> shell.RunResult:
     output = shell.pjoin(tmp, 'out.wasm')
-    cmd = f'python src/main.py --lang={lang} compile --output={output}'
+    cmd = f'python src/main.py {testsupport.PARSE_CACHE_ARG} --lang={lang} compile --wasm-encoder=check --output={output}'
     if extraArgs:
         cmd = cmd + ' ' + extraArgs
     cmd = cmd + ' ' + srcFile
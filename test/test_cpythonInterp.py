@@ -0,0 +1,42 @@
+import common.genericParser as genericParser
+import common.interpIO as interpIO
+from common.compilerSupport import CompilerConfig
+from common.genericInterp import ArraySizeError, OutOfMemoryError
+import lang_array.array_ast as array_ast
+import lang_array.array_cpythonInterp as array_cpythonInterp
+import pytest
+
+# Allocates 100 arrays of 8004 bytes, only two of them are live at the same time
+SRC = '''a = 1000 * [1]
+i = 0
+while i < 100:
+    a = 1000 * [i]
+    i = i + 1
+b = [a[0], a[999]]
+print(b[0] + b[1])
+'''
+
+def run(tmp_path: str, src: str, maxMemSize: int, maxArraySize: int = 100000):
+    f = f'{tmp_path}/prog.py'
+    with open(f, 'w') as h:
+        h.write(src)
+    m = genericParser.parseFile(f, array_ast)
+    cfg = CompilerConfig(maxMemSize=maxMemSize, maxArraySize=maxArraySize)
+    try:
+        array_cpythonInterp.interpModule(m, cfg)
+    finally:
+        interpIO.flush()
+
+def test_freedArrays(tmp_path: str, capsys: pytest.CaptureFixture[str]):
+    run(tmp_path, SRC, maxMemSize=1)
+    assert capsys.readouterr().out == '198\n'
+
+def test_outOfMemory(tmp_path: str):
+    src = 'a = 5000 * [1]\nb = 5000 * [2]\nc = 5000 * [3]\n'
+    with pytest.raises(OutOfMemoryError):
+        run(tmp_path, src, maxMemSize=1)
+
+@pytest.mark.parametrize("size", [-1, 30000])
+def test_arraySize(tmp_path: str, size: int):
+    with pytest.raises(ArraySizeError):
+        run(tmp_path, f'a = {size} * [True]\n', maxMemSize=100)
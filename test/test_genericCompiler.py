@@ -0,0 +1,42 @@
+import common.genericCompiler as genCompiler
+from common.compilerSupport import CompilerConfig
+from common.wasm import *
+import lang_loop.loop_ast as loop_ast
+import os
+from typing import *
+
+def compileFun(m: Any, cfg: CompilerConfig) -> WasmModule:
+    main = WasmId('$main')
+    instrs: list[WasmInstr] = [WasmInstrConst('i64', cfg.maxMemSize), WasmInstrDrop()]
+    return WasmModule([], [WasmExport('main', WasmExportFunc(main))], [], [],
+                      WasmFuncTable([]), [WasmFunc(main, [], None, [], instrs)])
+
+def test_compileInMemory(tmp_path: str):
+    src = f'{tmp_path}/prog.py'
+    with open(src, 'w') as h:
+        h.write('print(1)\n')
+    args = genCompiler.Args(src, f'{tmp_path}/out.wasm', maxMemSize=7)
+    m = genCompiler.compileInMemory(args, compileFun, loop_ast)
+    assert m.funcs[0].instrs[0] == WasmInstrConst('i64', 7)
+    assert os.listdir(tmp_path) == ['prog.py']
+    wat = f'{tmp_path}/prog.wat'
+    genCompiler.compileInMemory(genCompiler.Args(src, '', wat=wat), compileFun, loop_ast)
+    with open(wat) as h:
+        assert '(export "main" (func $main))' in h.read()
+
+def test_compactWat(tmp_path: str):
+    src = f'{tmp_path}/prog.py'
+    with open(src, 'w') as h:
+        h.write('print(1)\n')
+    args = genCompiler.Args(src, f'{tmp_path}/out.wat', watStyle='compact')
+    genCompiler.compileMain(args, compileFun, loop_ast)
+    with open(f'{tmp_path}/out.wat') as h:
+        assert '\n  (func $main\n    (i64.const 1600)\n    drop)' in h.read()
+
+def test_nativeWritesWat(tmp_path: str):
+    src = f'{tmp_path}/prog.py'
+    with open(src, 'w') as h:
+        h.write('print(1)\n')
+    args = genCompiler.Args(src, f'{tmp_path}/out.wasm', wasmEncoder='native')
+    genCompiler.compileMain(args, compileFun, loop_ast)
+    assert sorted(os.listdir(tmp_path)) == ['out.wasm', 'out.wat', 'prog.py']
@@ -0,0 +1,63 @@
+import common.genericParser as genericParser
+import lang_var.var_ast as var_ast
+import lang_fun.fun_ast as fun_ast
+import pytest
+
+def parse(tmp_path: str, src: str, m: object):
+    f = f'{tmp_path}/prog.py'
+    with open(f, 'w') as h:
+        h.write(src)
+    return genericParser.parseFile(f, m)
+
+def test_deepExpression(tmp_path: str):
+    # Deeper than the recursion limit, but still accepted by ast.parse
+    n = 1500
+    m = parse(tmp_path, 'x = ' + ' - '.join([str(i) for i in range(n)]) + '\n', var_ast)
+    e = m.stmts[0].right
+    depth = 0
+    while isinstance(e, var_ast.BinOp):
+        assert isinstance(e.op, var_ast.Sub)
+        assert e.right == var_ast.IntConst(n - 1 - depth)
+        e = e.left
+        depth += 1
+    assert (depth, e) == (n - 1, var_ast.IntConst(0))
+
+def test_translate(tmp_path: str):
+    src = 'def f(g: Callable[[int], bool], x: int) -> bool:\n' \
+          '    return g(x) and not x == 1\n' \
+          'print(f(h, -1) + [1, 2][0] * 2)\n'
+    m = parse(tmp_path, src, fun_ast)
+    (f,) = m.funs
+    assert f.params[0].ty == fun_ast.Fun([fun_ast.Int()], fun_ast.NotVoid(fun_ast.Bool()))
+    assert f.body == [fun_ast.Return(
+        fun_ast.BinOp(fun_ast.Call(fun_ast.Name(fun_ast.Ident('g')), [fun_ast.Name(fun_ast.Ident('x'))]),
+                      fun_ast.And(),
+                      fun_ast.UnOp(fun_ast.Not(), fun_ast.BinOp(fun_ast.Name(fun_ast.Ident('x')),
+                                                                fun_ast.Eq(),
+                                                                fun_ast.IntConst(1)))))]
+    (s,) = m.stmts
+    assert s.lineno == 3
+    match s:
+        case fun_ast.StmtExp(fun_ast.Call(_, [fun_ast.BinOp(left, fun_ast.Add(), right)])):
+            assert left == fun_ast.Call(fun_ast.Name(fun_ast.Ident('f')),
+                                           [fun_ast.Name(fun_ast.Ident('h')),
+                                            fun_ast.UnOp(fun_ast.USub(), fun_ast.IntConst(1))])
+            assert right == fun_ast.BinOp(
+                fun_ast.Subscript(fun_ast.ArrayInitStatic([fun_ast.IntConst(1), fun_ast.IntConst(2)]),
+                                  fun_ast.IntConst(0)),
+                fun_ast.Mul(),
+                fun_ast.IntConst(2))
+        case _:
+            assert False, s
+
+def test_unsupported(tmp_path: str):
+    with pytest.raises(Exception, match='binary operator'):
+        parse(tmp_path, 'print(1 // 2)\n', var_ast)
+    with pytest.raises(Exception, match='string constant'):
+        parse(tmp_path, 'print("x")\n', var_ast)
+    # Only lang_fun supports calling arbitrary expressions
+    with pytest.raises(Exception, match='expression'):
+        parse(tmp_path, 'print(input_int)(1)\n', var_ast)
+    # lang_var has no arrays
+    with pytest.raises(SystemExit):
+        parse(tmp_path, 'x = [1]\n', var_ast)
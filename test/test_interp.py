@@ -3,17 +3,126 @@ import common.testsupport as testsupport
 import common.log as log
 import pytest
 
-def runTest(lang: str, srcFile: str, input: str|None):
-    cmd = ['timeout', '10s', 'python', 'src/main.py', f'--lang={lang}', 'interp', srcFile]
+ENGINES = ['tree', 'closures', 'cpython']
+
+# test_files/interp_only has tests the wasm backend cannot run, e.g. recursion deeper
+# than the stack of the wasm VM. They are too slow for the tree engine.
+INTERP_ONLY_DIRS = ['test_files/interp_only']
+INTERP_ONLY_ENGINES = ['closures', 'cpython']
+
+def interpCmd(lang: str, engine: str, timeout: str = '10s') -> list[str]:
+    return ['timeout', timeout, 'python', 'src/main.py', testsupport.PARSE_CACHE_ARG,
+            f'--lang={lang}', 'interp', f'--engine={engine}']
+
+def testTimeout(srcFile: str) -> str:
+    # The tests in test_files/interp_only run deep recursions, which take up to a second alone
+    # but much longer when many tests run in parallel
+    return '60s' if any(srcFile.startswith(d) for d in INTERP_ONLY_DIRS) else '10s'
+
+def runTest(lang: str, engine: str, srcFile: str, input: str|None, extraArgs: str|None):
+    cmd = interpCmd(lang, engine, timeout=testTimeout(srcFile))
+    if extraArgs:
+        cmd = cmd + extraArgs.split()
+    cmd = cmd + [srcFile]
     log.info(f'Running command {" ".join(cmd)}')
     res = shell.run(cmd, input=input, captureStdout=True, captureStderr=True, onError='ignore')
     return res
 
+@pytest.mark.parametrize("engine", ENGINES)
 @pytest.mark.parametrize("lang, srcFile", testsupport.collectTestFiles())
-def test_interp(lang: str, srcFile: str):
+def test_interp(lang: str, srcFile: str, engine: str):
+    testsupport.runFileTest(
+        srcFile,
+        lambda captureErr, input, extraArgs: runTest(lang, engine, srcFile, input, extraArgs),
+        errorMode='lenient'
+    )
+
+@pytest.mark.parametrize("engine", INTERP_ONLY_ENGINES)
+@pytest.mark.parametrize("lang, srcFile", testsupport.collectTestFiles(INTERP_ONLY_DIRS))
+def test_interpOnly(lang: str, srcFile: str, engine: str):
+    testsupport.runFileTest(
+        srcFile,
+        lambda captureErr, input, extraArgs: runTest(lang, engine, srcFile, input, extraArgs),
+        errorMode='lenient'
+    )
+
+@pytest.mark.parametrize("lang, srcFile",
+                         testsupport.collectTestFiles(['test_files'] + INTERP_ONLY_DIRS,
+                                                      langOnly=['fun']))
+def test_interpVm(lang: str, srcFile: str):
     testsupport.runFileTest(
         srcFile,
-        lambda captureErr, input, _extraArgs: runTest(lang, srcFile, input),
+        lambda captureErr, input, extraArgs: runTest(lang, 'vm', srcFile, input, extraArgs),
         errorMode='lenient'
     )
 
+# Deeper than the default recursion limit of CPython, not a tail call
+DEEP_RECURSION_SRC = '''def depth(n: int) -> int:
+    if n == 0:
+        return 0
+    return 1 + depth(n - 1)
+
+print(depth(100000))
+'''
+
+def test_interpCpythonDeepRecursion(tmp_path: str):
+    srcFile = shell.pjoin(tmp_path, 'deep.py')
+    with open(srcFile, 'w') as h:
+        h.write(DEEP_RECURSION_SRC)
+    res = runTest('fun', 'cpython', srcFile, None, None)
+    assert res.exitcode == 0
+    assert res.stdout.strip() == '100000'
+
+# Tail calls at a depth of 10^6 must run in constant stack and bounded memory
+DEEP_TAIL_CALL_SRC = '''def sumTo(n: int, acc: int) -> int:
+    if n == 0:
+        return acc
+    return sumTo(n - 1, acc + n)
+
+print(sumTo(1000000, 0))
+'''
+
+# Virtual memory limit in kB for programs that must run in bounded memory. The tree and
+# closures engines need less than 150MB for DEEP_TAIL_CALL_SRC, keeping a stack frame per
+# tail call exceeds the limit.
+MEM_LIMIT = 200000
+
+def runWithMemLimit(lang: str, engine: str, src: str, tmp_path: str,
+                    timeout: str) -> shell.RunResult:
+    srcFile = shell.pjoin(tmp_path, 'prog.py')
+    with open(srcFile, 'w') as h:
+        h.write(src)
+    cmd = ' '.join(interpCmd(lang, engine, timeout=timeout) + [srcFile])
+    log.info(f'Running command {cmd} with memory limit {MEM_LIMIT}kB')
+    return shell.run(['bash', '-c', f'ulimit -v {MEM_LIMIT} && exec {cmd}'],
+                     captureStdout=True, captureStderr=True, onError='ignore')
+
+def test_interpClosuresDeepTailCalls(tmp_path: str):
+    res = runWithMemLimit('fun', 'closures', DEEP_TAIL_CALL_SRC, tmp_path, '60s')
+    assert res.exitcode == 0
+    assert res.stdout.strip() == '500000500000'
+
+# Takes about 25s
+def test_interpTreeDeepTailCalls(tmp_path: str):
+    res = runWithMemLimit('fun', 'tree', DEEP_TAIL_CALL_SRC, tmp_path, '300s')
+    assert res.exitcode == 0
+    assert res.stdout.strip() == '500000500000'
+
+# Loops must run in constant stack and linear time
+LONG_LOOP_SRC = '''i = 0
+sum = 0
+while i < 1000000:
+    if i < 500000:
+        sum = sum + i
+    else:
+        sum = sum - 1
+    i = i + 1
+print(sum)
+'''
+
+# Takes about 25s
+@pytest.mark.parametrize("lang", ['loop', 'array', 'fun'])
+def test_interpTreeLongLoop(lang: str, tmp_path: str):
+    res = runWithMemLimit(lang, 'tree', LONG_LOOP_SRC, tmp_path, '300s')
+    assert res.exitcode == 0
+    assert res.stdout.strip() == '124999250000'
@@ -0,0 +1,50 @@
+import common.interpIO as interpIO
+import io
+import subprocess
+import sys
+import threading
+import pytest
+
+SRC = '''x = input_int()
+print(x)
+y = input_int()
+print(x + y)
+'''
+
+@pytest.mark.parametrize("engine", ['tree', 'closures'])
+def test_dialog(tmp_path: str, engine: str):
+    """
+    The driver sends the next input only after reading the output of the previous one.
+    """
+    src = f'{tmp_path}/prog.py'
+    with open(src, 'w') as h:
+        h.write(SRC)
+    p = subprocess.Popen([sys.executable, 'src/main.py', '--lang=loop', 'interp',
+                          f'--engine={engine}', src],
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    # Kills the process if reading its output blocks
+    watchdog = threading.Timer(10, p.kill)
+    watchdog.start()
+    try:
+        assert p.stdin is not None and p.stdout is not None
+        p.stdin.write('1\n')
+        p.stdin.flush()
+        assert p.stdout.readline() == '1\n'
+        p.stdin.write('2\n')
+        p.stdin.close()
+        assert p.stdout.readline() == '3\n'
+        assert p.wait(timeout=10) == 0
+    finally:
+        watchdog.cancel()
+        p.kill()
+
+def readInts(monkeypatch: pytest.MonkeyPatch, input: str, n: int) -> list[int]:
+    monkeypatch.setattr(sys, 'stdin', io.StringIO(input))
+    return [interpIO.inputInt('') for _ in range(n)]
+
+def test_oneIntPerLine(monkeypatch: pytest.MonkeyPatch):
+    assert readInts(monkeypatch, '1\n -2 \n3', 3) == [1, -2, 3]
+    with pytest.raises(ValueError):
+        readInts(monkeypatch, '1 2\n', 1)
+    with pytest.raises(EOFError):
+        readInts(monkeypatch, '1\n', 2)
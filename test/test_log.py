@@ -0,0 +1,39 @@
+import common.log as log
+import logging
+import pytest
+from test import logLevel
+
+def readFile(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+@pytest.fixture
+def restoreLog():
+    yield
+    log.init(logLevel(), 'minipy_tests.log')
+
+def test_lazyMessages(tmp_path: str, restoreLog: None):
+    logFile = f'{tmp_path}/test.log'
+    calls: list[str] = []
+    def msg() -> str:
+        calls.append('called')
+        return 'expensive message'
+    log.init(logging.WARNING, logFile, logging.INFO)
+    log.debug(msg)
+    log.info('cheap message %d', 42)
+    assert calls == []
+    assert 'cheap message 42' in readFile(logFile)
+    log.init(logging.WARNING, logFile, logging.DEBUG)
+    log.debug(msg)
+    assert calls == ['called']
+    log.init(logging.WARNING, None)
+    log.info(msg)
+    assert calls == ['called']
+    # The location is the caller of log.debug
+    assert 'test_log.py' in readFile(logFile)
+    assert 'expensive message' in readFile(logFile)
+
+def test_resolveLevelName():
+    assert log.resolveLevelName('off') == log.OFF
+    with pytest.raises(SystemExit):
+        log.resolveLevelName('verbose')
@@ -0,0 +1,65 @@
+import common.genericParser as genericParser
+import common.parseCache as parseCache
+import lang_fun.fun_ast as fun_ast
+import lang_loop.loop_ast as loop_ast
+import pytest
+import logging
+import os
+
+SRC = '''def inc(x: int) -> int:
+    return x + 1
+
+print(inc(1))
+'''
+
+def parse(file: str, src: str, m: object, caplog: pytest.LogCaptureFixture) -> tuple[object, list[str]]:
+    with open(file, 'w') as h:
+        h.write(src)
+    caplog.clear()
+    x = genericParser.parseFile(file, m)
+    msgs = [r.message.split()[2] for r in caplog.records if r.message.startswith('Parse cache')]
+    return (x, msgs)
+
+def test_parseCache(tmp_path: str, caplog: pytest.LogCaptureFixture):
+    caplog.set_level(logging.DEBUG)
+    try:
+        parseCache.enable(f'{tmp_path}/cache')
+        (x1, msgs1) = parse(f'{tmp_path}/a.py', SRC, fun_ast, caplog)
+        assert msgs1 == ['miss']
+        (x2, msgs2) = parse(f'{tmp_path}/b.py', SRC, fun_ast, caplog)
+        assert msgs2 == ['hit']
+        assert x2 == x1
+        assert getattr(x2, 'filename') == f'{tmp_path}/b.py'
+        (_, msgs3) = parse(f'{tmp_path}/b.py', SRC.replace('1', '2'), fun_ast, caplog)
+        assert msgs3 == ['miss']
+        # The key includes the ASDL module
+        (_, msgs4) = parse(f'{tmp_path}/c.py', 'print(1)\n', fun_ast, caplog)
+        (_, msgs5) = parse(f'{tmp_path}/c.py', 'print(1)\n', loop_ast, caplog)
+        assert (msgs4, msgs5) == (['miss'], ['miss'])
+    finally:
+        parseCache.enable(None)
+
+def entries(cacheDir: str) -> list[str]:
+    return sorted([f for _, _, fs in os.walk(cacheDir) for f in fs])
+
+def test_parseCacheEviction(tmp_path: str):
+    cacheDir = f'{tmp_path}/cache'
+    f = f'{tmp_path}/p.py'
+    try:
+        for i in range(10):
+            with open(f, 'w') as h:
+                h.write(f'print({i})\n')
+            if i == 0:
+                parseCache.enable(cacheDir)
+                genericParser.parseFile(f, loop_ast)
+                (p,) = entries(cacheDir)
+                size = os.path.getsize(os.path.join(cacheDir, 'parse', p[:2], p))
+                # Room for 4 entries
+                parseCache.enable(cacheDir, 4 * size)
+            else:
+                genericParser.parseFile(f, loop_ast)
+        newest = parseCache.key(f'print(9)\n', loop_ast) + '.pickle'
+        assert newest in entries(cacheDir)
+        assert len(entries(cacheDir)) <= 4
+    finally:
+        parseCache.enable(None)
@@ -6,6 +6,8 @@ import parsers.common as p
 from common.constants import *
 import pytest
 import common.log as log
+from common.utils import readTextFile
+import shell
 
 simpleExp = '1 + 2 + 3 * 4'
 
@@ -47,3 +49,21 @@ def test_simpleAlternativeRecAscParserManual():
                                    ast.Add(),
                                    ast.BinOp(ast.IntConst(3), ast.Mul(), ast.IntConst(value=4))))
     assert t == expected
+
+def test_parserCache(tmp_path: str):
+    grammarFile = simpleParser.grammarFile
+    assert p.mkParser('lalr', grammarFile, 'exp') is p.mkParser('lalr', grammarFile, 'exp')
+    assert p.mkParser('earley', grammarFile, 'exp') is not p.mkParser('lalr', grammarFile, 'exp')
+    lexer = p.mkLexer(grammarFile, 'exp')
+    assert lexer is p.mkLexer(grammarFile, 'exp')
+    earley = p.mkParser('earley', grammarFile, 'exp')
+    assert list(lexer.lex(simpleExp)) == list(earley.lex(simpleExp))
+    # LALR parse tables are stored on disk
+    copy = shell.pjoin(tmp_path, 'grammar.lark')
+    shell.writeFile(copy, readTextFile(grammarFile) + '\n')
+    try:
+        p.setLarkCacheDir(shell.pjoin(tmp_path, 'lark'))
+        p.mkParser('lalr', copy, 'exp')
+    finally:
+        p.setLarkCacheDir(None)
+    assert len(shell.ls(shell.pjoin(tmp_path, 'lark'))) == 1
@@ -0,0 +1,48 @@
+import common.genericParser as genericParser
+import common.profiler as profiler
+import common.interpIO as interpIO
+import lang_fun.fun_ast as fun_ast
+import lang_fun.fun_closureInterp as fun_closureInterp
+from typing import *
+
+SRC = '''def f(n: int) -> int:
+    if n == 0:
+        return 0
+    return f(n - 1)
+
+i = 0
+while i < 3:
+    print(f(i))
+    i = i + 1
+'''
+
+def test_profiler(tmp_path: str):
+    src = f'{tmp_path}/prog.py'
+    with open(src, 'w') as f:
+        f.write(SRC)
+    m = genericParser.parseFile(src, fun_ast)
+    p = profiler.start()
+    try:
+        fun_closureInterp.interpModule(m)
+    finally:
+        profiler.stop()
+        interpIO.flush()
+    assert {n: c.count for n, c in p.lines.items()} == \
+        {2: 6, 3: 3, 4: 3, 6: 1, 7: 1, 8: 3, 9: 3}
+    assert p.funs['f'].count == 6
+    assert p.funs['<module>'].count == 1
+    assert p.funs['<module>'].total == p.totalTime()
+    assert p.frames == []
+    assert '<module>;line 7;line 8;f;line 4' in p.stacks
+    report = f'{tmp_path}/prof.txt'
+    p.writeReport(report, src)
+    with open(report) as f:
+        assert 'while i < 3:' in f.read()
+    with open(f'{tmp_path}/prof.collapsed') as f:
+        assert f.readline().startswith('<module> ')
+
+def test_profilerInactive():
+    def f(env: list[Any]) -> list[Any]:
+        return env
+    assert profiler.wrapStmt(1, f) is f
+    assert profiler.wrapFun('f', f) is f
@@ -0,0 +1,90 @@
+import common.genericParser as genericParser
+import common.interpIO as interpIO
+import lang_fun.fun_ast as fun_ast
+from lang_fun.fun_ast import Ident
+import lang_fun.fun_tychecker as fun_tychecker
+import lang_fun.fun_purity as fun_purity
+import lang_fun.fun_interp as fun_interp
+import pytest
+import logging
+
+SRC = '''def fib(n: int) -> int:
+    if n < 2:
+        return n
+    return fib(n - 1) + fib(n - 2)
+
+def even(n: int) -> bool:
+    if n == 0:
+        return True
+    return odd(n - 1)
+
+def odd(n: int) -> bool:
+    if n == 0:
+        return False
+    return even(n - 1)
+
+def noisy(n: int) -> int:
+    print(n)
+    return n
+
+def callsNoisy(n: int) -> int:
+    return noisy(n) + 1
+
+def alloc(n: int) -> list[int]:
+    return n * [0]
+
+def first(a: list[int]) -> int:
+    return a[0]
+
+def apply(f: Callable[[int], int], x: int) -> int:
+    return f(x)
+
+print(fib(25))
+print(even(10))
+print(callsNoisy(1))
+print(apply(fib, 10))
+'''
+
+def parse(tmp_path: str) -> fun_ast.Module:
+    src = f'{tmp_path}/prog.py'
+    with open(src, 'w') as f:
+        f.write(SRC)
+    return genericParser.parseFile(src, fun_ast)
+
+def test_pureFuns(tmp_path: str):
+    m = parse(tmp_path)
+    fun_tychecker.tycheckModule(m)
+    pure = fun_purity.pureFuns(m)
+    assert pure == {Ident('fib'), Ident('even'), Ident('odd'), Ident('first')}
+    memo = [f.name.name for f in m.funs if fun_purity.isMemoizable(f, pure)]
+    assert memo == ['fib', 'even', 'odd']
+
+@pytest.mark.parametrize("memoSize", [0, 3, 100])
+def test_memoize(tmp_path: str, capsys: pytest.CaptureFixture[str],
+                 caplog: pytest.LogCaptureFixture, memoSize: int):
+    m = parse(tmp_path)
+    caplog.set_level(logging.INFO)
+    try:
+        fun_interp.interpModule(m, memoSize=memoSize)
+    finally:
+        interpIO.flush()
+    assert capsys.readouterr().out.split() == ['75025', 'True', '1', '2', '55']
+    # Statistics are logged as: Memoization of NAME: H hits, M misses, E evictions, ...
+    stats: dict[str, list[int]] = {}
+    for r in caplog.records:
+        if r.message.startswith('Memoization of '):
+            name, rest = r.message[len('Memoization of '):].split(': ')
+            stats[name] = [int(x.split()[0]) for x in rest.split(', ')]
+    if memoSize == 0:
+        assert stats == {}
+    else:
+        assert set(stats) == {'fib', 'even', 'odd'}
+        [hits, misses, evictions, cached] = stats['fib']
+        assert cached <= memoSize
+        assert hits > 0
+        if memoSize == 100:
+            # Each argument of the direct calls is computed once
+            assert misses == 26
+            assert evictions == 0
+        else:
+            assert evictions > 0
@@ -0,0 +1,41 @@
+from common.symtab import Symtab
+from common.compilerSupport import CompileError
+import pytest
+
+def test_copyIsIndependent():
+    st = Symtab[str, str]()
+    st.assign('x', 'int')
+    c = st.copy()
+    c.assign('y', 'bool')
+    st.assign('z', 'int')
+    assert st.types() == [('x', 'int'), ('z', 'int')]
+    assert c.types() == [('x', 'int'), ('y', 'bool')]
+
+def test_mergeBack():
+    st = Symtab[str, str]()
+    for i in range(100):
+        st.assign(f'v{i}', 'int')
+    thenSt = st.copy()
+    thenSt.assign('a', 'int')
+    thenSt.assign('b', 'bool')
+    elseSt = st.copy()
+    elseSt.assign('c', 'int')
+    elseSt.assign('a', 'int')
+    st.mergeBack(thenSt, elseSt)
+    assert [x for x, _ in st.types()][-3:] == ['a', 'b', 'c']
+    assert st.use('a') == 'int'
+    assert st.use('v42') == 'int'
+    with pytest.raises(CompileError, match='Variable b might not have been initialized'):
+        st.use('b')
+    # b is definitely assigned after assigning it again
+    st.assign('b', 'bool')
+    assert st.use('b') == 'bool'
+
+def test_mergeBackInconsistent():
+    st = Symtab[str, str]()
+    thenSt = st.copy()
+    thenSt.assign('x', 'int')
+    elseSt = st.copy()
+    elseSt.assign('x', 'bool')
+    with pytest.raises(CompileError, match='Inconsistent types for variable x'):
+        st.mergeBack(thenSt, elseSt)
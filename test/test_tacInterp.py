@@ -11,7 +11,7 @@ def params() -> list[tuple[str, str]]:
     return l
 
 def runTest(lang: str, srcFile: str, tmp: str, captureErr: bool, input: str|None, extraArgs: str|None) -> shell.RunResult:
-    cmd = f'python src/main.py --lang={lang} tacInterp {srcFile}'
+    cmd = f'python src/main.py {testsupport.PARSE_CACHE_ARG} --lang={lang} tacInterp {srcFile}'
     log.info(f'Running command {cmd}')
     res = shell.run(cmd, captureStderr=captureErr, captureStdout=True, onError='ignore', input=input)
     return res
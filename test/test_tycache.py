@@ -0,0 +1,55 @@
+import common.genericParser as genericParser
+import lang_fun.fun_ast as fun_ast
+import lang_fun.fun_tychecker as fun_tychecker
+import lang_fun.fun_tycache as fun_tycache
+from common.compilerSupport import CompileError
+import pytest
+import logging
+
+SRC = '''def inc(x: int) -> int:
+    return x + 1
+
+def twice(f: Callable[[int], int], x: int) -> int:
+    y = f(x)
+    return f(y)
+
+def main() -> None:
+    a = [inc(1), twice(inc, 2)]
+    print(a[0] + len(a))
+
+main()
+'''
+
+def check(tmp_path: str, src: str, caplog: pytest.LogCaptureFixture):
+    f = f'{tmp_path}/prog.py'
+    with open(f, 'w') as h:
+        h.write(src)
+    m = genericParser.parseFile(f, fun_ast)
+    caplog.clear()
+    try:
+        fun_tycache.enable(f'{tmp_path}/cache')
+        res = fun_tychecker.tycheckModule(m)
+    finally:
+        fun_tycache.enable(None)
+    hits = [r.message.split()[-1] for r in caplog.records
+            if r.message.startswith('Type check cache hit')]
+    return (m, res, hits)
+
+def test_tycache(tmp_path: str, caplog: pytest.LogCaptureFixture):
+    caplog.set_level(logging.DEBUG)
+    (m1, res1, hits1) = check(tmp_path, SRC, caplog)
+    assert hits1 == []
+    (m2, res2, hits2) = check(tmp_path, SRC, caplog)
+    assert hits2 == ['inc', 'twice', 'main']
+    assert res2 == res1
+    assert repr(m2) == repr(m1)
+    # Changing the body of inc does not invalidate the other functions
+    (_, _, hits3) = check(tmp_path, SRC.replace('x + 1', 'x + 2'), caplog)
+    assert hits3 == ['twice', 'main']
+    # Changing the signature of inc invalidates main, which refers to inc
+    src = SRC.replace('def inc(x: int) -> int:\n    return x + 1',
+                      'def inc(x: int) -> bool:\n    return x == 1')
+    with pytest.raises(CompileError):
+        check(tmp_path, src, caplog)
+    assert [r.message.split()[-1] for r in caplog.records
+            if r.message.startswith('Type check cache hit')] == ['twice']
@@ -0,0 +1,47 @@
+import common.genericParser as genericParser
+import lang_fun.fun_ast as fun_ast
+import lang_fun.fun_tychecker as fun_tychecker
+import lang_fun.fun_typarallel as fun_typarallel
+from common.compilerSupport import CompileError
+from typing import *
+import os
+import pytest
+
+def mkSrc(n: int, errors: list[int]) -> str:
+    lines: list[str] = []
+    for i in range(n):
+        lines.append(f'def f{i}(x: int) -> int:')
+        lines.append(f'    y = [x, f{max(i - 1, 0)}(x)]')
+        if i in errors:
+            lines.append(f'    return z{i}')
+        else:
+            lines.append(f'    return y[1] + {i}')
+    lines.append(f'print(f{n - 1}(1))')
+    return '\n'.join(lines) + '\n'
+
+def tycheck(tmp_path: str, src: str, minFuns: Optional[int]) -> Any:
+    f = f'{tmp_path}/prog.py'
+    with open(f, 'w') as h:
+        h.write(src)
+    m = genericParser.parseFile(f, fun_ast)
+    try:
+        fun_typarallel.enable(minFuns)
+        res = fun_tychecker.tycheckModule(m)
+    finally:
+        fun_typarallel.enable(None)
+    return (repr(m), res)
+
+def test_parallel(tmp_path: str, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(os, 'cpu_count', lambda: 3)
+    src = mkSrc(50, [])
+    assert tycheck(tmp_path, src, 10) == tycheck(tmp_path, src, None)
+
+def test_parallelErrorOrder(tmp_path: str, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(os, 'cpu_count', lambda: 3)
+    src = mkSrc(50, [17, 40])
+    with pytest.raises(CompileError) as seq:
+        tycheck(tmp_path, src, None)
+    with pytest.raises(CompileError) as par:
+        tycheck(tmp_path, src, 10)
+    assert str(par.value) == str(seq.value)
+    assert 'z17' in str(par.value)
@@ -0,0 +1,38 @@
+import common.genericParser as genericParser
+import lang_fun.fun_ast as fun_ast
+import lang_fun.fun_tychecker as fun_tychecker
+import lang_fun.fun_resolver as fun_resolver
+import lang_fun.fun_vm as fun_vm
+
+SRC = '''def f(n: int) -> int:
+    while n > 0:
+        n = n - 1
+    return n
+
+print(f(3))
+'''
+
+def compile(tmp_path: str) -> fun_vm.Program:
+    src = f'{tmp_path}/prog.py'
+    with open(src, 'w') as f:
+        f.write(SRC)
+    m = genericParser.parseFile(src, fun_ast)
+    tyRes = fun_tychecker.tycheckModule(m)
+    return fun_vm.compileModule(m, fun_resolver.resolveModule(m, tyRes))
+
+def test_vmJumps(tmp_path: str):
+    prog = compile(tmp_path)
+    f = prog.funs[0]
+    assert list(f.instrs) == [
+        fun_vm.LOAD, 0, fun_vm.CONST, 0, fun_vm.GREATER, fun_vm.JUMP_IF_FALSE, 16,
+        fun_vm.LOAD, 0, fun_vm.CONST, 1, fun_vm.SUB, fun_vm.STORE, 0, fun_vm.JUMP, 0,
+        fun_vm.LOAD, 0, fun_vm.RETURN, fun_vm.RETURN_NONE]
+    assert prog.consts == [0, 1, 3]
+
+def test_vmDisassemble(tmp_path: str):
+    prog = compile(tmp_path)
+    lines = fun_vm.disassembleProgram(prog).splitlines()
+    assert lines[0] == 'f (params: 1, frame size: 1):'
+    assert lines[9] == '    14  JUMP                 0'
+    assert '<module> (params: 0, frame size: 0):' in lines
+    assert lines[-4].split() == ['2', 'CALL', '0', '1', '#', 'f']
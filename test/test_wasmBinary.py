@@ -0,0 +1,118 @@
+import common.wasmBinary as wasmBinary
+from common.wasm import *
+import common.sexp as sexp
+import shell
+import shutil
+import pytest
+from typing import *
+
+def uleb(n: int) -> bytes:
+    out = bytearray()
+    wasmBinary.uleb(out, n)
+    return bytes(out)
+
+def sleb(n: int) -> bytes:
+    out = bytearray()
+    wasmBinary.sleb(out, n)
+    return bytes(out)
+
+def test_leb():
+    assert uleb(0) == b'\x00'
+    assert uleb(127) == b'\x7f'
+    assert uleb(128) == b'\x80\x01'
+    assert uleb(624485) == b'\xe5\x8e\x26'
+    assert sleb(0) == b'\x00'
+    assert sleb(63) == b'\x3f'
+    assert sleb(64) == b'\xc0\x00'
+    assert sleb(-1) == b'\x7f'
+    assert sleb(-64) == b'\x40'
+    assert sleb(-65) == b'\xbf\x7f'
+    assert sleb(-123456) == b'\xc0\xbb\x78'
+    assert wasmBinary.signed(0xffffffff, 32) == -1
+    assert wasmBinary.signed(2**63, 64) == -2**63
+
+def mkModule() -> WasmModule:
+    printI32 = WasmId('$print_i32')
+    main = WasmId('$main')
+    square = WasmId('$square')
+    counter = WasmId('$counter')
+    i = WasmId('$i')
+    x = WasmId('$x')
+    loopStart = WasmId('$loop_start')
+    loopExit = WasmId('$loop_exit')
+    squareBody: list[WasmInstr] = [
+        WasmInstrVarLocal('get', x), WasmInstrVarLocal('get', x),
+        WasmInstrNumBinOp('i32', 'mul')
+    ]
+    loop: list[WasmInstr] = [
+        WasmInstrVarLocal('get', i), WasmInstrConst('i32', 4),
+        WasmInstrIntRelOp('i32', 'ge_s'), WasmInstrBranch(loopExit, True),
+        WasmInstrComment('print square(i) via the table'),
+        WasmInstrVarLocal('get', i), WasmInstrConst('i32', 0),
+        WasmInstrCallIndirect([ 'i32' ], 'i32'),
+        WasmInstrCall(printI32),
+        WasmInstrVarLocal('get', i), WasmInstrConst('i32', 1), WasmInstrNumBinOp('i32', 'add'),
+        WasmInstrVarLocal('set', i),
+        WasmInstrBranch(loopStart, False)
+    ]
+    mainBody: list[WasmInstr] = [
+        WasmInstrBlock(loopExit, None, [WasmInstrLoop(loopStart, loop)]),
+        # memory
+        WasmInstrConst('i32', 100), WasmInstrConst('i64', -5000000000),
+        WasmInstrMem('i64', 'store'),
+        WasmInstrConst('i32', 100), WasmInstrMem('i64', 'load'), WasmInstrCall(WasmId('$print_i64')),
+        # globals and if
+        WasmInstrVarGlobal('get', counter), WasmInstrConst('i32', 0),
+        WasmInstrIntRelOp('i32', 'eq'),
+        WasmInstrIf('i32', [WasmInstrConst('i32', 10)], [WasmInstrConst('i32', 20)]),
+        WasmInstrVarGlobal('set', counter),
+        WasmInstrVarGlobal('get', counter), WasmInstrCall(printI32),
+        WasmInstrConst('i32', 1),
+        WasmInstrIf(None, [WasmInstrConst('i64', 7), WasmInstrConvOp('i32.wrap_i64'),
+                           WasmInstrCall(printI32)], []),
+        WasmInstrConst('i32', 0), WasmInstrConst('i32', 5), WasmInstrCall(WasmId('$print'))
+    ]
+    imports = [
+        WasmImport('env', 'memory', WasmImportMemory(1, None)),
+        WasmImport('env', 'print', WasmImportFunc(WasmId('$print'), ['i32', 'i32'], None)),
+        WasmImport('env', 'print_i32', WasmImportFunc(printI32, ['i32'], None)),
+        WasmImport('env', 'print_i64', WasmImportFunc(WasmId('$print_i64'), ['i64'], None)),
+    ]
+    return WasmModule(
+        imports,
+        [WasmExport('main', WasmExportFunc(main))],
+        [WasmGlobal(counter, 'i32', True, [WasmInstrConst('i32', 0)])],
+        [WasmData(0, 'hello')],
+        WasmFuncTable([square]),
+        [WasmFunc(square, [(x, 'i32')], 'i32', [], squareBody),
+         WasmFunc(main, [], None, [(i, 'i32')], mainBody)]
+    )
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='node not installed')
+def test_runNode(tmp_path: str):
+    wasm = shell.pjoin(tmp_path, 'out.wasm')
+    with open(wasm, 'wb') as f:
+        f.write(wasmBinary.encodeModule(mkModule()))
+    res = shell.run(['bash', 'wasm-support/run_node', wasm], captureStdout=True)
+    assert res.stdout.split('\n') == ['0', '1', '4', '9', '-5000000000n', '10', '7', 'hello', '']
+
+def wat2wasm(m: WasmModule, tmp_path: str) -> bytes:
+    wat = shell.pjoin(tmp_path, 'out.wat')
+    wasm = shell.pjoin(tmp_path, 'out.wasm')
+    with open(wat, 'w') as f:
+        f.write(sexp.renderSExp(m.render()))
+    shell.run(['wat2wasm', '--output=' + wasm, wat])
+    with open(wasm, 'rb') as f:
+        return f.read()
+
+@pytest.mark.skipif(shutil.which('wat2wasm') is None, reason='wat2wasm not installed')
+def test_emptyMain(tmp_path: str):
+    main = WasmId('$main')
+    m = WasmModule([], [WasmExport('main', WasmExportFunc(main))], [], [],
+                   WasmFuncTable([]), [WasmFunc(main, [], None, [], [])])
+    assert bytes(wasmBinary.encodeModule(m)) == wat2wasm(m, tmp_path)
+
+@pytest.mark.skipif(shutil.which('wat2wasm') is None, reason='wat2wasm not installed')
+def test_sameAsWat2wasm(tmp_path: str):
+    m = mkModule()
+    assert bytes(wasmBinary.encodeModule(m)) == wat2wasm(m, tmp_path)
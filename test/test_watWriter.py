@@ -0,0 +1,77 @@
+import common.watWriter as watWriter
+import common.sexp as sexp
+from common.wasm import *
+import io
+
+def render(m: WasmModule) -> str:
+    out = io.StringIO()
+    watWriter.writeModule(m, out)
+    return out.getvalue()
+
+def mkModule() -> WasmModule:
+    main = WasmId('$main')
+    f = WasmId('$f')
+    x = WasmId('$x')
+    g = WasmId('$g')
+    b = WasmId('$b')
+    l = WasmId('$l')
+    fInstrs: list[WasmInstr] = [
+        WasmInstrVarLocal('get', x), WasmInstrConvOp('i64.extend_i32_s'),
+        WasmInstrConst('i64', -3), WasmInstrNumBinOp('i64', 'mul'), WasmInstrDrop(),
+        WasmInstrConst('f64', 1.5), WasmInstrDrop(), WasmInstrConst('i32', 0), WasmInstrTrap()
+    ]
+    mainInstrs: list[WasmInstr] = [
+        WasmInstrBlock(b, 'i32', [
+            WasmInstrLoop(l, [
+                WasmInstrVarGlobal('get', g), WasmInstrConst('i32', 1),
+                WasmInstrIntRelOp('i32', 'lt_u'), WasmInstrBranch(l, True),
+                WasmInstrComment('(nested) comment'),
+                WasmInstrIf(None, [], [WasmInstrBranch(b, False)])
+            ]),
+            WasmInstrConst('i32', 8), WasmInstrMem('i32', 'load'),
+            WasmInstrIf('i32', [WasmInstrConst('i32', 1)], [WasmInstrConst('i32', 2)]),
+            WasmInstrCallIndirect(['i32'], None),
+            WasmInstrConst('i32', 0), WasmInstrVarLocal('tee', x)
+        ]),
+        WasmInstrCall(f)
+    ]
+    return WasmModule(
+        [WasmImport('env', 'memory', WasmImportMemory(1, 10)),
+         WasmImport('env', 'input_i32', WasmImportFunc(WasmId('$input_i32'), [], 'i32'))],
+        [WasmExport('main', WasmExportFunc(main))],
+        [WasmGlobal(g, 'i32', True, [WasmInstrConst('i32', 0)])],
+        [WasmData(0, 'say "hi"\n')],
+        WasmFuncTable([f, main]),
+        [WasmFunc(f, [(x, 'i32')], None, [], fInstrs),
+         WasmFunc(main, [], None, [(x, 'i32'), (WasmId('$y'), 'i64')], mainInstrs)]
+    )
+
+def test_sameTokensAsPretty():
+    m = mkModule()
+    assert render(m).split() == sexp.renderSExp(m.render()).split()
+
+def test_layout():
+    main = WasmId('$main')
+    b = WasmId('$b')
+    instrs: list[WasmInstr] = [
+        WasmInstrBlock(b, None, [WasmInstrConst('i32', 1), WasmInstrBranch(b, True)]),
+        WasmInstrConst('i32', 0), WasmInstrIf(None, [WasmInstrDrop()], [])
+    ]
+    m = WasmModule([], [], [], [], WasmFuncTable([]),
+                   [WasmFunc(main, [], 'i32', [(WasmId('$x'), 'i32')], instrs)])
+    assert render(m) == '\n'.join([
+        '(module',
+        '  (table funcref (elem))',
+        '  (func $main (result i32)',
+        '    (local $x i32)',
+        '    block $b',
+        '      (i32.const 1)',
+        '      (br_if $b)',
+        '    end',
+        '    (i32.const 0)',
+        '    if',
+        '      drop',
+        '    else',
+        '    end))',
+        ''
+    ])
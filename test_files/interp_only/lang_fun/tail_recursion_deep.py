@@ -0,0 +1,20 @@
+def sumTo(n: int, acc: int) -> int:
+    if n == 0:
+        return acc
+    return sumTo(n - 1, acc + n)
+
+def isEven(n: int) -> bool:
+    if n == 0:
+        return True
+    return isOdd(n - 1)
+
+def isOdd(n: int) -> bool:
+    if n == 0:
+        return False
+    return isEven(n - 1)
+
+print(sumTo(100000, 0))
+if isEven(100000):
+    print(1)
+else:
+    print(0)
@@ -0,0 +1,23 @@
+keep = [[0], [0], [0], [0]]
+a = [0]
+b = [a]
+i = 0
+k = 0
+n = 0
+while i < 2000:
+    a = 1000 * [i]
+    b = [a, [i, i + 1], 10 * [i]]
+    if k == 0:
+        keep[n] = b[1]
+        n = n + 1
+    k = k + 1
+    if k == 500:
+        k = 0
+    i = i + 1
+print(len(a))
+print(a[999])
+print(b[1][1])
+j = 0
+while j < 4:
+    print(keep[j][0])
+    j = j + 1
@@ -0,0 +1,74 @@
+# Loops that the interpreter runs vectorized, and loops where it must not
+n = 1000
+a = n * [0]
+b = n * [0]
+i = 0
+while i < n:
+    a[i] = i
+    b[i] = 2 * i - 500
+    i = i + 1
+# fill
+c = n * [0]
+k = 7
+i = 0
+while i < n:
+    c[i] = k
+    i = i + 1
+print(c[0] + c[999])
+# sum, dot product
+s = 0
+i = 0
+while i != len(a):
+    s = s + a[i]
+    i = i + 1
+print(s)
+print(i)
+d = 0
+i = 0
+while i < len(a):
+    d = a[i] * b[i] + d
+    i = i + 1
+print(d)
+# map, also with the array read and written
+i = 0
+while i < n:
+    c[i] = a[i] - 3 * b[i] + k
+    i = i + 1
+print(c[0] + c[500] + c[999])
+i = 10
+while i < n:
+    a[i] = a[i] * a[i]
+    i = i + 1
+print(a[9] + a[10] + a[999])
+# aliasing
+e = a
+i = 0
+while i < n:
+    e[i] = -a[i]
+    i = i + 1
+print(a[999])
+# not entered
+i = 2000
+while i < n:
+    s = s + 1
+    i = i + 1
+print(i)
+print(s)
+# overflow of 64 bits: runs element by element with python ints
+big = n * [4611686018427387904]
+s = 0
+i = 0
+while i < n:
+    s = s + big[i]
+    i = i + 1
+print(s)
+i = 0
+while i < n:
+    big[i] = big[i] * 4
+    i = i + 1
+print(big[0])
+i = 0
+while i < n:
+    big[i] = big[i] + 1
+    i = i + 1
+print(big[999])
@@ -0,0 +1,28 @@
+def mk(n: int, x: int) -> list[int]:
+    return n * [x]
+
+def pair(a: list[int], b: list[int]) -> list[list[int]]:
+    return [a, b]
+
+def sum(a: list[int]) -> int:
+    s = 0
+    i = 0
+    while i < len(a):
+        s = s + a[i]
+        i = i + 1
+    return s
+
+def first(p: list[list[int]]) -> list[int]:
+    return p[0]
+
+last = pair(mk(1, 0), mk(1, 0))
+total = 0
+i = 0
+while i < 300:
+    p = pair(mk(1000, i), pair(mk(2000, 1), mk(3, i))[1])
+    total = total + sum(p[1]) + first(p)[mk(500, 7)[499]]
+    if p[0] is first(p):
+        last = p
+    i = i + 1
+print(total)
+print(last[0][0] + last[1][2])
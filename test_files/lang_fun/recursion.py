@@ -0,0 +1,28 @@
+def sumTo(n: int) -> int:
+    if n == 0:
+        return 0
+    return n + sumTo(n - 1)
+
+def fib(n: int) -> int:
+    if n < 2:
+        return n
+    else:
+        return fib(n - 1) + fib(n - 2)
+
+def isEven(n: int) -> bool:
+    if n == 0:
+        return True
+    return isOdd(n - 1)
+
+def isOdd(n: int) -> bool:
+    if n == 0:
+        return False
+    return isEven(n - 1)
+
+print(sumTo(100))
+print(fib(18))
+i = 0
+while i < 5:
+    if isEven(60 + i):
+        print(i)
+    i = i + 1
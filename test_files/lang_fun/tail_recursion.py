@@ -0,0 +1,33 @@
+def sumTo(n: int, acc: int) -> int:
+    if n == 0:
+        return acc
+    return sumTo(n - 1, acc + n)
+
+def countDown(n: int) -> int:
+    while True:
+        if n == 0:
+            return 0
+        else:
+            return countDown(n - 1)
+    return 1
+
+def apply(f: Callable[[int, int], int], n: int) -> int:
+    return f(n, 0)
+
+def isEven(n: int) -> bool:
+    if n == 0:
+        return True
+    return isOdd(n - 1)
+
+def isOdd(n: int) -> bool:
+    if n == 0:
+        return False
+    return isEven(n - 1)
+
+print(sumTo(800, 0))
+print(countDown(800))
+print(apply(sumTo, 700))
+if isEven(801):
+    print(1)
+else:
+    print(0)
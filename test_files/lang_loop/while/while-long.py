@@ -0,0 +1,10 @@
+# Many more iterations than the python recursion limit
+i = 0
+sum = 0
+while i < 5000:
+    if i < 2500:
+        sum = sum + i
+    else:
+        sum = sum - 1
+    i = i + 1
+print(sum)